@@ -1,3 +1,3 @@
 @echo off
 cd /d "d:\Major Project\Insider Threat Detection"
-call "d:\Major Project\Insider Threat Detection\venv\Scripts\python.exe" src\retrain.py
\ No newline at end of file
+call "d:\Major Project\Insider Threat Detection\venv\Scripts\python.exe" src\retrain.py --full
\ No newline at end of file
@@ -3,8 +3,15 @@ Risk scoring module for insider threat detection.
 Calculates risk scores based on detected anomalies and user behavior patterns.
 """
 
-import pandas as pd
-import numpy as np
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+# pandas is imported inside the functions: every ``src.*`` import (e.g.
+# the demo server's ``src.app``) runs this file first
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 
 def calculate_risk(
@@ -23,6 +30,8 @@ def calculate_risk(
     Returns:
         DataFrame with risk scores and classifications
     """
+    import pandas as pd
+
     risk_data = data.copy()
     risk_data['anomaly_score'] = anomaly_scores
 
@@ -0,0 +1,298 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_SEGMENT_PREFIX = "alerts_"
+_SEGMENT_SUFFIX = ".jsonl"
+_INDEX_SUFFIX = ".idx"
+_RANGE_SUFFIX = ".range"
+
+
+def _to_epoch(ts):
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return ts.timestamp()
+
+
+class AlertJournal:
+    """Append-only, segmented JSONL alert store.
+
+    Alerts are written one JSON object per line to ``alerts_NNNNNN.jsonl``.
+    Each segment has a sidecar ``.idx`` file with one tab-separated line
+    per alert (byte offset, length, epoch timestamp, user id), so readers
+    can filter by user or time and seek straight to matching records.
+    A ``.range`` sidecar holds the segment's earliest and latest alert
+    timestamps, so time queries skip segments outside their range
+    without reading the index. A segment is closed and a new one started
+    once it exceeds ``max_segment_bytes``.
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 * 1024 * 1024,
+                 fsync=True):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = int(max_segment_bytes)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+        self._segment_id = None
+        self._segment_size = 0
+        self._segment_range = (None, None)
+
+    def _segments(self):
+        ids = []
+        pattern = f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"
+        for path in self.directory.glob(pattern):
+            stem = path.name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]
+            if stem.isdigit():
+                ids.append(int(stem))
+        return sorted(ids)
+
+    def _paths(self, segment_id):
+        base = self.directory / f"{_SEGMENT_PREFIX}{segment_id:06d}"
+        return (
+            base.with_suffix(_SEGMENT_SUFFIX),
+            base.with_suffix(_INDEX_SUFFIX),
+        )
+
+    def _range_path(self, segment_id):
+        return self._paths(segment_id)[0].with_suffix(_RANGE_SUFFIX)
+
+    def _read_range(self, segment_id):
+        """``(min, max)`` epoch of a segment's alerts (both None when none
+        has a timestamp), or None when the segment has no range file."""
+        path = self._range_path(segment_id)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as fh:
+            rng = json.load(fh)
+        return rng["min"], rng["max"]
+
+    def _write_range(self, segment_id, rng):
+        path = self._range_path(segment_id)
+        tmp = path.with_suffix(_RANGE_SUFFIX + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"min": rng[0], "max": rng[1]}, fh)
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _scan_range(index_path):
+        """``(min, max)`` epoch from an index file (segments written
+        before range files existed)."""
+        epochs = []
+        if index_path.exists():
+            with open(index_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 4 and parts[2]:
+                        epochs.append(float(parts[2]))
+        return (min(epochs), max(epochs)) if epochs else (None, None)
+
+    def _open_segment(self, segment_id):
+        self._close_segment()
+        data_path, index_path = self._paths(segment_id)
+        self._data = open(data_path, "ab")
+        self._index = open(index_path, "a", encoding="utf-8")
+        self._segment_id = segment_id
+        self._segment_size = self._data.tell()
+        rng = self._read_range(segment_id)
+        self._segment_range = (
+            rng if rng is not None else self._scan_range(index_path)
+        )
+
+    def _close_segment(self):
+        for fh in (self._data, self._index):
+            if fh is not None:
+                fh.close()
+        self._data = None
+        self._index = None
+
+    def append_batch(self, alerts):
+        """Append ``alerts`` and sync once for the whole batch."""
+        if not alerts:
+            return
+        with self._lock:
+            if self._data is None:
+                segments = self._segments()
+                self._open_segment(segments[-1] if segments else 1)
+
+            lines = []
+            entries = []
+            for alert in alerts:
+                line = json.dumps(alert, default=str) + "\n"
+                line = line.encode("utf-8")
+                if (self._segment_size > 0 and self._segment_size + len(line)
+                        > self.max_segment_bytes):
+                    self._flush(lines, entries)
+                    lines, entries = [], []
+                    self._open_segment(self._segment_id + 1)
+                epoch = _to_epoch(alert.get("timestamp"))
+                entries.append(
+                    f"{self._segment_size}\t{len(line)}\t"
+                    f"{epoch if epoch is not None else ''}\t"
+                    f"{alert.get('user_id', '')}\n"
+                )
+                lines.append(line)
+                self._segment_size += len(line)
+            self._flush(lines, entries)
+
+    def _flush(self, lines, entries):
+        if not lines:
+            return
+        self._data.write(b"".join(lines))
+        self._data.flush()
+        # Data is made durable before the index can point at it
+        if self.fsync:
+            os.fsync(self._data.fileno())
+        # The range is widened before the index, so after a crash it may
+        # be too wide (a wasted scan) but never misses an indexed alert
+        epochs = [
+            float(e.split("\t")[2]) for e in entries if e.split("\t")[2]
+        ]
+        if epochs:
+            lo, hi = self._segment_range
+            self._segment_range = (
+                min(epochs) if lo is None else min(lo, min(epochs)),
+                max(epochs) if hi is None else max(hi, max(epochs)),
+            )
+        if epochs or not self._range_path(self._segment_id).exists():
+            self._write_range(self._segment_id, self._segment_range)
+        self._index.write("".join(entries))
+        self._index.flush()
+        if self.fsync:
+            os.fsync(self._index.fileno())
+
+    def query(self, user_id=None, start=None, end=None, limit=None):
+        """Return alerts matching ``user_id`` and ``[start, end]``.
+
+        ``start``/``end`` accept datetimes, ISO strings or epoch seconds.
+        Segments whose time range lies outside ``[start, end]`` are
+        skipped; the others' index files are scanned and matching records
+        are read by seeking to their offsets.
+        """
+        start, end = _to_epoch(start), _to_epoch(end)
+        user_id = None if user_id is None else str(user_id)
+        results = []
+        for segment_id in self._segments():
+            data_path, index_path = self._paths(segment_id)
+            if not index_path.exists():
+                continue
+            if start is not None or end is not None:
+                rng = self._read_range(segment_id)
+                if rng is not None and (
+                    rng[0] is None
+                    or (start is not None and rng[1] < start)
+                    or (end is not None and rng[0] > end)
+                ):
+                    continue
+            hits = []
+            with open(index_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 4:
+                        continue  # torn write at the tail of the index
+                    offset, length, epoch, uid = parts
+                    if user_id is not None and uid != user_id:
+                        continue
+                    if start is not None or end is not None:
+                        if not epoch:
+                            continue
+                        epoch = float(epoch)
+                        if start is not None and epoch < start:
+                            continue
+                        if end is not None and epoch > end:
+                            continue
+                    hits.append((int(offset), int(length)))
+            if not hits:
+                continue
+            with open(data_path, "rb") as fh:
+                for offset, length in hits:
+                    fh.seek(offset)
+                    results.append(json.loads(fh.read(length)))
+                    if limit is not None and len(results) >= limit:
+                        return results
+        return results
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+class AlertDispatcher:
+    """Background writer that drains a bounded queue into a journal.
+
+    ``submit`` blocks when the queue is full, so a burst of alerts applies
+    back-pressure instead of growing memory without bound. The worker
+    thread groups up to ``batch_size`` alerts per write, waiting at most
+    ``flush_interval`` seconds for a batch to fill.
+    """
+
+    _STOP = object()
+
+    def __init__(self, journal, queue_size=10000, batch_size=500,
+                 flush_interval=0.5):
+        self.journal = journal
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self._queue = queue.Queue(maxsize=int(queue_size))
+        self._thread = threading.Thread(
+            target=self._run, name="alert-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, alert, timeout=None):
+        self._queue.put(alert, timeout=timeout)
+
+    def submit_many(self, alerts, timeout=None):
+        for alert in alerts:
+            self._queue.put(alert, timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [] if item is self._STOP else [item]
+            stop = item is self._STOP
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self.journal.append_batch(batch)
+            except Exception as e:
+                logger.error(f"❌ Failed to write {len(batch)} alerts: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every submitted alert has been written."""
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self.journal.close()
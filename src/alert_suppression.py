@@ -0,0 +1,105 @@
+import json
+import os
+import time
+import numpy as np
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AlertSuppressor:
+    """Per-user alert state with cooldown and escalation rules.
+
+    The last alerted risk score and time are kept in two dicts keyed by
+    user id, so each lookup is O(1) and a whole results frame is checked
+    with ``Series.map``. A user is alerted again only when:
+
+    * they have never been alerted,
+    * their score moved into a higher band of ``score_bands``,
+    * their score rose by at least ``rearm_delta``, or
+    * ``cooldown_minutes`` have passed since the last alert.
+
+    State is persisted as JSON (written atomically) between runs.
+    """
+
+    def __init__(self, state_path, cooldown_minutes=24 * 60,
+                 rearm_delta=0.5, score_bands=(8.0, 8.5, 9.0, 9.5)):
+        self.state_path = state_path
+        self.cooldown_seconds = float(cooldown_minutes) * 60
+        self.rearm_delta = float(rearm_delta)
+        self.score_bands = np.asarray(sorted(score_bands), dtype=float)
+        self._last_score = {}
+        self._last_time = {}
+        self.load()
+
+    def load(self):
+        if not self.state_path.exists():
+            return
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self._last_score = state.get("last_score", {})
+        self._last_time = state.get("last_time", {})
+        logger.info(
+            f"Loaded alert state for {len(self._last_score)} users"
+        )
+
+    def save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "last_score": self._last_score,
+                    "last_time": self._last_time,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.state_path)
+
+    def _band(self, scores):
+        return np.searchsorted(self.score_bands, scores, side="right")
+
+    def filter(self, threats, now=None):
+        """Return the rows of ``threats`` that should raise an alert."""
+        if threats.empty:
+            return threats
+        now = time.time() if now is None else now
+
+        user_ids = threats["user_id"].astype(str)
+        scores = threats["risk_score"].to_numpy(dtype=float)
+        last_score = user_ids.map(self._last_score).to_numpy(dtype=float)
+        last_time = user_ids.map(self._last_time).to_numpy(dtype=float)
+
+        seen = ~np.isnan(last_score)
+        prev = np.where(seen, last_score, 0.0)
+        escalated = self._band(scores) > self._band(prev)
+        rose = scores - prev >= self.rearm_delta
+        elapsed = now - np.where(seen, last_time, 0.0)
+        expired = elapsed >= self.cooldown_seconds
+
+        mask = ~seen | escalated | rose | expired
+        suppressed = int((~mask).sum())
+        if suppressed:
+            logger.info(f"Suppressed {suppressed} repeat alerts")
+        return threats[mask]
+
+    def record(self, alerted, now=None):
+        """Remember the alerts just raised and persist the state."""
+        if alerted.empty:
+            return
+        now = time.time() if now is None else now
+        user_ids = alerted["user_id"].astype(str).tolist()
+        scores = alerted["risk_score"].astype(float).tolist()
+        self._last_score.update(zip(user_ids, scores))
+        self._last_time.update(dict.fromkeys(user_ids, float(now)))
+        self.save()
+
+    def reset(self, user_id=None):
+        """Forget one user's alert state, or everyone's."""
+        if user_id is None:
+            self._last_score.clear()
+            self._last_time.clear()
+        else:
+            self._last_score.pop(str(user_id), None)
+            self._last_time.pop(str(user_id), None)
+        self.save()
@@ -1,12 +1,47 @@
 import logging
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime
-from config import PATHS
+from config import PATHS, ALERT_CONFIG
+from alert_journal import AlertJournal, AlertDispatcher
+from alert_suppression import AlertSuppressor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Alert payload key -> results column
+THREAT_INDICATORS = {
+    'sensitive_files_accessed': 'sensitive_files_accessed',
+    'after_hours_access': 'after_hours_access',
+    'failed_login_rate': 'failed_login_rate',
+    'unique_locations': 'unique_locations',
+    'downloads': 'downloads_count',
+    'failed_activities': 'failed_activities'
+}
+INDICATOR_DTYPES = {
+    'sensitive_files_accessed': int,
+    'after_hours_access': int,
+    'failed_login_rate': float,
+    'unique_locations': int,
+    'downloads_count': int,
+    'failed_activities': int
+}
+RECOMMENDED_ACTIONS = [
+    'Immediately review user account activity',
+    'Check for unauthorized file access',
+    'Monitor network traffic from user IPs',
+    'Consider temporary access suspension',
+    'Escalate to Security Operations Center'
+]
+
+
+def _json_default(value):
+    """Serialize NumPy scalars left over from frame records"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
 
 class AlertSystem:
     def __init__(self):
@@ -16,72 +51,102 @@ class AlertSystem:
         self.results_df = pd.read_csv(results_path)
         self.alerts_dir = PATHS["reports"] / "alerts"
         self.alerts_dir.mkdir(exist_ok=True)
+        self.journal = AlertJournal(
+            ALERT_CONFIG['journal_dir'],
+            max_segment_bytes=ALERT_CONFIG['max_segment_bytes'],
+            fsync=ALERT_CONFIG['fsync']
+        )
+        self.dispatcher = AlertDispatcher(
+            self.journal,
+            queue_size=ALERT_CONFIG['queue_size'],
+            batch_size=ALERT_CONFIG['batch_size'],
+            flush_interval=ALERT_CONFIG['flush_interval']
+        )
+        self.suppressor = AlertSuppressor(
+            ALERT_CONFIG['state_path'],
+            cooldown_minutes=ALERT_CONFIG['cooldown_minutes'],
+            rearm_delta=ALERT_CONFIG['rearm_delta'],
+            score_bands=ALERT_CONFIG['score_bands']
+        )
 
-    def save_alert_to_file(self, alert_type, user_data):
-        """Save alert to JSON file"""
-        alert = {
-            'timestamp': datetime.now().isoformat(),
-            'alert_type': alert_type,
-            'severity': ('CRITICAL' if user_data['risk_score'] > 8.0
-                         else 'HIGH'),
-            'user_id': user_data['user_id'],
-            'risk_score': float(user_data['risk_score']),
-            'risk_level': user_data['risk_level'],
-            'confidence': float(user_data['confidence']),
-            'threat_indicators': {
-                'sensitive_files_accessed': int(
-                    user_data['sensitive_files_accessed']),
-                'after_hours_access': int(
-                    user_data['after_hours_access']),
-                'failed_login_rate': float(
-                    user_data['failed_login_rate']),
-                'unique_locations': int(
-                    user_data['unique_locations']),
-                'downloads': int(user_data['downloads_count']),
-                'failed_activities': int(
-                    user_data['failed_activities'])
-            },
-            'recommended_actions': [
-                'Immediately review user account activity',
-                'Check for unauthorized file access',
-                'Monitor network traffic from user IPs',
-                'Consider temporary access suspension',
-                'Escalate to Security Operations Center'
-            ]
-        }
+    def build_alerts(self, alert_type, threats):
+        """Build alert payloads column-wise from a results frame"""
+        if threats.empty:
+            return []
 
-        # Save individual alert
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"alert_{user_data['user_id']}_{timestamp}.json"
-        alert_file = self.alerts_dir / filename
-        with open(alert_file, 'w') as f:
-            json.dump(alert, f, indent=2)
+        # Cast each column once instead of per-row int()/float() calls
+        indicators = threats[list(THREAT_INDICATORS.values())].astype(
+            INDICATOR_DTYPES
+        )
+        indicators.columns = list(THREAT_INDICATORS)
+        scores = threats['risk_score'].astype(float)
+        severity = np.where(scores > 8.0, 'CRITICAL', 'HIGH').tolist()
+
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                'timestamp': timestamp,
+                'alert_type': alert_type,
+                'severity': sev,
+                'user_id': user_id,
+                'risk_score': score,
+                'risk_level': level,
+                'confidence': confidence,
+                'threat_indicators': indicator,
+                'recommended_actions': RECOMMENDED_ACTIONS
+            }
+            for sev, user_id, score, level, confidence, indicator in zip(
+                severity,
+                threats['user_id'].tolist(),
+                scores.tolist(),
+                threats['risk_level'].astype(str).tolist(),
+                threats['confidence'].astype(float).tolist(),
+                indicators.to_dict('records')
+            )
+        ]
 
-        logger.info(f"✅ Alert saved: {alert_file.name}")
+    def save_alerts(self, alert_type, threats):
+        """Queue one alert per row of ``threats`` for the journal writer"""
+        alerts = self.build_alerts(alert_type, threats)
+        self.dispatcher.submit_many(alerts)
+        return alerts
+
+    def save_alert_to_file(self, alert_type, user_data):
+        """Queue alert for the background writer to append to the journal"""
+        alert = self.save_alerts(alert_type, user_data.to_frame().T)[0]
+        logger.debug(f"Alert queued: {alert['user_id']}")
         return alert
 
+    def query_alerts(self, user_id=None, start=None, end=None, limit=None):
+        """Read alerts back from the journal by user and/or time range"""
+        self.dispatcher.flush()
+        return self.journal.query(
+            user_id=user_id, start=start, end=end, limit=limit
+        )
+
+    def close(self):
+        """Write any queued alerts and stop the background writer"""
+        self.dispatcher.close()
+
     def generate_incident_report(self, threats):
         """Generate consolidated incident report"""
+        records = threats[['user_id', 'risk_score', 'confidence']].astype(
+            {'risk_score': float, 'confidence': float}
+        )
+        records.insert(0, 'rank', np.arange(1, len(records) + 1))
+
         report = {
             'report_generated': datetime.now().isoformat(),
             'total_alerts': len(threats),
-            'critical_count': len(threats[threats['risk_score'] > 8.5]),
-            'threats': []
+            'critical_count': int((threats['risk_score'] > 8.5).sum()),
+            'threats': records.to_dict('records')
         }
 
-        for _, threat in threats.iterrows():
-            report['threats'].append({
-                'rank': len(report['threats']) + 1,
-                'user_id': threat['user_id'],
-                'risk_score': float(threat['risk_score']),
-                'confidence': float(threat['confidence'])
-            })
-
         # Save incident report
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         report_file = self.alerts_dir / f"incident_report_{timestamp}.json"
         with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+            f.write(json.dumps(report, indent=2, default=_json_default))
 
         logger.info(f"✅ Incident report saved: {report_file.name}")
         return report
@@ -98,26 +163,34 @@ class AlertSystem:
 
         logger.info(f"Found {len(critical_threats)} critical threats\n")
 
-        # Generate individual alerts
-        for _, threat in critical_threats.iterrows():
-            user_id = threat['user_id']
-            risk_score = threat['risk_score']
-            logger.info(f"🚨 ALERT: {user_id} - Risk: {risk_score:.1f}")
-            self.save_alert_to_file('CRITICAL_THREAT', threat)
+        # Skip users already alerted with no material change since
+        new_threats = self.suppressor.filter(critical_threats)
+
+        # Generate individual alerts in one pass over the frame
+        if len(new_threats) > 0:
+            logger.info("\n".join(
+                "🚨 ALERT: " + new_threats['user_id'].astype(str)
+                + " - Risk: "
+                + new_threats['risk_score'].map('{:.1f}'.format)
+            ))
+        self.save_alerts('CRITICAL_THREAT', new_threats)
 
         # Generate consolidated incident report
-        if len(critical_threats) > 0:
-            self.generate_incident_report(critical_threats)
+        if len(new_threats) > 0:
+            self.generate_incident_report(new_threats)
+
+        self.dispatcher.flush()
+        self.suppressor.record(new_threats)
 
         logger.info("\n✅ Monitoring complete.")
         logger.info(
-            f"✅ {len(critical_threats)} alerts saved to: "
-            f"{self.alerts_dir}"
+            f"✅ {len(new_threats)} alerts saved to: "
+            f"{self.journal.directory}"
         )
         logger.info("="*60)
 
         # Print alert summary
-        self.print_alert_summary(critical_threats)
+        self.print_alert_summary(new_threats)
 
     def print_alert_summary(self, threats):
         """Print alert summary table"""
@@ -125,18 +198,19 @@ class AlertSystem:
         logger.info("-"*60)
         logger.info(f"{'User ID':<15} {'Risk Score':<15} {'Confidence':<15}")
         logger.info("-"*60)
-       
-        for _, threat in threats.iterrows():
-            alert_line = (
-                f"{threat['user_id']:<15} "
-                f"{threat['risk_score']:<15.1f} "
-                f"{threat['confidence']:<15.1f}%"
+
+        if len(threats) > 0:
+            rows = (
+                threats['user_id'].astype(str).str.ljust(15) + " "
+                + threats['risk_score'].map('{:<15.1f}'.format) + " "
+                + threats['confidence'].map('{:<15.1f}%'.format)
             )
-            logger.info(alert_line)
-    
+            logger.info("\n".join(rows))
+
         logger.info("-"*60)
 
 
 if __name__ == "__main__":
     alert_system = AlertSystem()
     alert_system.monitor_and_alert()
+    alert_system.close()
@@ -18,14 +18,55 @@ RANDOM_FOREST_WEIGHT = 0.3
 
 
 class AnomalyDetector:
-    """Enhanced anomaly detection with error handling and logging"""
+    """Enhanced anomaly detection with error handling and logging
 
-    def __init__(self, model_paths=None):
+    With ``follow_registry`` the models come from the promoted registry
+    version (scaled with its scaler) and are hot-swapped when a new
+    version is promoted; each ``detect_anomalies`` call scores with one
+    consistent snapshot.
+    """
+
+    def __init__(self, model_paths=None, follow_registry=False):
         """Initialize detector with optional custom model paths"""
         self.model_paths = model_paths or MODEL_PATHS
         self.iso_forest = None
         self.random_forest = None
-        self._load_models()
+        self._live = None
+        if follow_registry:
+            from model_registry import HotSwapModels
+            self._live = HotSwapModels(prepare=self._prepare_deployed)
+        else:
+            self._load_models()
+
+    @staticmethod
+    def _prepare_deployed(deployed):
+        """Pick this detector's models out of a registry version."""
+        from model_registry import warm_up
+
+        models = deployed["models"]
+        warm_up(models)
+        supervised = models.get("calibrated")
+        if supervised is None:
+            supervised = models["supervised"]
+        return {
+            "version": deployed["version"],
+            "iso_forest": models["iso_forest"],
+            "random_forest": supervised,
+            "scaler": models.get("scaler"),
+            "feature_columns": models.get("feature_columns"),
+        }
+
+    def _models(self):
+        """The models for one call; never changes mid-call."""
+        if self._live is not None:
+            return self._live.current
+        return {
+            "version": None,
+            "iso_forest": self.iso_forest,
+            "random_forest": self.random_forest,
+            "scaler": None,
+            "feature_columns": None,
+        }
 
     def _load_models(self):
         """Load pre-trained models with error handling"""
@@ -37,21 +78,26 @@ class AnomalyDetector:
             logger.error(f"Models not found: {e}")
             raise
 
-    def _validate_input(self, features):
+    def _validate_input(self, features, models=None):
         """Validate input data"""
         if features is None or features.empty:
             raise ValueError("Input features cannot be empty")
+        if models and models["feature_columns"]:
+            numeric = features[models["feature_columns"]].to_numpy(float)
+            return models["scaler"].transform(numeric)
         return features.select_dtypes(include=["int64", "float64"])
 
-    def _calculate_iso_scores(self, numeric_features):
+    def _calculate_iso_scores(self, numeric_features, models=None):
         """Calculate IsolationForest anomaly scores"""
-        scores = self.iso_forest.score_samples(numeric_features)
+        iso_forest = (models or self._models())["iso_forest"]
+        scores = iso_forest.score_samples(numeric_features)
         # Sigmoid normalization: convert to 0-1 range
         return 1 / (1 + np.exp(scores))
 
-    def _calculate_rf_scores(self, numeric_features):
+    def _calculate_rf_scores(self, numeric_features, models=None):
         """Calculate RandomForest anomaly probabilities"""
-        probabilities = self.random_forest.predict_proba(numeric_features)
+        random_forest = (models or self._models())["random_forest"]
+        probabilities = random_forest.predict_proba(numeric_features)
         return probabilities[:, 1]  # Probability of anomaly class
 
     def _compute_hybrid_scores(self, iso_scores, rf_scores):
@@ -78,12 +124,15 @@ class AnomalyDetector:
             FileNotFoundError: If models not found
         """
         try:
+            # One snapshot for the whole call, even if a swap lands now
+            models = self._models()
+
             # Validate and extract numeric features
-            numeric_features = self._validate_input(features)
+            numeric_features = self._validate_input(features, models)
 
             # Calculate scores from both models
-            iso_scores = self._calculate_iso_scores(numeric_features)
-            rf_scores = self._calculate_rf_scores(numeric_features)
+            iso_scores = self._calculate_iso_scores(numeric_features, models)
+            rf_scores = self._calculate_rf_scores(numeric_features, models)
 
             # Compute hybrid scores
             hybrid_scores = self._compute_hybrid_scores(iso_scores, rf_scores)
@@ -4,7 +4,12 @@ import logging
 from datetime import datetime
 import pandas as pd
 from config import PATHS
-import pickle
+import threading
+from explainability import (
+    ExplanationService, MicroBatchExplainer, get_tree_explainer,
+    published_version
+)
+from model_registry import HotSwapModels, load_pickled, warm_up
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,15 +17,73 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'insider-threat-api-key-2026'
 
-# Load model & results
-with open(PATHS["models"] / "calibrated_supervised.pkl", 'rb') as f:
-    model = pickle.load(f)
+
+def _build_explainer(deployed):
+    """Micro-batching explainer over a version's supervised model, with
+    the pickled model loaded and its SHAP explainer built."""
+    service = ExplanationService(
+        load_pickled(deployed, "supervised"),
+        deployed["models"]["feature_columns"],
+        version=published_version(deployed["manifest"])
+    )
+    get_tree_explainer(service.model, service.version)
+    logger.info(f"Explainer ready (model version {service.version[:12]})")
+    return MicroBatchExplainer(service)
+
+
+def _prepare(deployed):
+    warm_up(deployed["models"])
+    return deployed
+
+
+def _prepare_swap(deployed):
+    """A swapped-in version goes live with its explainer ready, so no
+    request pays for unpickling the model or building SHAP."""
+    deployed = _prepare(deployed)
+    deployed["explainer"] = _build_explainer(deployed)
+    return deployed
+
+
+# Guards the lazy build and retirement of a version's explainer
+_explainer_lock = threading.Lock()
+
+
+def _retire(deployed):
+    with _explainer_lock:
+        # Nothing builds an explainer for a retired version any more
+        explainer = deployed.setdefault("explainer", None)
+    if explainer is not None:
+        # Rows already queued on the old version are still answered
+        explainer.close()
+
+
+# Models: one registry version at a time (pinned via MODEL_VERSION, else
+# the promoted one, swapped live on promotion). Handlers read
+# serving.current once and use that snapshot for the whole request.
+# The startup version's explainer is built on the first /explain (SHAP
+# and the pickle stay off the cold start); swaps prepare theirs first.
+serving = HotSwapModels(prepare=_prepare, retire=_retire)
+serving.prepare = _prepare_swap
 
 results_df = pd.read_csv(
     PATHS["reports"] / "detailed_results_20260217_122948.csv"
 )
 
 
+def get_explainer():
+    """Micro-batching explainer over the serving supervised model, and
+    the scaler of the same version."""
+    deployed = serving.current
+    with _explainer_lock:
+        if "explainer" not in deployed:
+            deployed["explainer"] = _build_explainer(deployed)
+        batcher = deployed["explainer"]
+    if batcher is None:
+        # Retired before its explainer was built: use the new version
+        return get_explainer()
+    return batcher, deployed["models"]["scaler"]
+
+
 # API Key validation
 def require_api_key(f):
     @wraps(f)
@@ -153,6 +216,30 @@ def user_profile(user_id):
         }
     })
 
+
+@app.route('/api/v1/user/<user_id>/explain', methods=['GET'])
+@require_api_key
+def explain_user(user_id):
+    """Top feature contributions behind a user's supervised score"""
+    user_data = results_df[results_df['user_id'] == user_id]
+    if user_data.empty:
+        return jsonify({'error': 'User not found'}), 404
+
+    batcher, scaler = get_explainer()
+    service = batcher.service
+    row = user_data.iloc[0][service.feature_names].to_numpy(dtype=float)
+    idx, values = batcher.explain_row(scaler.transform(row.reshape(1, -1)))
+
+    return jsonify({
+        'user_id': user_id,
+        'model_version': service.version,
+        'top_features': [
+            {'feature': service.feature_names[j], 'contribution': float(v)}
+            for j, v in zip(idx, values)
+        ],
+        'timestamp': datetime.now().isoformat()
+    })
+
 # ============ HEALTH & MONITORING ============
 
 
@@ -164,6 +251,7 @@ def health():
         'version': '1.0.0',
         'timestamp': datetime.now().isoformat(),
         'model_status': 'loaded',
+        'model_version': serving.version,
         'data_points': len(results_df)
     })
 
@@ -4,8 +4,9 @@ from functools import wraps
 from flask import Flask, jsonify, request
 from datetime import datetime
 from flask_cors import CORS
-import plotly.express as px
-import plotly.graph_objects as go
+# plotly loads on the first chart request, not at startup
+from lazy_imports import plotly_express as px
+from lazy_imports import plotly_graph_objects as go
 import traceback
 import sys
 
@@ -8,10 +8,21 @@ import random
 from datetime import datetime, timedelta
 import math
 
+import numpy as np
+
+try:
+    from .state_store import get_state_store
+except ImportError:  # launched as `python src/app.py`
+    from state_store import get_state_store
+
 
 app = Flask(__name__)
 app.secret_key = 'insider_threat_demo_key_2026'
 
+# User statuses, roles and the populated flag live in a pluggable backend so
+# several worker processes share one view (INSIDER_STATE_BACKEND=sqlite).
+state_store = get_state_store()
+
 
 # ---------------------------------------------------------------------------
 # Formal Risk Scoring Model
@@ -27,6 +38,89 @@ RISK_WEIGHTS = {
 }
 
 
+# Base factor boost per account status (unknown statuses count as Normal)
+STATUS_BOOST = {
+    'Alert':      0.55,
+    'Blocked':    0.70,
+    'Restricted': 0.50,
+    'Active':     0.20,
+    'Normal':     0.10,
+}
+_DEFAULT_STATUS_BOOST = 0.10
+
+# Level order shared by the level and colour index arrays
+RISK_LEVELS = np.array(['Low', 'Medium', 'High', 'Critical'])
+_LEVEL_CUTS = np.array([2.5, 5.0, 7.5])
+
+# Per-factor noise ceilings, in the order of RISK_WEIGHTS
+_FACTOR_NOISE = np.array([0.40, 0.35, 0.30, 0.25])
+_FACTOR_BOOST = np.array([1.0, 0.8, 0.6, 0.0])
+_WEIGHT_VECTOR = np.array(list(RISK_WEIGHTS.values()))
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _user_uniforms(user_ids: np.ndarray, n_streams: int) -> np.ndarray:
+    """Return ``(len(user_ids), n_streams)`` uniforms in [0, 1).
+
+    SplitMix64 over (user_id * 31337, stream): stateless, so every user
+    gets the same draws no matter how the population is batched.
+    """
+    seeds = user_ids.astype(np.uint64) * np.uint64(31337)
+    out = np.empty((len(seeds), n_streams))
+    with np.errstate(over='ignore'):
+        for k in range(n_streams):
+            x = seeds + _GOLDEN_GAMMA * np.uint64(k + 1)
+            x = (x ^ (x >> np.uint64(30))) * _MIX_1
+            x = (x ^ (x >> np.uint64(27))) * _MIX_2
+            x ^= x >> np.uint64(31)
+            out[:, k] = (x >> np.uint64(11)) * (1.0 / (1 << 53))
+    return out
+
+
+def _status_boosts(statuses) -> np.ndarray:
+    statuses = np.asarray(statuses)
+    if statuses.dtype.kind in 'iu':
+        # Integer codes index into STATUS_BOOST's key order
+        table = np.array(list(STATUS_BOOST.values()))
+        return table[statuses]
+    uniq, inverse = np.unique(statuses.astype(str), return_inverse=True)
+    table = np.array([
+        STATUS_BOOST.get(s, _DEFAULT_STATUS_BOOST) for s in uniq
+    ])
+    return table[inverse.reshape(-1)]
+
+
+def compute_risk_scores(user_ids, statuses) -> dict:
+    """Score a whole population in one vectorized call.
+
+    ``statuses`` holds status names, or integer codes in the key order of
+    ``STATUS_BOOST``. Returns arrays aligned with ``user_ids``: ``score``
+    (0-10, one decimal), ``level`` (names), ``color_index`` (index into
+    ``RISK_LEVELS``) and ``breakdown`` (N x 4, columns in ``RISK_WEIGHTS``
+    order, two decimals).
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+    boost = _status_boosts(statuses)
+
+    factors = _user_uniforms(user_ids, len(_FACTOR_NOISE)) * _FACTOR_NOISE
+    factors += boost[:, None] * _FACTOR_BOOST
+    np.minimum(factors, 1.0, out=factors)
+
+    weighted = factors * (_WEIGHT_VECTOR * 10)
+    score = np.round(np.clip(weighted.sum(axis=1), 0.0, 10.0), 1)
+    color_index = np.searchsorted(_LEVEL_CUTS, score, side='right')
+
+    return {
+        'score': score,
+        'level': RISK_LEVELS[color_index],
+        'color_index': color_index,
+        'breakdown': np.round(weighted, 2),
+    }
+
+
 def compute_risk_score(user_id: int, status: str) -> dict:
     """Return a deterministic formal risk score for a user.
 
@@ -34,49 +128,13 @@ def compute_risk_score(user_id: int, status: str) -> dict:
     A fixed seed derived from user_id ensures scores are stable across
     page reloads while still varying per user.
     """
-    rng = random.Random(user_id * 31337)
-
-    # Base factors depend on account status
-    status_boost = {
-        'Alert':      0.55,
-        'Blocked':    0.70,
-        'Restricted': 0.50,
-        'Active':     0.20,
-        'Normal':     0.10,
-    }.get(status, 0.10)
-
-    anomaly_factor   = min(1.0, status_boost + rng.uniform(0.00, 0.40))
-    sensitive_factor = min(1.0, status_boost * 0.8 + rng.uniform(0.00, 0.35))
-    login_factor     = min(1.0, status_boost * 0.6 + rng.uniform(0.00, 0.30))
-    behavioral_factor = rng.uniform(0.00, 0.25)
-
-    raw_score = (
-        RISK_WEIGHTS['anomaly']          * anomaly_factor +
-        RISK_WEIGHTS['sensitive_access'] * sensitive_factor +
-        RISK_WEIGHTS['login_anomaly']    * login_factor +
-        RISK_WEIGHTS['behavioral']       * behavioral_factor
-    ) * 10
-
-    score = round(min(10.0, max(0.0, raw_score)), 1)
-
-    if score >= 7.5:
-        level = 'Critical'
-    elif score >= 5.0:
-        level = 'High'
-    elif score >= 2.5:
-        level = 'Medium'
-    else:
-        level = 'Low'
-
+    rd = compute_risk_scores([user_id], [status])
     return {
-        'score': score,
-        'level': level,
-        'breakdown': {
-            'anomaly':          round(anomaly_factor   * RISK_WEIGHTS['anomaly']          * 10, 2),
-            'sensitive_access': round(sensitive_factor * RISK_WEIGHTS['sensitive_access'] * 10, 2),
-            'login_anomaly':    round(login_factor     * RISK_WEIGHTS['login_anomaly']    * 10, 2),
-            'behavioral':       round(behavioral_factor * RISK_WEIGHTS['behavioral']      * 10, 2),
-        }
+        'score': float(rd['score'][0]),
+        'level': str(rd['level'][0]),
+        'breakdown': dict(zip(
+            RISK_WEIGHTS, (float(v) for v in rd['breakdown'][0])
+        )),
     }
 
 
@@ -86,16 +144,31 @@ LEVEL_COLORS = {
     'Medium':   'info',
     'Low':      'success',
 }
+_COLOR_NAMES = [LEVEL_COLORS[level] for level in RISK_LEVELS]
 
 
 def enrich_user_risk(user: dict) -> dict:
     """Attach risk fields to a user dict in-place and return it."""
-    rd = compute_risk_score(user['id'], user.get('status', 'Normal'))
-    user['risk_score'] = rd['score']
-    user['risk_level'] = rd['level']
-    user['risk_color'] = LEVEL_COLORS[rd['level']]
-    user['risk_breakdown'] = rd['breakdown']
-    return user
+    return enrich_users_risk([user])[0]
+
+
+def enrich_users_risk(user_list: list) -> list:
+    """Attach risk fields to every user dict with one vectorized call."""
+    if not user_list:
+        return user_list
+    rd = compute_risk_scores(
+        [u['id'] for u in user_list],
+        [u.get('status', 'Normal') for u in user_list],
+    )
+    scores = rd['score'].tolist()
+    colors = rd['color_index'].tolist()
+    breakdowns = rd['breakdown'].tolist()
+    for u, score, ci, bd in zip(user_list, scores, colors, breakdowns):
+        u['risk_score'] = score
+        u['risk_level'] = str(RISK_LEVELS[ci])
+        u['risk_color'] = _COLOR_NAMES[ci]
+        u['risk_breakdown'] = dict(zip(RISK_WEIGHTS, bd))
+    return user_list
 
 
 @app.route('/favicon.ico')
@@ -164,7 +237,8 @@ _populated = False
 
 def populate_random_users(count=50):
     global _populated
-    if _populated:
+    if _populated or state_store.get_flag('populated') == '1':
+        _populated = True
         return
     first_names = [
         'Rahul', 'Saurabh', 'Vikram', 'Rohit', 'Sanjay', 'Karan', 'Rakesh',
@@ -202,14 +276,41 @@ def populate_random_users(count=50):
             'password': f'pass{start_id + i}'
         })
     _populated = True
+    state_store.set_flag('populated', '1')
 
 
 # ensure there are many users
 populate_random_users(50)
 
+# The first process to start seeds the store; everyone adopts its records
+users[:] = state_store.seed_users(users)
+_users_by_id = {u['id']: u for u in users}
+
 # Attach risk scores to all users once at startup
-for _u in users:
-    enrich_user_risk(_u)
+enrich_users_risk(users)
+
+
+def update_user_state(user, **fields):
+    """Apply an admin change locally and persist it for other workers."""
+    user.update(fields)
+    state_store.update_user(user['id'], **fields)
+    enrich_user_risk(user)
+
+
+@app.before_request
+def sync_user_state():
+    """Pull rows changed by other workers since this worker last synced."""
+    refreshed = []
+    for changed in state_store.changes():
+        user = _users_by_id.get(changed['id'])
+        if user is None:
+            user = changed
+            users.append(user)
+            _users_by_id[user['id']] = user
+        else:
+            user.update(changed)
+        refreshed.append(user)
+    enrich_users_risk(refreshed)
 
 
 @app.route('/')
@@ -229,8 +330,7 @@ def dashboard():
         None
     )
     # Re-enrich risk scores (status may have changed since startup)
-    for _u in users:
-        enrich_user_risk(_u)
+    enrich_users_risk(users)
 
     # --- Summary statistics ---
     total_users = len(users)
@@ -322,8 +422,7 @@ def threats():
 @app.route('/api/v1/risk')
 def risk_api():
     """Return risk scores for all users — demo API endpoint."""
-    for _u in users:
-        enrich_user_risk(_u)
+    enrich_users_risk(users)
     payload = [
         {
             'id':         u['id'],
@@ -366,7 +465,7 @@ def logout():
 
 
 def get_user_by_id(user_id):
-    return next((u for u in users if u.get('id') == user_id), None)
+    return _users_by_id.get(user_id)
 
 
 def get_user_by_username(username):
@@ -383,7 +482,7 @@ def restrict_user(user_id):
     if not u:
         flash('User not found', 'danger')
         return redirect(url_for('dashboard'))
-    u['status'] = 'Restricted'
+    update_user_state(u, status='Restricted')
     flash(f"User {u['name']} restricted", 'success')
     return redirect(url_for('dashboard'))
 
@@ -398,7 +497,7 @@ def block_user(user_id):
     if not u:
         flash('User not found', 'danger')
         return redirect(url_for('dashboard'))
-    u['status'] = 'Blocked'
+    update_user_state(u, status='Blocked')
     flash(f"User {u['name']} blocked", 'success')
     return redirect(url_for('dashboard'))
 
@@ -413,7 +512,7 @@ def unblock_user(user_id):
     if not u:
         flash('User not found', 'danger')
         return redirect(url_for('dashboard'))
-    u['status'] = 'Active'
+    update_user_state(u, status='Active')
     flash(f"User {u['name']} unblocked", 'success')
     return redirect(url_for('dashboard'))
 
@@ -445,7 +544,7 @@ def set_role(user_id):
     if not u:
         flash('User not found', 'danger')
         return redirect(url_for('dashboard'))
-    u['role'] = new_role
+    update_user_state(u, role=new_role)
     flash(f"User {u['name']} role set to {new_role}", 'success')
     return redirect(url_for('dashboard'))
 
@@ -0,0 +1,187 @@
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+NEIGHBOR_BACKENDS = ("auto", "kd_tree", "ball_tree", "random_projection")
+
+
+def _rp_leaves(X, leaf_size, rng):
+    """Order rows into leaves of a random-projection tree.
+
+    Every level splits each node at the median of its rows' projection on
+    a fresh random direction. Returns ``(order, leaf)`` with rows grouped
+    contiguously by leaf id.
+    """
+    n = len(X)
+    node = np.zeros(n, dtype=np.int64)
+    depth = max(0, int(np.ceil(np.log2(max(1, n / leaf_size)))))
+    for _ in range(depth):
+        direction = rng.normal(size=X.shape[1]).astype(X.dtype, copy=False)
+        order = np.lexsort((X @ direction, node))
+        sorted_node = node[order]
+        starts = np.flatnonzero(
+            np.r_[True, sorted_node[1:] != sorted_node[:-1]]
+        )
+        sizes = np.diff(np.r_[starts, n])
+        group_start = np.repeat(starts, sizes)
+        rank = np.arange(n) - group_start
+        right = rank >= np.repeat(sizes // 2, sizes)
+        node[order] = 2 * sorted_node + right
+    order = np.argsort(node, kind="stable")
+    return order, node[order]
+
+
+def random_projection_neighbors(X, k, n_trees=4, leaf_size=64,
+                                random_state=42):
+    """Approximate k nearest neighbours of every row of ``X`` (self
+    excluded) with a small random-projection forest.
+
+    Each tree splits the rows at the median of random projections until
+    leaves hold about ``leaf_size`` rows; neighbours are searched exactly
+    within each leaf and the best ``k`` over ``n_trees`` trees are kept.
+    Cost is O(n log n) per tree plus O(n * leaf_size) distances.
+    """
+    X = np.asarray(X)
+    n = len(X)
+    leaf_size = max(int(leaf_size), k + 1)
+    rng = np.random.default_rng(random_state)
+    best_idx = np.full((n, k), -1, dtype=np.int64)
+    best_dist = np.full((n, k), np.inf)
+
+    for _ in range(n_trees):
+        order, leaf = _rp_leaves(X, leaf_size, rng)
+        bounds = np.flatnonzero(np.r_[True, leaf[1:] != leaf[:-1], True])
+        tree_idx = np.full((n, k), -1, dtype=np.int64)
+        tree_dist = np.full((n, k), np.inf)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            rows = order[lo:hi]
+            pts = X[rows]
+            sq = np.einsum("ij,ij->i", pts, pts)
+            dist = sq[:, None] + sq[None, :] - 2 * (pts @ pts.T)
+            np.fill_diagonal(dist, np.inf)
+            m = min(k, len(rows) - 1)
+            if m < 1:
+                continue
+            nearest = np.argpartition(dist, m - 1, axis=1)[:, :m]
+            tree_idx[rows, :m] = rows[nearest]
+            tree_dist[rows, :m] = np.take_along_axis(dist, nearest, axis=1)
+
+        # Merge with the previous trees' best k, dropping repeats
+        idx = np.hstack([best_idx, tree_idx])
+        dist = np.hstack([best_dist, tree_dist])
+        by_idx = np.argsort(idx, axis=1, kind="stable")
+        idx = np.take_along_axis(idx, by_idx, axis=1)
+        dist = np.take_along_axis(dist, by_idx, axis=1)
+        dist[:, 1:][idx[:, 1:] == idx[:, :-1]] = np.inf
+        dist[idx < 0] = np.inf
+        keep = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        best_idx = np.take_along_axis(idx, keep, axis=1)
+        best_dist = np.take_along_axis(dist, keep, axis=1)
+
+    # Rows whose leaves were too small keep a random fallback neighbour
+    missing = best_idx < 0
+    if missing.any():
+        best_idx[missing] = rng.integers(n, size=int(missing.sum()))
+    return best_idx
+
+
+class MinorityOversampler:
+    """SMOTE-style oversampling with a pluggable neighbour search.
+
+    Neighbours are searched within each minority class only, using a KD
+    tree, a ball tree or an approximate random-projection forest
+    (``neighbors="random_projection"``). ``neighbors=None`` duplicates
+    random minority rows instead of interpolating. All random draws are
+    made up front from ``random_state``, so results do not depend on
+    ``chunk_rows``; synthetic rows are written chunk by chunk into one
+    preallocated output array.
+
+    ``sampling_strategy`` is the target minority/majority ratio, as for
+    imblearn's ``SMOTE``.
+    """
+
+    def __init__(self, sampling_strategy=1.0, k_neighbors=5,
+                 neighbors="auto", n_trees=4, leaf_size=64,
+                 ann_min_rows=50000, chunk_rows=100000, random_state=42):
+        self.sampling_strategy = sampling_strategy
+        self.k_neighbors = k_neighbors
+        self.neighbors = neighbors
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.ann_min_rows = ann_min_rows
+        self.chunk_rows = chunk_rows
+        self.random_state = random_state
+
+    def _resolve_backend(self, n_rows, n_features):
+        if self.neighbors not in NEIGHBOR_BACKENDS:
+            raise ValueError(f"Unknown neighbor backend: {self.neighbors}")
+        if self.neighbors != "auto":
+            return self.neighbors
+        if n_rows >= self.ann_min_rows:
+            return "random_projection"
+        # KD trees lose their edge in higher dimensions
+        return "kd_tree" if n_features <= 16 else "ball_tree"
+
+    def _neighbors(self, X_class, k):
+        backend = self._resolve_backend(*X_class.shape)
+        if backend == "random_projection":
+            return random_projection_neighbors(
+                X_class, k, n_trees=self.n_trees,
+                leaf_size=self.leaf_size, random_state=self.random_state
+            )
+        nn = NearestNeighbors(n_neighbors=k + 1, algorithm=backend)
+        nn.fit(X_class)
+        return nn.kneighbors(X_class, return_distance=False)[:, 1:]
+
+    def _targets(self, y):
+        values, counts = np.unique(y, return_counts=True)
+        target = int(self.sampling_strategy * counts.max())
+        return {
+            v: target - c for v, c in zip(values, counts) if target > c
+        }
+
+    def fit_resample(self, X, y):
+        X = np.asarray(X)
+        y = np.asarray(y)
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(float)
+        targets = self._targets(y)
+        n_new = sum(targets.values())
+        if n_new == 0:
+            return X, y
+
+        X_out = np.empty((len(X) + n_new, X.shape[1]), dtype=X.dtype)
+        y_out = np.empty(len(y) + n_new, dtype=y.dtype)
+        X_out[:len(X)] = X
+        y_out[:len(y)] = y
+
+        rng = np.random.default_rng(self.random_state)
+        pos = len(X)
+        for cls, n_cls in targets.items():
+            X_class = X[y == cls]
+            k = min(int(self.k_neighbors), len(X_class) - 1)
+            base = rng.integers(len(X_class), size=n_cls)
+            if self.neighbors is None or k < 1:
+                self._write_duplicates(X_out, pos, X_class, base)
+            else:
+                nn = self._neighbors(X_class, k)
+                pick = nn[base, rng.integers(k, size=n_cls)]
+                gap = rng.random(n_cls).astype(X.dtype)
+                self._write_interpolated(X_out, pos, X_class, base, pick, gap)
+            y_out[pos:pos + n_cls] = cls
+            pos += n_cls
+        return X_out, y_out
+
+    def _write_duplicates(self, X_out, pos, X_class, base):
+        for start in range(0, len(base), self.chunk_rows):
+            idx = base[start:start + self.chunk_rows]
+            X_out[pos + start:pos + start + len(idx)] = X_class[idx]
+
+    def _write_interpolated(self, X_out, pos, X_class, base, pick, gap):
+        for start in range(0, len(base), self.chunk_rows):
+            stop = min(start + self.chunk_rows, len(base))
+            a = X_class[base[start:stop]]
+            b = X_class[pick[start:stop]]
+            out = X_out[pos + start:pos + stop]
+            np.subtract(b, a, out=out)
+            out *= gap[start:stop, None]
+            out += a
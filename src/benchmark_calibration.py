@@ -0,0 +1,80 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, brier_score_loss
+from sklearn.model_selection import train_test_split
+from model_trainer import HybridModelTrainer
+from config import PATHS, MODEL_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = [
+    ("refit", True),
+    ("holdout", True),
+    ("oof", True),
+    ("oof", False),
+]
+
+
+def load_balanced():
+    X_df = pd.read_csv(PATHS["data"] / "features_balanced.csv")
+    user_ids = X_df['user_id'].values
+    X = X_df.drop('user_id', axis=1).values
+    threat_labels = pd.read_csv(PATHS["data"] / "threat_labels_balanced.csv")
+    y = threat_labels.set_index('user_id').loc[user_ids, 'is_threat'].values
+    return X, y
+
+
+def benchmark_calibration(X, y):
+    """Time supervised fit + calibration for each calibration mode."""
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=42
+    )
+    cfg = MODEL_CONFIG["random_forest"]
+    saved = {k: cfg.get(k) for k in ("calibration_mode",
+                                     "calibration_ensemble")}
+    rows = []
+    try:
+        for mode, ensemble in MODES:
+            cfg["calibration_mode"] = mode
+            cfg["calibration_ensemble"] = ensemble
+            trainer = HybridModelTrainer()
+
+            start = time.perf_counter()
+            trainer.train_supervised_calibrated(X_train, y_train)
+            if trainer.calibrated_rf is None:
+                trainer.calibrate(X_train, y_train)
+            elapsed = time.perf_counter() - start
+
+            probs = trainer.get_supervised_probs(X_test)
+            rows.append({
+                "mode": mode if mode != "oof" else (
+                    "oof_ensemble" if ensemble else "oof_full_refit"
+                ),
+                "seconds": round(elapsed, 3),
+                "brier": round(brier_score_loss(y_test, probs), 4),
+                "pr_auc": round(average_precision_score(y_test, probs), 4),
+            })
+            logger.info(rows[-1])
+    finally:
+        cfg.update(saved)
+
+    df = pd.DataFrame(rows)
+    baseline = df.loc[df["mode"] == "refit", "seconds"].iloc[0]
+    df["time_saved_pct"] = (
+        (1 - df["seconds"] / baseline) * 100
+    ).round(1)
+    return df
+
+
+if __name__ == "__main__":
+    X, y = load_balanced()
+    logger.info(f"Data shape: X={X.shape}, positives={int(np.sum(y))}")
+    df = benchmark_calibration(X, y)
+    print(df.to_string(index=False))
+    out_path = PATHS["reports"] / "benchmark_calibration.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out_path, index=False)
+    logger.info(f"✅ Benchmark saved: {out_path}")
@@ -0,0 +1,144 @@
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from data_pipeline import DataPipeline
+from risk_scorer import RiskScorer
+from config import PATHS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 24  # matches the engineered feature set
+RATIO_COLUMNS = ["sensitive_files_accessed", "failed_logins",
+                 "unique_locations"]
+
+
+def make_features(n_users, seed=42, nan_rate=0.0):
+    """Synthetic raw features with the columns RiskScorer reads;
+    ``nan_rate`` of the ratio columns' values are missing."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        rng.gamma(2.0, 2.0, size=(n_users, N_FEATURES - 3)),
+        columns=[f"feature_{i}" for i in range(N_FEATURES - 3)],
+    )
+    df["sensitive_files_accessed"] = rng.poisson(3, n_users)
+    df["failed_logins"] = rng.poisson(2, n_users)
+    df["unique_locations"] = rng.integers(1, 6, n_users)
+    for column in RATIO_COLUMNS:
+        missing = rng.random(n_users) < nan_rate
+        df[column] = df[column].astype(float).mask(missing)
+    df.insert(0, "user_id", np.arange(n_users))
+    # Model outputs are float64 regardless of the policy
+    iso = -rng.gamma(2.0, 0.1, n_users) - 0.3
+    svm = rng.normal(0, 1, n_users)
+    probs = rng.beta(0.5, 4.0, n_users)
+    return df, iso, svm, probs
+
+
+def run_policy(dtype, features_df, iso, svm, probs):
+    """Scale features and score risk under one dtype policy."""
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    pipeline = DataPipeline(dtype=dtype)
+    features = pipeline.apply_dtype(features_df)
+    X = features.drop("user_id", axis=1).to_numpy(dtype=pipeline.dtype)
+    X_scaled = StandardScaler().fit_transform(X)
+
+    scorer = RiskScorer(dtype=dtype)
+    anomaly = scorer.compute_hybrid_anomaly_score(iso, svm)
+    risk_df = scorer.compute_risk_scores(
+        features, anomaly, supervised_probs=probs
+    ).sort_index()
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return risk_df, {
+        "dtype": np.dtype(dtype).name,
+        "seconds": round(elapsed, 3),
+        "peak_mb": round(peak / 1e6, 1),
+        "scaled_mb": round(X_scaled.nbytes / 1e6, 1),
+        "risk_frame_mb": round(
+            risk_df.memory_usage(deep=True).sum() / 1e6, 1
+        ),
+    }
+
+
+def compare(n_users, nan_rate=0.0):
+    features_df, iso, svm, probs = make_features(n_users, nan_rate=nan_rate)
+    ref_df, ref_stats = run_policy("float64", features_df, iso, svm, probs)
+    f32_df, f32_stats = run_policy("float32", features_df, iso, svm, probs)
+
+    ref_levels = ref_df["risk_level"].astype(object)
+    f32_levels = f32_df["risk_level"].astype(object)
+    level_mismatch = int((
+        (ref_levels != f32_levels)
+        & ~(ref_levels.isna() & f32_levels.isna())
+    ).sum())
+    max_score_diff = float(np.nanmax(np.abs(
+        ref_df["risk_score"].to_numpy() - f32_df["risk_score"].to_numpy()
+    )))
+    stats = pd.DataFrame([ref_stats, f32_stats])
+    stats["users"] = n_users
+    stats["level_mismatches"] = [0, level_mismatch]
+    stats["max_score_diff"] = [0.0, max_score_diff]
+    # Only rows with a missing input may score NaN
+    stats["nan_scores"] = [
+        int(ref_df["risk_score"].isna().sum()),
+        int(f32_df["risk_score"].isna().sum()),
+    ]
+    stats["nan_inputs"] = int(
+        features_df[RATIO_COLUMNS].isna().any(axis=1).sum()
+    )
+    return stats
+
+
+def check(n_users=20000, nan_rate=0.01):
+    """Fast pass/fail run for CI: float32 must give the same risk levels
+    as float64, and missing values must stay confined to their rows."""
+    stats = compare(n_users, nan_rate)
+    ok = (
+        stats["level_mismatches"].sum() == 0
+        and (stats["nan_scores"] <= stats["nan_inputs"]).all()
+    )
+    print(stats.to_string(index=False))
+    return bool(ok)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare float64 and float32 feature/risk pipelines."
+    )
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=[100000, 1000000]
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Quick risk-level equivalence check (with missing values); "
+             "exits non-zero on a mismatch, writes no report"
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        passed = check()
+        logger.info("✅ Risk levels unchanged" if passed
+                    else "❌ float32 policy changed risk levels")
+        sys.exit(0 if passed else 1)
+
+    df = pd.concat([compare(n) for n in args.users], ignore_index=True)
+    print(df.to_string(index=False))
+    out_path = PATHS["reports"] / "benchmark_dtype.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out_path, index=False)
+    logger.info(f"✅ Benchmark saved: {out_path}")
+
+    # Non-zero exit when the float32 policy changes any risk level
+    if df["level_mismatches"].sum():
+        logger.error("❌ float32 policy changed risk levels")
+        sys.exit(1)
@@ -0,0 +1,99 @@
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.svm import OneClassSVM
+from scalable_ocsvm import ApproxOneClassSVM
+from config import PATHS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 24  # matches the engineered feature set
+OUTLIER_RATE = 0.05
+
+
+def make_data(n_rows, seed=42):
+    """Gaussian-mixture inliers plus wider-spread outliers around them."""
+    rng = np.random.default_rng(seed)
+    n_out = int(n_rows * OUTLIER_RATE)
+    n_in = n_rows - n_out
+    centers = rng.normal(0, 2, size=(4, N_FEATURES))
+    inliers = (
+        centers[rng.integers(0, len(centers), n_in)]
+        + rng.normal(0, 1, size=(n_in, N_FEATURES))
+    )
+    outliers = (
+        centers[rng.integers(0, len(centers), n_out)]
+        + rng.normal(0, 1.6, size=(n_out, N_FEATURES))
+    )
+    X = np.vstack([inliers, outliers])
+    y = np.r_[np.zeros(n_in), np.ones(n_out)]
+    idx = rng.permutation(n_rows)
+    return X[idx], y[idx]
+
+
+def _time_model(name, model, X, y):
+    t0 = time.perf_counter()
+    model.fit(X)
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    scores = model.score_samples(X)
+    predict_s = time.perf_counter() - t0
+    return {
+        "model": name,
+        "rows": len(X),
+        "fit_seconds": round(fit_s, 3),
+        "predict_seconds": round(predict_s, 3),
+        # Lower score = more anomalous
+        "roc_auc": round(roc_auc_score(y, -scores), 4),
+    }
+
+
+def run_benchmark(sizes, exact_max_rows=20000, n_components=300):
+    rows = []
+    for n in sizes:
+        X, y = make_data(n)
+        models = {
+            "nystroem+sgd": ApproxOneClassSVM(
+                feature_map="nystroem", n_components=n_components
+            ),
+            "rff+sgd": ApproxOneClassSVM(
+                feature_map="rff", n_components=n_components
+            ),
+        }
+        if n <= exact_max_rows:
+            models["exact_rbf"] = OneClassSVM(
+                nu=0.1, kernel="rbf", gamma="scale"
+            )
+        else:
+            logger.info(f"Skipping exact OneClassSVM at {n} rows")
+        for name, model in models.items():
+            result = _time_model(name, model, X, y)
+            logger.info(result)
+            rows.append(result)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare exact and approximate One-Class SVM backends."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument(
+        "--exact-max-rows", type=int, default=20000,
+        help="Largest size at which the O(n^2) exact model is timed"
+    )
+    parser.add_argument("--n-components", type=int, default=300)
+    args = parser.parse_args()
+
+    df = run_benchmark(args.sizes, args.exact_max_rows, args.n_components)
+    print(df.to_string(index=False))
+    out_path = PATHS["reports"] / "benchmark_ocsvm.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out_path, index=False)
+    logger.info(f"✅ Benchmark saved: {out_path}")
@@ -0,0 +1,132 @@
+import numpy as np
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+_EPS = 1e-6
+
+
+class SigmoidCalibrator:
+    """Platt scaling: a logistic fit on the logit of the raw probability."""
+
+    def fit(self, probs, y):
+        self.lr_ = LogisticRegression(C=1e6)
+        self.lr_.fit(self._logit(probs), y)
+        return self
+
+    @staticmethod
+    def _logit(probs):
+        p = np.clip(np.asarray(probs, dtype=float), _EPS, 1 - _EPS)
+        return np.log(p / (1 - p)).reshape(-1, 1)
+
+    def predict(self, probs):
+        return self.lr_.predict_proba(self._logit(probs))[:, 1]
+
+
+def fit_calibrator(probs, y, method="isotonic"):
+    """Fit a 1-D probability calibrator on held-out predictions."""
+    if method == "isotonic":
+        calibrator = IsotonicRegression(out_of_bounds="clip")
+        return calibrator.fit(np.asarray(probs, dtype=float), y)
+    if method == "sigmoid":
+        return SigmoidCalibrator().fit(probs, y)
+    raise ValueError(f"Unknown calibration method: {method}")
+
+
+class FoldEnsembleClassifier:
+    """Average of already-fitted fold models (soft voting)."""
+
+    def __init__(self, models):
+        self.models = list(models)
+        self.classes_ = self.models[0].classes_
+
+    def predict_proba(self, X):
+        return np.mean([m.predict_proba(X) for m in self.models], axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    @property
+    def feature_importances_(self):
+        return np.mean(
+            [m.feature_importances_ for m in self.models], axis=0
+        )
+
+
+class PrefitCalibratedClassifier:
+    """A fitted binary classifier followed by a fitted calibrator.
+
+    Exposes ``predict_proba`` like ``CalibratedClassifierCV`` so
+    ``HybridModelTrainer.get_supervised_probs`` works unchanged.
+    """
+
+    def __init__(self, model, calibrator):
+        self.model = model
+        self.calibrator = calibrator
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X):
+        raw = self.model.predict_proba(X)[:, 1]
+        pos = np.clip(self.calibrator.predict(raw), 0.0, 1.0)
+        return np.column_stack([1.0 - pos, pos])
+
+    def predict(self, X):
+        return self.classes_[
+            (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+        ]
+
+
+def calibrate_holdout(estimator, X, y, method="isotonic", holdout=0.2,
+                      random_state=42):
+    """Train once on ``1 - holdout`` of the rows, calibrate on the rest.
+
+    Returns ``(model, calibrated)``; one model fit in total.
+    """
+    X_fit, X_cal, y_fit, y_cal = train_test_split(
+        X, y, test_size=holdout, stratify=y, random_state=random_state
+    )
+    model = clone(estimator).fit(X_fit, y_fit)
+    calibrator = fit_calibrator(
+        model.predict_proba(X_cal)[:, 1], y_cal, method
+    )
+    return model, PrefitCalibratedClassifier(model, calibrator)
+
+
+def calibrate_out_of_fold(estimator, X, y, method="isotonic", cv=3,
+                          ensemble=True, random_state=42):
+    """Calibrate on out-of-fold predictions of ``cv`` fold models.
+
+    With ``ensemble=True`` each fold model gets a calibrator fitted on its
+    own held-out fold and the calibrated fold models are averaged, as
+    ``CalibratedClassifierCV`` does, but without its extra full-data fit
+    (``cv`` fits in total). With ``ensemble=False`` one calibrator is fitted
+    on the pooled OOF predictions and applied to a model trained on all
+    rows (``cv + 1`` fits). Returns ``(model, calibrated)``.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    skf = StratifiedKFold(n_splits=cv, shuffle=True,
+                          random_state=random_state)
+    oof = np.empty(len(y), dtype=float)
+    fold_models = []
+    fold_calibrated = []
+    for train_idx, cal_idx in skf.split(X, y):
+        model = clone(estimator).fit(X[train_idx], y[train_idx])
+        oof[cal_idx] = model.predict_proba(X[cal_idx])[:, 1]
+        fold_models.append(model)
+        if ensemble:
+            calibrator = fit_calibrator(oof[cal_idx], y[cal_idx], method)
+            fold_calibrated.append(
+                PrefitCalibratedClassifier(model, calibrator)
+            )
+
+    if ensemble:
+        return (
+            FoldEnsembleClassifier(fold_models),
+            FoldEnsembleClassifier(fold_calibrated),
+        )
+
+    calibrator = fit_calibrator(oof, y, method)
+    model = clone(estimator).fit(X, y)
+    return model, PrefitCalibratedClassifier(model, calibrator)
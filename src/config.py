@@ -1,3 +1,6 @@
+import copy
+import json
+import os
 from pathlib import Path
 
 # Project root directory
@@ -12,9 +15,7 @@ PATHS = {
     'logs': PROJECT_ROOT / 'logs'
 }
 
-# Create directories if they don't exist
-for p in PATHS.values():
-    p.mkdir(parents=True, exist_ok=True)
+# Directories are created by whoever writes into them, not at import
 
 # Model configurations
 MODEL_CONFIG = {
@@ -23,7 +24,17 @@ MODEL_CONFIG = {
         "n_estimators": 200,
         "random_state": 42
     },
-    "one_class_svm": {"nu": 0.1, "kernel": "rbf", "gamma": "scale"},
+    "one_class_svm": {
+        "nu": 0.1,
+        "kernel": "rbf",
+        "gamma": "scale",
+        # "exact" (sklearn OneClassSVM), "nystroem"/"rff" (kernel map +
+        # SGDOneClassSVM) or "auto": exact up to exact_max_rows
+        "backend": "auto",
+        "exact_max_rows": 50000,
+        "n_components": 300,
+        "random_state": 42
+    },
     "random_forest": {
         "n_estimators": 300,
         "random_state": 42,
@@ -32,10 +43,158 @@ MODEL_CONFIG = {
         "top_k": 10,
         "calibration": "isotonic",
         "calibration_cv": 3,
+        # "refit" (CalibratedClassifierCV, 1 + cv fits), "holdout" (1 fit)
+        # or "oof" (cv fits; fold models reused when calibration_ensemble)
+        "calibration_mode": "refit",
+        "calibration_holdout": 0.2,
+        "calibration_ensemble": True,
         "model": "xgboost",
         "use_smote": True,
         "smote_k_neighbors": 3
     },
+    # Oversampling in _balance_data (src/balancing.py). neighbors: "auto",
+    # "kd_tree", "ball_tree" or "random_projection" (approximate; "auto"
+    # switches to it from ann_min_rows minority rows)
+    "balancing": {
+        "neighbors": "auto",
+        "n_trees": 4,
+        "leaf_size": 64,
+        "ann_min_rows": 50000,
+        "chunk_rows": 100000,
+        "random_state": 42
+    },
+    # Used when random_forest.model == "xgboost"
+    "xgboost": {
+        "n_estimators": 300,
+        "learning_rate": 0.05,
+        "max_depth": 6,
+        "subsample": 0.9,
+        "colsample_bytree": 0.9
+    },
+    # Fit IsolationForest, OC-SVM and the supervised model concurrently,
+    # splitting the trainer's n_jobs between them ("thread" or "process")
+    "training": {
+        "parallel_components": True,
+        "backend": "thread"
+    },
+}
+
+# Floating-point policy for features, scaler output, anomaly scores and
+# risk components. Inputs are cast once at the pipeline/scorer boundary.
+NUMERIC_CONFIG = {
+    'dtype': 'float32'
+}
+
+# Memory-mapped training matrices (src/feature_store.py)
+FEATURE_STORE_CONFIG = {
+    'store_dir': PATHS['data'] / 'feature_store',
+    'dtype': NUMERIC_CONFIG['dtype'],
+    'chunk_rows': 500000      # CSV rows converted per chunk
+}
+
+# Hyperparameter search (src/tune_hyperparams.py). Winning configs are
+# written as tuned_dir/model_config_vNNNN.json; with apply_tuned the
+# training entry points train with the newest one (training_model_config).
+# MODEL_CONFIG itself is never modified, so scoring and benchmarks are not
+# affected by a tuning run.
+TUNING_CONFIG = {
+    'tuned_dir': PATHS['models'] / 'tuned',
+    'cache_dir': PATHS['reports'] / 'tuning' / 'cache',
+    'apply_tuned': True,
+    'n_candidates': 27,
+    'eta': 3,                 # keep 1/eta of the trials per rung
+    'min_rows': 1000,         # training rows per fold on the first rung
+    'cv_splits': 3,
+    'anomaly_weight': 0.3,    # objective = mix of supervised/anomaly PR-AUC
+    'random_state': 42
+}
+
+
+def latest_tuned_config(tuned_dir=None):
+    """Return the newest versioned tuned config file, or None."""
+    tuned_dir = Path(tuned_dir or TUNING_CONFIG['tuned_dir'])
+    versions = sorted(tuned_dir.glob('model_config_v*.json'))
+    if not versions:
+        return None
+    with open(versions[-1]) as f:
+        return json.load(f)
+
+
+def training_model_config(tuned_dir=None):
+    """MODEL_CONFIG for training: a copy with the newest tuned parameters
+    merged in when ``apply_tuned`` is set and a tuned config exists."""
+    config = copy.deepcopy(MODEL_CONFIG)
+    if not TUNING_CONFIG['apply_tuned']:
+        return config
+    tuned = latest_tuned_config(tuned_dir)
+    if tuned is not None:
+        for section, params in tuned['params'].items():
+            config.setdefault(section, {}).update(params)
+    return config
+
+
+# Feature drift monitoring (src/drift_monitor.py). Reference histograms
+# of the raw features are saved with the models at training time.
+DRIFT_CONFIG = {
+    'bins': 10,
+    'psi_threshold': 0.2,
+    'chunk_rows': 262144,
+    'reference_file': 'drift_reference.npz'
+}
+
+# Streaming drift monitoring (src/stream_drift.py); the PSI threshold is
+# DRIFT_CONFIG['psi_threshold'] unless overridden here.
+STREAM_DRIFT_CONFIG = {
+    'window_seconds': 24 * 3600,  # sliding window compared with reference
+    'bucket_seconds': 3600,       # window granularity
+    'sketch_k': 200,              # KLL accuracy (rank error ~ 1/k)
+    'check_every': 10000,         # records between drift checks
+    'min_window_rows': 1000,      # don't judge drift on fewer records
+    'cooldown_seconds': 6 * 3600,  # minimum gap between hook firings
+    'retrain_on_drift': False,     # run the retrain scheduler on alarms,
+    'retrain_features': None       # over this raw-feature CSV (required)
+}
+
+# Incremental retraining (src/incremental_retrain.py)
+RETRAIN_CONFIG = {
+    'psi_threshold': 0.2,        # per-feature PSI that counts as drift
+    'min_new_labels': 50,        # labels needed to update supervised model
+    'iso_forest_new_trees': 50,  # trees added per warm-start update
+    'random_forest_new_trees': 50,
+    'boosting_new_rounds': 50,   # XGBoost / HistGradientBoosting rounds
+    'calibration_holdout': 0.2,  # share of new labels used to recalibrate
+    'reference_rows': 5000       # training rows kept as drift reference
+}
+
+# Drift-triggered retraining (src/retrain_scheduler.py). PSI is the
+# largest per-feature PSI against DRIFT_CONFIG's reference histograms.
+SCHEDULER_CONFIG = {
+    'warm_psi': 0.1,           # warm-update the anomaly detectors
+    'full_psi': 0.25,          # retrain everything
+    'min_new_labels': RETRAIN_CONFIG['min_new_labels'],  # warm supervised
+    'full_new_labels': 1000,   # refit supervised from scratch
+    'max_age_days': 30,        # full retrain regardless of drift
+    'state_file': PATHS['models'] / 'retrain_state.json',
+    'decisions_file': PATHS['reports'] / 'retrain' / 'decisions.jsonl'
+}
+
+# Versioned model registry (src/model_registry.py). Scorers follow the
+# promoted version unless MODEL_VERSION pins one.
+REGISTRY_CONFIG = {
+    'root': PATHS['models'] / 'registry',
+    'keep_versions': 10,
+    'pinned_version': os.environ.get('MODEL_VERSION'),
+    'poll_seconds': 5,     # how often scorers check for a new version
+    'warmup_rows': 64      # dummy batch scored before a version goes live
+}
+
+# Array-based forest persistence (src/forest_store.py): tree nodes as
+# raw .npy files, memory-mapped at load instead of unpickled
+FOREST_STORE_CONFIG = {
+    'enabled': True,        # export forests next to the pickles on save
+                            # (disabling removes existing stores)
+    'chunk_rows': 1024,     # rows traversed together when scoring
+    'prefer_arrays': True   # registry loads stored forests over pickles
 }
 
 # Risk scoring weights
@@ -55,6 +214,38 @@ RISK_THRESHOLDS = {
     'low': 0.0
 }
 
+# Alert journal: append-only segments written by a background dispatcher
+ALERT_CONFIG = {
+    'journal_dir': PATHS['reports'] / 'alerts' / 'journal',
+    'max_segment_bytes': 64 * 1024 * 1024,
+    'queue_size': 10000,
+    'batch_size': 500,
+    'flush_interval': 0.5,
+    'fsync': True,
+    # Suppression: re-alert a user only after the cooldown, on moving into
+    # a higher score band, or when the score rises by rearm_delta
+    'state_path': PATHS['reports'] / 'alerts' / 'alert_state.json',
+    'cooldown_minutes': 24 * 60,
+    'rearm_delta': 0.5,
+    'score_bands': [8.0, 8.5, 9.0, 9.5]
+}
+
+# Cold-start budgets (src/startup_profile.py): seconds from interpreter
+# start until the entry point module is imported, best of `repeat` runs
+STARTUP_CONFIG = {
+    'budgets': {
+        'api': 3.0,
+        'api_simple': 1.0,
+        'src.app': 1.0,
+        'deploy_model': 2.0,
+        'retrain': 1.0,
+    },
+    'repeat': 3,
+    'top_imports': 10,
+    # Optional heavy packages no entry point may import at startup
+    'deferred_modules': ['plotly', 'shap', 'imblearn', 'xgboost']
+}
+
 # Logging
 LOGGING_CONFIG = {
     'level': 'INFO',
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules in src/ import each other by bare name (as the entry points
+# run them), so tests need src/ itself on the path
+sys.path.insert(0, os.path.dirname(__file__))
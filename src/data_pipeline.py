@@ -1,7 +1,8 @@
+import numpy as np
 import pandas as pd
 import joblib
 from sklearn.preprocessing import StandardScaler
-from config import PATHS
+from config import PATHS, NUMERIC_CONFIG
 from logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -10,9 +11,10 @@ logger = setup_logger(__name__)
 class DataPipeline:
     """Complete data loading and feature engineering"""
 
-    def __init__(self):
+    def __init__(self, dtype=None):
         self.scaler = None
         self.feature_columns = None
+        self.dtype = np.dtype(dtype or NUMERIC_CONFIG["dtype"])
 
     def load_data(self):
         logger.info("Loading data files...")
@@ -168,6 +170,14 @@ class DataPipeline:
 
         return features
 
+    def apply_dtype(self, features_df):
+        """Cast float feature columns to the configured dtype.
+
+        Integer counts are left as they are.
+        """
+        float_cols = features_df.select_dtypes(include="floating").columns
+        return features_df.astype({c: self.dtype for c in float_cols})
+
     def preprocess_features(self, features_df):
         logger.info("Preprocessing features...")
 
@@ -176,9 +186,11 @@ class DataPipeline:
         X = df.drop("user_id", axis=1)
         self.feature_columns = X.columns.tolist()
 
+        # StandardScaler keeps the input dtype, so cast once here
         self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        X_scaled = self.scaler.fit_transform(X.to_numpy(dtype=self.dtype))
 
+        PATHS["models"].mkdir(parents=True, exist_ok=True)
         joblib.dump(self.scaler, PATHS["models"] / "scaler.pkl")
         feature_cols_path = PATHS["models"] / "feature_columns.pkl"
         joblib.dump(self.feature_columns, feature_cols_path)
@@ -205,6 +217,7 @@ class DataPipeline:
             data["sensitive_access"],
             data["login_attempts"],
         )
+        features_df = self.apply_dtype(features_df)
         X_scaled, user_ids = self.preprocess_features(features_df)
 
         logger.info("=" * 70)
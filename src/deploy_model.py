@@ -1,30 +1,61 @@
+import argparse
 import logging
-import shutil
-from config import PATHS
+from model_registry import ModelRegistry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def deploy_model():
-    """Deploy trained models to production"""
+def deploy_model(version=None):
+    """Deploy trained models to production.
+
+    Promotes ``version`` (default: the newest published one) by swapping
+    the registry's CURRENT pointer. Versions are immutable, so scorers
+    never see a mix of old and new artifacts, and rolling back is
+    promoting the previous version again.
+    """
     logger.info("="*60)
     logger.info("DEPLOYING MODELS TO PRODUCTION")
     logger.info("="*60)
-    
-    models_dir = PATHS["models"]
-    prod_dir = PATHS["data"] / "production_models"
-    prod_dir.mkdir(exist_ok=True)
-    
-    # Copy all models
-    for model_file in models_dir.glob("*.pkl"):
-        dest = prod_dir / model_file.name
-        shutil.copy(model_file, dest)
-        logger.info(f"✅ Deployed: {model_file.name}")
-    
-    logger.info(f"\n✅ Models deployed to: {prod_dir}")
+
+    registry = ModelRegistry()
+    versions = registry.versions()
+    if not versions:
+        logger.error("❌ No published model versions; train first")
+        return None
+    version = version or versions[-1]
+
+    manifest = registry.manifest(version)
+    for name, entry in manifest["artifacts"].items():
+        logger.info(f"   {name}: {entry['file']} ({entry['sha256'][:12]})")
+    previous = registry.promote(version)
+
+    logger.info(f"\n✅ Deployed {version} (previous: {previous})")
     logger.info("="*60)
+    return version
 
 
 if __name__ == "__main__":
-    deploy_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Promote a model version.")
+    parser.add_argument(
+        "--version", help="Version to promote (default: newest)"
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List published versions"
+    )
+    parser.add_argument(
+        "--prune", action="store_true",
+        help="Delete old versions beyond REGISTRY_CONFIG['keep_versions']"
+    )
+    args = parser.parse_args()
+
+    if args.list:
+        registry = ModelRegistry()
+        current = registry.current_version()
+        for v in registry.versions():
+            print(f"{'*' if v == current else ' '} {v}")
+    elif args.prune:
+        removed = ModelRegistry().prune()
+        logger.info(f"Removed {len(removed)} old versions")
+    else:
+        deploy_model(args.version)
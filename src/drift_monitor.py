@@ -1,4 +1,9 @@
+import json
+import os
+from datetime import datetime
 import numpy as np
+import pandas as pd
+from config import PATHS, DRIFT_CONFIG
 
 
 def population_stability_index(expected, actual, bins=10, eps=1e-6):
@@ -30,3 +35,163 @@ def population_stability_index(expected, actual, bins=10, eps=1e-6):
 
     psi = np.sum((act_pct - exp_pct) * np.log(act_pct / exp_pct))
     return float(psi)
+
+
+def psi_from_counts(expected, actual, eps=1e-6):
+    """Row-wise PSI between two ``(n_features, n_bins)`` count matrices."""
+    exp_pct = np.clip(_to_pct(expected), eps, 1)
+    act_pct = np.clip(_to_pct(actual), eps, 1)
+    return np.sum((act_pct - exp_pct) * np.log(act_pct / exp_pct), axis=1)
+
+
+def ks_from_counts(expected, actual):
+    """Row-wise Kolmogorov-Smirnov statistic on the binned CDFs."""
+    cdf_gap = np.cumsum(_to_pct(expected) - _to_pct(actual), axis=1)
+    return np.abs(cdf_gap).max(axis=1)
+
+
+def js_from_counts(expected, actual):
+    """Row-wise Jensen-Shannon divergence (base 2, in [0, 1])."""
+    p = _to_pct(expected)
+    q = _to_pct(actual)
+    m = 0.5 * (p + q)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kl_p = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=1)
+        kl_q = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=1)
+    return 0.5 * (kl_p + kl_q)
+
+
+def _to_pct(counts):
+    counts = np.asarray(counts, dtype=float)
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    return counts / totals
+
+
+class DriftReference:
+    """Per-feature reference histograms captured at training time.
+
+    ``inner_edges`` has shape ``(n_features, n_bins - 1)``: quantile cut
+    points of the training data, with open-ended first and last bins so
+    new values outside the training range still land somewhere.
+    ``counts`` holds the training rows per bin. Scoring a new matrix needs
+    only these, never the training data itself.
+    """
+
+    def __init__(self, feature_columns, inner_edges, counts):
+        self.feature_columns = list(feature_columns)
+        self.inner_edges = np.asarray(inner_edges, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @property
+    def n_bins(self):
+        return self.counts.shape[1]
+
+    @classmethod
+    def fit(cls, X, feature_columns=None, bins=None, chunk_rows=None):
+        """Quantile edges for every column of ``X`` in one call."""
+        if isinstance(X, pd.DataFrame):
+            feature_columns = feature_columns or X.columns.tolist()
+            X = X[feature_columns].to_numpy(dtype=float)
+        X = np.asarray(X, dtype=float)
+        feature_columns = feature_columns or [
+            f"feature_{j}" for j in range(X.shape[1])
+        ]
+        bins = int(bins or DRIFT_CONFIG["bins"])
+        levels = np.linspace(0, 1, bins + 1)[1:-1]
+        inner_edges = np.nanquantile(X, levels, axis=0).T
+        reference = cls(
+            feature_columns, inner_edges,
+            np.zeros((X.shape[1], bins), dtype=np.int64)
+        )
+        reference.counts = reference.histogram(X, chunk_rows)
+        return reference
+
+    def histogram(self, X, chunk_rows=None):
+        """Bin every feature of ``X`` against the reference edges.
+
+        Bin ids come from comparing whole chunks against one edge column
+        at a time (``n_bins - 1`` broadcasts, the vectorized equivalent of
+        a right-sided ``searchsorted`` per feature), followed by a single
+        ``bincount`` over the flattened ``feature * n_bins + bin`` ids, so
+        the matrix is read once whatever the number of features.
+        Non-finite values are skipped.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_columns].to_numpy(dtype=float)
+        n_features, n_bins = len(self.feature_columns), self.n_bins
+        chunk_rows = int(chunk_rows or DRIFT_CONFIG["chunk_rows"])
+        offsets = np.arange(n_features) * n_bins
+        counts = np.zeros(n_features * n_bins, dtype=np.int64)
+        bin_dtype = np.uint8 if n_bins <= 256 else np.int32
+        for start in range(0, len(X), chunk_rows):
+            chunk = np.asarray(X[start:start + chunk_rows], dtype=float)
+            bin_ids = np.zeros(chunk.shape, dtype=bin_dtype)
+            for e in range(n_bins - 1):
+                bin_ids += chunk >= self.inner_edges[:, e]
+            flat = bin_ids[np.isfinite(chunk)] + np.broadcast_to(
+                offsets, chunk.shape
+            )[np.isfinite(chunk)]
+            counts += np.bincount(flat, minlength=counts.size)
+        return counts.reshape(n_features, n_bins)
+
+    def compare(self, X=None, counts=None):
+        """PSI, KS and JS per feature for a new matrix (or its counts)."""
+        if counts is None:
+            counts = self.histogram(X)
+        return pd.DataFrame({
+            "feature": self.feature_columns,
+            "psi": psi_from_counts(self.counts, counts),
+            "ks": ks_from_counts(self.counts, counts),
+            "js": js_from_counts(self.counts, counts),
+            "rows": counts.sum(axis=1),
+        })
+
+    def save(self, path=None):
+        path = path or PATHS["models"] / DRIFT_CONFIG["reference_file"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed so readers never see a partial file
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(
+            tmp,
+            inner_edges=self.inner_edges,
+            counts=self.counts,
+            feature_columns=np.asarray(self.feature_columns),
+        )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or PATHS["models"] / DRIFT_CONFIG["reference_file"]
+        with np.load(path) as data:
+            return cls(
+                data["feature_columns"].tolist(),
+                data["inner_edges"],
+                data["counts"],
+            )
+
+
+def drift_report(reference, X, psi_threshold=None):
+    """Per-feature drift table with a ``drifted`` flag, worst first."""
+    psi_threshold = float(psi_threshold or DRIFT_CONFIG["psi_threshold"])
+    report = reference.compare(X)
+    report["drifted"] = report["psi"] > psi_threshold
+    return report.sort_values("psi", ascending=False, ignore_index=True)
+
+
+def save_drift_report(report, output_dir=None):
+    """Write the drift table (CSV) and a JSON summary; returns the CSV."""
+    output_dir = output_dir or PATHS["reports"] / "drift"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = output_dir / f"drift_report_{ts}.csv"
+    report.to_csv(csv_path, index=False)
+    summary = {
+        "timestamp": datetime.now().isoformat(),
+        "features": int(len(report)),
+        "drifted": report.loc[report["drifted"], "feature"].tolist(),
+        "max_psi": float(report["psi"].max()) if len(report) else 0.0,
+    }
+    with open(output_dir / f"drift_summary_{ts}.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    return csv_path
@@ -1,84 +1,168 @@
+import argparse
+import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import (precision_score, recall_score, f1_score,
-                             confusion_matrix)
+                             confusion_matrix, roc_auc_score,
+                             average_precision_score)
+from threadpoolctl import threadpool_limits
 from model_trainer import HybridModelTrainer
+from feature_store import (
+    load_feature_store, load_fold_block, write_fold_blocks
+)
 from config import PATHS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
-def evaluate_kfold():
+N_SPLITS = 5
+DECISION_THRESHOLD = 0.45
+
+
+def _plan_parallelism(n_splits, max_workers=None, n_jobs_per_fold=None):
+    """Split the machine's cores between concurrent folds.
+
+    Each fold gets ``cores // workers`` threads for its estimators and
+    BLAS/OpenMP pools, so folds never oversubscribe the CPU.
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, min(n_splits, max_workers or cores))
+    if n_jobs_per_fold is None:
+        n_jobs_per_fold = max(1, cores // workers)
+    return workers, int(n_jobs_per_fold)
+
+
+def _fold_blocks(store, n_splits):
+    """Contiguous per-fold copies of the store (see ``write_fold_blocks``),
+    kept inside the store directory so a rebuild discards them."""
+    block_dir = store["store_dir"] / "folds" / f"kfold_{n_splits}"
+    if block_dir.exists():
+        return block_dir
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    folds = {}
+    for fold, (train_idx, test_idx) in enumerate(
+            skf.split(store["X"], store["y"])):
+        folds[f"train_{fold}"] = train_idx
+        folds[f"test_{fold}"] = test_idx
+    logger.info(f"Writing fold blocks: {block_dir}")
+    return write_fold_blocks(store["X"], store["y"], folds, block_dir)
+
+
+def _run_fold(fold, block_dir, output_dir, n_jobs):
+    """Train and score one fold in isolation (runs in a worker process).
+
+    The worker memory-maps its fold's contiguous blocks, so its training
+    matrix is a view of the file shared through the page cache rather
+    than a private copy.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    X_train, y_train = load_fold_block(block_dir, f"train_{fold}")
+    X_test, y_test = load_fold_block(block_dir, f"test_{fold}")
+
+    with threadpool_limits(limits=n_jobs):
+        trainer = HybridModelTrainer(reports_dir=output_dir, n_jobs=n_jobs)
+        # Fold models are throwaway: never touch the shared Data/Models
+        trainer.run(X_train, X_test, y_train, y_test, save=False)
+        y_prob = trainer.get_supervised_probs(X_test)
+
+    y_pred = (y_prob >= DECISION_THRESHOLD).astype(int)
+    has_both = len(np.unique(y_test)) > 1
+    result = {
+        "fold": fold + 1,
+        "train_size": int(len(y_train)),
+        "test_size": int(len(y_test)),
+        "test_positives": int(y_test.sum()),
+        "precision": float(precision_score(y_test, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_test, y_pred, zero_division=0)),
+        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+        "roc_auc": (
+            float(roc_auc_score(y_test, y_prob)) if has_both else np.nan
+        ),
+        "pr_auc": (
+            float(average_precision_score(y_test, y_prob))
+            if has_both else np.nan
+        ),
+        "cm": confusion_matrix(y_test, y_pred, labels=[0, 1]).tolist(),
+    }
+    with open(output_dir / "fold_metrics.json", "w") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def evaluate_kfold(n_splits=N_SPLITS, max_workers=None, n_jobs_per_fold=None,
+                   output_dir=None):
     logger.info("Loading balanced data...")
 
-    # Load balanced features
-    X_df = pd.read_csv(PATHS["data"] / "features_balanced.csv")
-    user_ids = X_df['user_id'].values
-    X = X_df.drop('user_id', axis=1).values
-
-    # Load balanced labels
-    threat_labels = pd.read_csv(PATHS["data"] / "threat_labels_balanced.csv")
-    y = threat_labels.set_index('user_id').loc[user_ids, 'is_threat'].values
+    store = load_feature_store()
+    X, y = store["X"], store["y"]
 
     logger.info(f"Data shape: X={X.shape}, y={y.shape}")
     logger.info(f"Label distribution: {np.bincount(y)}")
 
-    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    scores = {"precision": [], "recall": [], "f1": [], "cm": []}
-
-    for fold, (train_idx, test_idx) in enumerate(skf.split(X, y)):
-        logger.info(f"\n{'='*60}")
-        logger.info(f"FOLD {fold+1}/5")
-        logger.info(f"{'='*60}")
-
-        X_train, X_test = X[train_idx], X[test_idx]
-        y_train, y_test = y[train_idx], y[test_idx]
-
-        logger.info(f"Train: {len(y_train)} | Test: {len(y_test)}")
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = output_dir or PATHS["reports"] / "cv" / ts
+    workers, n_jobs = _plan_parallelism(
+        n_splits, max_workers, n_jobs_per_fold
+    )
+    logger.info(
+        f"Running {n_splits} folds on {workers} workers "
+        f"({n_jobs} threads per fold) -> {output_dir}"
+    )
+
+    block_dir = _fold_blocks(store, n_splits)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _run_fold, fold, block_dir,
+                output_dir / f"fold_{fold + 1}", n_jobs
+            )
+            for fold in range(n_splits)
+        ]
+        results = [f.result() for f in futures]
+
+    for r in results:
         logger.info(
-            f"Train positives: {y_train.sum()} | "
-            f"Test positives: {y_test.sum()}"
+            f"FOLD {r['fold']}/{n_splits} | "
+            f"Precision: {r['precision']:.3f} | Recall: {r['recall']:.3f} | "
+            f"F1: {r['f1']:.3f} | ROC-AUC: {r['roc_auc']:.3f} | "
+            f"PR-AUC: {r['pr_auc']:.3f}"
         )
+        logger.info(f"CM:\n{np.array(r['cm'])}")
 
-        trainer = HybridModelTrainer()
-        trainer.run(
-            pd.DataFrame(X_train),
-            pd.DataFrame(X_test),
-            pd.Series(y_train),
-            pd.Series(y_test)
-        )
-        y_prob = trainer.get_supervised_probs(pd.DataFrame(X_test))
-        y_pred = (y_prob >= 0.45).astype(int)
-
-        p = precision_score(y_test, y_pred, zero_division=0)
-        r = recall_score(y_test, y_pred, zero_division=0)
-        f = f1_score(y_test, y_pred, zero_division=0)
-        cm = confusion_matrix(y_test, y_pred)
-
-        scores["precision"].append(p)
-        scores["recall"].append(r)
-        scores["f1"].append(f)
-        scores["cm"].append(cm)
-
-        logger.info(f"Precision: {p:.3f} | Recall: {r:.3f} | F1: {f:.3f}")
-        logger.info(f"CM:\n{cm}")
+    scores = pd.DataFrame(results).drop(columns="cm")
+    scores.to_csv(output_dir / "cv_results.csv", index=False)
 
     logger.info(f"\n{'='*60}")
     logger.info("CROSS-VALIDATION RESULTS")
     logger.info(f"{'='*60}")
-    avg_prec = np.mean(scores['precision'])
-    std_prec = np.std(scores['precision'])
-    logger.info(f"Avg Precision: {avg_prec:.3f} ± {std_prec:.3f}")
-    avg_rec = np.mean(scores['recall'])
-    std_rec = np.std(scores['recall'])
-    logger.info(f"Avg Recall: {avg_rec:.3f} ± {std_rec:.3f}")
-    avg_f1 = np.mean(scores['f1'])
-    std_f1 = np.std(scores['f1'])
-    logger.info(f"Avg F1: {avg_f1:.3f} ± {std_f1:.3f}")
+    for metric, label in [("precision", "Precision"), ("recall", "Recall"),
+                          ("f1", "F1"), ("roc_auc", "ROC-AUC"),
+                          ("pr_auc", "PR-AUC")]:
+        avg = scores[metric].mean()
+        std = scores[metric].std(ddof=0)
+        logger.info(f"Avg {label}: {avg:.3f} ± {std:.3f}")
+
+    return scores
 
 
 if __name__ == "__main__":
-    evaluate_kfold()
+    parser = argparse.ArgumentParser(
+        description="Stratified k-fold evaluation of the hybrid model."
+    )
+    parser.add_argument("--splits", type=int, default=N_SPLITS)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Folds run concurrently (default: min(splits, cores))"
+    )
+    parser.add_argument(
+        "--jobs-per-fold", type=int, default=None,
+        help="Threads per fold (default: cores // workers)"
+    )
+    args = parser.parse_args()
+    evaluate_kfold(args.splits, args.workers, args.jobs_per_fold)
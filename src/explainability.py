@@ -1,35 +1,381 @@
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import joblib
 import numpy as np
+from config import PATHS
+from lazy_imports import shap
+from logger import setup_logger
 
+logger = setup_logger(__name__)
 
-def explain_predictions(model, X, feature_names, top_k=5):
+# model version -> shap.TreeExplainer (None when SHAP can't explain it)
+_EXPLAINERS = {}
+_EXPLAINERS_LOCK = threading.Lock()
+
+
+def model_version(model):
+    """Content hash identifying a fitted model.
+
+    Hashes the whole estimator, which takes a while for large forests:
+    compute it once per model, or use ``published_version``.
+    """
+    return joblib.hash(model)
+
+
+def published_version(manifest, name="supervised"):
+    """Version of a published model: the sha256 its registry manifest
+    already records for the artifact, so nothing is hashed again.
+
+    None without a manifest (models loaded from the working directory
+    before anything was deployed); callers then hash the model once.
+    """
+    if manifest is None:
+        return None
+    return manifest["artifacts"][name]["sha256"]
+
+
+def get_tree_explainer(model, version=None):
+    """Return a cached ``shap.TreeExplainer`` for ``model``, or None.
+
+    Pass ``version`` when calling repeatedly; without it the model is
+    hashed on every call to find its explainer.
+    """
+    version = version or model_version(model)
+    with _EXPLAINERS_LOCK:
+        if version not in _EXPLAINERS:
+            try:
+                _EXPLAINERS[version] = shap.TreeExplainer(model)
+            except Exception as exc:
+                logger.info(f"SHAP unavailable for this model: {exc}")
+                _EXPLAINERS[version] = None
+        return _EXPLAINERS[version]
+
+
+def _positive_class(shap_values):
+    if isinstance(shap_values, list):
+        return np.asarray(shap_values[1])
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        return shap_values[..., 1]
+    return shap_values
+
+
+def top_k_contributions(values, k):
+    """Top-``k`` entries per row by absolute value.
+
+    ``argpartition`` over the whole matrix, then only the ``k`` survivors
+    are sorted. Returns ``(idx, vals)``, both of shape ``(n_rows, k)``.
+    """
+    values = np.asarray(values)
+    k = min(k, values.shape[1])
+    mag = np.abs(values)
+    part = np.argpartition(-mag, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(mag, part, axis=1), axis=1)
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx, np.take_along_axis(values, idx, axis=1)
+
+
+class TopKExplanations:
+    """Top-k contributions as compact ``(n_rows, k)`` arrays.
+
+    ``idx`` holds feature indices and ``values`` their contributions;
+    feature names are only attached by ``to_records`` at serialization.
+    With ``keys`` (e.g. user ids) records are returned as a dict.
+    """
+
+    def __init__(self, idx, values, feature_names, keys=None):
+        self.idx = idx
+        self.values = values
+        self.feature_names = list(feature_names)
+        self.keys = None if keys is None else list(keys)
+
+    def __len__(self):
+        return len(self.idx)
+
+    def to_records(self):
+        names = np.asarray(self.feature_names, dtype=object)[self.idx]
+        records = [
+            list(zip(row_names, row_vals))
+            for row_names, row_vals in zip(names.tolist(),
+                                           self.values.tolist())
+        ]
+        if self.keys is None:
+            return records
+        return dict(zip(self.keys, records))
+
+
+def fallback_contributions(model, X):
+    """``|x * feature_importances_|`` for all rows in one broadcast, or
+    None when the model has no importances."""
+    importances = getattr(model, "feature_importances_", None)
+    if importances is None:
+        return None
+    return np.abs(np.asarray(X) * np.asarray(importances, dtype=float))
+
+
+def explain_predictions(model, X, feature_names, top_k=5, version=None):
     """
-    Returns a list of top-k feature contributions per row.
+    Returns the top-k feature contributions per row as TopKExplanations.
     Uses SHAP if available, otherwise falls back to feature_importances
-    heuristic.
-    """
-    try:
-        import shap
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(X)
-        sv = shap_values[1] if isinstance(shap_values, list) else shap_values
-        explanations = []
-        for i in range(X.shape[0]):
-            idx = np.argsort(np.abs(sv[i]))[::-1][:top_k]
-            row_explanation = [
-                (feature_names[j], float(sv[i][j])) for j in idx
-            ]
-            explanations.append(row_explanation)
-        return explanations
-    except Exception:
-        importances = getattr(model, "feature_importances_", None)
-        if importances is None:
-            return [[] for _ in range(X.shape[0])]
-        explanations = []
-        for i in range(X.shape[0]):
-            scores = np.abs(X[i] * importances)
-            idx = np.argsort(scores)[::-1][:top_k]
-            row_explanation = [
-                (feature_names[j], float(scores[j])) for j in idx
-            ]
-            explanations.append(row_explanation)
-        return explanations
+    heuristic. ``version`` identifies the model (see ``model_version``).
+    """
+    explainer = get_tree_explainer(model, version)
+    if explainer is not None:
+        contrib = _positive_class(explainer.shap_values(X))
+    else:
+        contrib = fallback_contributions(model, X)
+        if contrib is None:
+            # No explanation available: zero contributions per row
+            return TopKExplanations(
+                np.empty((len(X), 0), dtype=np.int64),
+                np.empty((len(X), 0)), feature_names
+            )
+    idx, vals = top_k_contributions(contrib, top_k)
+    return TopKExplanations(idx, vals, feature_names)
+
+
+class ExplanationService:
+    """Top-k feature contributions for selected rows, computed lazily.
+
+    The SHAP explainer is built once per model version and shared. Only
+    the requested rows are explained, in batches of ``batch_size``.
+    Results are keyed by a hash of each row's feature values and persisted
+    under ``cache_dir/<model version>/``, so a row is explained once per
+    model version, across runs.
+    """
+
+    def __init__(self, model, feature_names, version=None, top_k=5,
+                 batch_size=2048, cache_dir=None):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.version = version or model_version(model)
+        self.top_k = top_k
+        self.batch_size = batch_size
+        root = cache_dir or PATHS["reports"] / "explanations"
+        self.cache_path = root / self.version / "explanations.jsonl"
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+
+    def _load_cache(self):
+        """Entries persisted so far. A torn last line (a crash during an
+        append) is truncated away, so later appends start on a clean
+        line."""
+        cache = {}
+        if not self.cache_path.exists():
+            return cache
+        valid = 0
+        with open(self.cache_path, "rb+") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                cache[rec["key"]] = (rec["idx"], rec["values"])
+                valid += len(line)
+            if valid < f.seek(0, 2):
+                logger.warning(
+                    f"Dropping a torn entry at the end of {self.cache_path}"
+                )
+                f.truncate(valid)
+        return cache
+
+    def _persist(self, entries):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "a", encoding="utf-8") as f:
+            for key, (idx, vals) in entries.items():
+                f.write(json.dumps(
+                    {"key": key, "idx": idx, "values": vals}
+                ) + "\n")
+
+    @staticmethod
+    def row_key(row):
+        row = np.ascontiguousarray(row, dtype=np.float64)
+        return hashlib.sha1(row.tobytes()).hexdigest()
+
+    def contributions(self, X):
+        """Raw per-feature contributions (SHAP or fallback) for ``X``."""
+        explainer = get_tree_explainer(self.model, self.version)
+        if explainer is not None:
+            return _positive_class(explainer.shap_values(X))
+        contrib = fallback_contributions(self.model, X)
+        if contrib is None:
+            return np.zeros_like(X, dtype=float)
+        return contrib
+
+    def explain(self, X, rows=None):
+        """Explain ``X[rows]`` (all rows if None).
+
+        Returns ``(idx, values)`` arrays of shape ``(len(rows), top_k)``;
+        cached rows are not recomputed.
+        """
+        X = np.asarray(X)
+        rows = np.arange(len(X)) if rows is None else np.asarray(rows)
+        keys = [self.row_key(X[r]) for r in rows]
+
+        with self._lock:
+            todo = [i for i, key in enumerate(keys) if key not in self._cache]
+        if todo:
+            fresh = {}
+            for start in range(0, len(todo), self.batch_size):
+                batch = todo[start:start + self.batch_size]
+                contrib = self.contributions(X[rows[batch]])
+                idx, vals = top_k_contributions(contrib, self.top_k)
+                for i, row_idx, row_val in zip(batch, idx, vals):
+                    fresh[keys[i]] = (row_idx.tolist(), row_val.tolist())
+            with self._lock:
+                self._cache.update(fresh)
+                self._persist(fresh)
+            logger.info(
+                f"Explained {len(todo)} rows "
+                f"({len(rows) - len(todo)} from cache)"
+            )
+
+        with self._lock:
+            pairs = [self._cache[key] for key in keys]
+        k = min(self.top_k, X.shape[1])
+        idx = np.array([p[0] for p in pairs], dtype=np.int64).reshape(-1, k)
+        vals = np.array([p[1] for p in pairs], dtype=float).reshape(-1, k)
+        return idx, vals
+
+    def explain_top_risk(self, X, risk_df, user_ids,
+                         levels=("Critical", "High")):
+        """Explain only users whose ``risk_level`` is in ``levels``.
+
+        ``user_ids`` gives the user of each row of ``X``. Returns
+        TopKExplanations keyed by user id, in risk order.
+        """
+        flagged = risk_df[risk_df["risk_level"].isin(levels)]
+        flagged = flagged.sort_values("risk_score", ascending=False)
+        row_of = {uid: i for i, uid in enumerate(user_ids)}
+        rows = np.array(
+            [row_of[uid] for uid in flagged["user_id"]], dtype=np.int64
+        )
+        if len(rows) == 0:
+            idx = np.empty((0, 0), dtype=np.int64)
+            vals = np.empty((0, 0))
+        else:
+            idx, vals = self.explain(X, rows)
+        return TopKExplanations(
+            idx, vals, self.feature_names, keys=flagged["user_id"]
+        )
+
+
+class MicroBatchExplainer:
+    """Coalesce concurrent single-row requests into batched explainer calls.
+
+    Requests wait at most ``max_wait`` seconds for others to join the
+    batch (up to ``max_batch`` rows). Results are kept in an LRU cache
+    keyed by ``(model version, row hash)``. After ``close`` the batching
+    thread finishes what is queued and exits; later calls are explained
+    directly.
+    """
+
+    def __init__(self, service, max_batch=64, max_wait=0.005,
+                 cache_size=10000):
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="explain-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def explain_row(self, row, timeout=30):
+        """Return ``(idx, values)`` top-k arrays for one scaled row."""
+        row = np.asarray(row, dtype=float).ravel()
+        key = (self.service.version, self.service.row_key(row))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        future = Future()
+        with self._submit_lock:
+            submitted = not self._closed
+            if submitted:
+                self._queue.put((key, row, future))
+        if not submitted:
+            contrib = self.service.contributions(row.reshape(1, -1))
+            idx, vals = top_k_contributions(contrib, self.service.top_k)
+            return idx[0], vals[0]
+        return future.result(timeout=timeout)
+
+    def close(self):
+        """Stop batching once everything already queued is explained."""
+        with self._submit_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+
+    def _collect(self):
+        """Next batch, and whether ``close`` was reached (None marker)."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch, closing = self._collect()
+            if not batch:
+                continue
+            # Identical rows in one batch are explained once
+            unique = OrderedDict()
+            for key, row, _ in batch:
+                unique.setdefault(key, row)
+            try:
+                contrib = self.service.contributions(
+                    np.vstack(list(unique.values()))
+                )
+                idx, vals = top_k_contributions(contrib, self.service.top_k)
+                results = {
+                    key: (idx[i], vals[i]) for i, key in enumerate(unique)
+                }
+                for key, value in results.items():
+                    self._cache_put(key, value)
+                for key, _, future in batch:
+                    future.set_result(results[key])
+            except Exception as exc:
+                logger.error(f"Explanation batch failed: {exc}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from config import PATHS, FEATURE_STORE_CONFIG
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FEATURES_FILE = "features_balanced.csv"
+LABELS_FILE = "threat_labels_balanced.csv"
+
+
+def _source_signature(paths):
+    signature = {}
+    for path in paths:
+        stat = os.stat(path)
+        signature[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def source_files():
+    """The CSVs the store is built from."""
+    return PATHS["data"] / FEATURES_FILE, PATHS["data"] / LABELS_FILE
+
+
+def build_feature_store(features_path=None, labels_path=None,
+                        store_dir=None, dtype=None, chunk_rows=None):
+    """Convert the balanced feature/label CSVs into ``.npy`` files.
+
+    ``X.npy`` (``dtype``, float32 by default), ``y.npy`` (int8) and
+    ``user_ids.npy`` (fixed-width bytes) are filled chunk by chunk through
+    ``open_memmap``, so building never holds the whole CSV in memory.
+    The store is written to a temporary directory and swapped in, so
+    readers never see a half-written store.
+    """
+    default_features, default_labels = source_files()
+    features_path = features_path or default_features
+    labels_path = labels_path or default_labels
+    store_dir = store_dir or FEATURE_STORE_CONFIG["store_dir"]
+    dtype = np.dtype(dtype or FEATURE_STORE_CONFIG["dtype"])
+    chunk_rows = int(chunk_rows or FEATURE_STORE_CONFIG["chunk_rows"])
+
+    # Pass 1: row count and widest user id, without loading features
+    n_rows, id_width = 0, 1
+    for chunk in pd.read_csv(features_path, usecols=["user_id"],
+                             chunksize=chunk_rows):
+        ids = chunk["user_id"].astype(str)
+        n_rows += len(ids)
+        id_width = max(id_width, int(ids.str.len().max()))
+    feature_columns = [
+        c for c in pd.read_csv(features_path, nrows=0).columns
+        if c != "user_id"
+    ]
+    labels = pd.read_csv(labels_path).set_index("user_id")["is_threat"]
+
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    open_memmap = np.lib.format.open_memmap
+    X = open_memmap(tmp_dir / "X.npy", mode="w+", dtype=dtype,
+                    shape=(n_rows, len(feature_columns)))
+    y = open_memmap(tmp_dir / "y.npy", mode="w+", dtype=np.int8,
+                    shape=(n_rows,))
+    user_ids = open_memmap(tmp_dir / "user_ids.npy", mode="w+",
+                           dtype=f"S{id_width}", shape=(n_rows,))
+
+    # Pass 2: fill the memmaps in place
+    start = 0
+    for chunk in pd.read_csv(features_path, chunksize=chunk_rows):
+        stop = start + len(chunk)
+        X[start:stop] = chunk[feature_columns].to_numpy(dtype=dtype)
+        chunk_labels = labels.reindex(chunk["user_id"])
+        if chunk_labels.isna().any():
+            raise ValueError(
+                f"{labels_path.name} has no label for "
+                f"{chunk_labels.isna().sum()} users in {features_path.name}"
+            )
+        y[start:stop] = chunk_labels.to_numpy()
+        user_ids[start:stop] = chunk["user_id"].astype(str).str.encode(
+            "utf-8"
+        ).to_numpy()
+        start = stop
+    for arr in (X, y, user_ids):
+        arr.flush()
+    del X, y, user_ids
+
+    meta = {
+        "rows": n_rows,
+        "dtype": dtype.name,
+        "feature_columns": feature_columns,
+        "sources": _source_signature([features_path, labels_path]),
+    }
+    with open(tmp_dir / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    logger.info(
+        f"Feature store built: {store_dir} "
+        f"({n_rows} x {len(feature_columns)} {dtype.name})"
+    )
+    return store_dir
+
+
+def is_stale(store_dir=None):
+    store_dir = store_dir or FEATURE_STORE_CONFIG["store_dir"]
+    meta_path = store_dir / "meta.json"
+    if not meta_path.exists():
+        return True
+    with open(meta_path) as f:
+        meta = json.load(f)
+    sources = _source_signature(source_files())
+    return (
+        meta["sources"] != sources
+        or meta["dtype"] != np.dtype(FEATURE_STORE_CONFIG["dtype"]).name
+    )
+
+
+def load_feature_store(store_dir=None, mmap_mode="r", refresh=True):
+    """Open the feature store, memory-mapped read-only by default.
+
+    Returns a dict with ``X``, ``y``, ``user_ids``, ``feature_columns``
+    and ``store_dir``. Slices of ``X`` are views of the file, and joblib
+    sends memmaps to its workers by file reference, so every trainer
+    worker shares the page cache instead of holding its own copy. Pass
+    ``store_dir`` (not the arrays) to ``ProcessPoolExecutor`` workers and
+    open the store there with ``refresh=False``.
+
+    With ``refresh`` the store is (re)built from the CSVs when missing or
+    older than them.
+    """
+    store_dir = store_dir or FEATURE_STORE_CONFIG["store_dir"]
+    if refresh and is_stale(store_dir):
+        build_feature_store(store_dir=store_dir)
+    with open(store_dir / "meta.json") as f:
+        meta = json.load(f)
+    return {
+        "X": np.load(store_dir / "X.npy", mmap_mode=mmap_mode),
+        "y": np.load(store_dir / "y.npy", mmap_mode=mmap_mode),
+        "user_ids": np.load(store_dir / "user_ids.npy", mmap_mode=mmap_mode),
+        "feature_columns": meta["feature_columns"],
+        "store_dir": store_dir,
+    }
+
+
+def write_fold_blocks(X, y, folds, out_dir, transforms=None,
+                      chunk_rows=None):
+    """Copy each fold's rows into their own contiguous ``.npy`` files.
+
+    ``folds`` maps a name to row indices; rows are written in that order
+    as ``{name}_X.npy`` / ``{name}_y.npy``. Workers memory-map a block and
+    train on slices of it, which are views of the file: fancy-indexing
+    the shared matrix (``X[train_idx]``) would build a private copy of the
+    fold in every worker. ``transforms`` (name -> callable) is applied
+    chunk by chunk on the way, e.g. a fold's scaling. Written aside and
+    renamed into place; returns ``out_dir``.
+    """
+    chunk_rows = int(chunk_rows or FEATURE_STORE_CONFIG["chunk_rows"])
+    transforms = transforms or {}
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    open_memmap = np.lib.format.open_memmap
+    for name, idx in folds.items():
+        transform = transforms.get(name)
+        block = open_memmap(tmp_dir / f"{name}_X.npy", mode="w+",
+                            dtype=X.dtype, shape=(len(idx), X.shape[1]))
+        for start in range(0, len(idx), chunk_rows):
+            rows = X[idx[start:start + chunk_rows]]
+            if transform is not None:
+                rows = transform(rows)
+            block[start:start + len(rows)] = rows
+        block.flush()
+        del block
+        np.save(tmp_dir / f"{name}_y.npy", np.asarray(y)[idx])
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def load_fold_block(block_dir, name, mmap_mode="r"):
+    """``(X, y)`` of one block written by ``write_fold_blocks``."""
+    return (
+        np.load(block_dir / f"{name}_X.npy", mmap_mode=mmap_mode),
+        np.load(block_dir / f"{name}_y.npy", mmap_mode=mmap_mode),
+    )
+
+
+if __name__ == "__main__":
+    build_feature_store()
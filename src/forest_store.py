@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+import numpy as np
+# sklearn is only imported to save: loading and scoring need numpy alone
+from config import FOREST_STORE_CONFIG
+from logger import setup_logger
+from model_registry import file_sha256
+
+logger = setup_logger(__name__)
+
+META_FILE = "meta.json"
+# Per-node arrays of all trees, concatenated. ``children`` holds global
+# (left, right) node ids; a child that is a leaf is stored as ``~id``
+# (negative), so traversal knows it stops there without another lookup.
+NODE_ARRAYS = ("children", "feature", "threshold", "value")
+
+
+def _average_path_length(n):
+    """Expected path length of an unsuccessful BST search among ``n``
+    points (IsolationForest's depth correction)."""
+    n = np.asarray(n, dtype=float)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = (
+        2.0 * (np.log(n[big] - 1.0) + np.euler_gamma)
+        - 2.0 * (n[big] - 1.0) / n[big]
+    )
+    return out
+
+
+def _node_depths(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):  # children always follow their parent
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return depth
+
+
+def _flatten(trees, node_value, tree_features=None):
+    """Concatenate per-tree node arrays; returns ``(arrays, roots)``."""
+    parts = {name: [] for name in NODE_ARRAYS}
+    roots, offset = [], 0
+    for t, tree in enumerate(trees):
+        leaf = tree.children_left == -1
+        ids = np.arange(tree.node_count) + offset
+        encoded = np.where(leaf, ~ids, ids)  # leaves as ~id
+        children = np.zeros((tree.node_count, 2), dtype=np.int64)
+        children[~leaf, 0] = encoded[tree.children_left[~leaf]]
+        children[~leaf, 1] = encoded[tree.children_right[~leaf]]
+        feature = tree.feature.copy()
+        if tree_features is not None:
+            # Bagged feature subsets: map back to global columns
+            feature[~leaf] = tree_features[t][feature[~leaf]]
+        feature[leaf] = 0
+        parts["children"].append(children)
+        parts["feature"].append(feature)
+        parts["threshold"].append(tree.threshold)
+        parts["value"].append(node_value(tree))
+        roots.append(encoded[0])
+        offset += tree.node_count
+    arrays = {
+        "children": np.concatenate(parts["children"]).astype(np.int32),
+        "feature": np.concatenate(parts["feature"]).astype(np.int32),
+        "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+        "value": np.concatenate(parts["value"]).astype(np.float64),
+    }
+    return arrays, np.asarray(roots, dtype=np.int64)
+
+
+def _iso_path_length(tree):
+    depth = _node_depths(tree.children_left, tree.children_right)
+    return depth + _average_path_length(tree.n_node_samples)
+
+
+def _class_proba(tree):
+    value = tree.value[:, 0, :]
+    return value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12)
+
+
+def save_forest(model, path):
+    """Write a fitted IsolationForest or RandomForestClassifier as raw
+    ``.npy`` node arrays plus ``meta.json`` (with their sha256 hashes).
+
+    The directory is written aside and renamed into place.
+    """
+    from sklearn.ensemble import IsolationForest, RandomForestClassifier
+
+    trees = [est.tree_ for est in model.estimators_]
+    meta = {"n_features": int(model.n_features_in_)}
+    if isinstance(model, IsolationForest):
+        arrays, roots = _flatten(
+            trees, _iso_path_length, model.estimators_features_
+        )
+        meta.update({
+            "kind": "isolation_forest",
+            "offset": float(model.offset_),
+            "max_samples": int(model.max_samples_),
+        })
+    elif isinstance(model, RandomForestClassifier):
+        arrays, roots = _flatten(trees, _class_proba)
+        meta.update({
+            "kind": "random_forest",
+            "classes": model.classes_.tolist(),
+            "feature_importances": model.feature_importances_.tolist(),
+        })
+    else:
+        raise TypeError(f"Cannot store {type(model).__name__} as arrays")
+    arrays["roots"] = roots
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    meta["files"] = {}
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr)
+        meta["files"][name] = file_sha256(tmp / f"{name}.npy")
+    with open(tmp / META_FILE, "w") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    logger.info(f"Stored {meta['kind']} arrays: {path}")
+    return path
+
+
+def verify_forest(path):
+    """Raise if any array no longer matches the hash in ``meta.json``."""
+    with open(path / META_FILE) as f:
+        meta = json.load(f)
+    for name, digest in meta["files"].items():
+        if file_sha256(path / f"{name}.npy") != digest:
+            raise ValueError(f"{path / name}.npy does not match meta.json")
+    return meta
+
+
+def load_forest(path, mmap_mode="r", verify=True):
+    """Open a stored forest; arrays are memory-mapped by default, so
+    loading costs a few ``open`` calls and processes share the pages."""
+    if verify:
+        meta = verify_forest(path)
+    else:
+        with open(path / META_FILE) as f:
+            meta = json.load(f)
+    arrays = {
+        name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+        for name in meta["files"]
+    }
+    cls = {
+        "isolation_forest": MappedIsolationForest,
+        "random_forest": MappedForestClassifier,
+    }[meta["kind"]]
+    return cls(arrays, meta)
+
+
+class _MappedForest:
+    """Vectorized traversal over concatenated node arrays.
+
+    All rows walk all trees together, one level per step: a
+    ``(rows, trees)`` matrix of node ids advances until every entry is a
+    leaf. Rows go in chunks of ``chunk_rows`` to bound that matrix.
+    Inputs are cast to float32 first, as sklearn's trees do, so splits
+    match the original model exactly.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.n_features_in_ = meta["n_features"]
+        self.n_estimators = len(arrays["roots"])
+        self.chunk_rows = int(FOREST_STORE_CONFIG["chunk_rows"])
+
+    def _leaves(self, X):
+        """Leaf id reached by every row in every tree, ``(rows, trees)``."""
+        children = self.arrays["children"].reshape(-1)
+        feature, threshold = self.arrays["feature"], self.arrays["threshold"]
+        n_rows, n_features = X.shape
+        values = X.reshape(-1)
+        # One entry per (row, tree); only entries not yet at a leaf are
+        # kept in ``todo`` / ``node`` / ``base``
+        leaves = np.tile(self.arrays["roots"].astype(np.int64), n_rows)
+        todo = np.flatnonzero(leaves >= 0)
+        node = leaves[todo]
+        base = (todo // self.n_estimators) * n_features
+        while len(todo):
+            go_right = values[base + feature[node]] > threshold[node]
+            node = children[2 * node + go_right]
+            done = node < 0
+            if done.any():
+                leaves[todo[done]] = node[done]
+                keep = ~done
+                todo, node, base = todo[keep], node[keep], base[keep]
+        return (~leaves).reshape(n_rows, self.n_estimators)
+
+    def _per_chunk(self, X, func):
+        X = np.asarray(X, dtype=np.float32)
+        return np.concatenate([
+            func(self._leaves(X[start:start + self.chunk_rows]))
+            for start in range(0, max(len(X), 1), self.chunk_rows)
+        ])
+
+
+class MappedIsolationForest(_MappedForest):
+    """``score_samples``/``decision_function``/``predict`` of a stored
+    IsolationForest."""
+
+    def score_samples(self, X):
+        value = self.arrays["value"]
+        norm = _average_path_length([self.meta["max_samples"]])[0]
+        depths = self._per_chunk(X, lambda leaves: value[leaves].sum(axis=1))
+        return -(2.0 ** (-depths / (self.n_estimators * norm)))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.meta["offset"]
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+class MappedForestClassifier(_MappedForest):
+    """``predict_proba``/``predict`` of a stored RandomForestClassifier."""
+
+    def __init__(self, arrays, meta):
+        super().__init__(arrays, meta)
+        self.classes_ = np.asarray(meta["classes"])
+        self.feature_importances_ = np.asarray(meta["feature_importances"])
+
+    def predict_proba(self, X):
+        value = self.arrays["value"]
+        return self._per_chunk(
+            X, lambda leaves: value[leaves].mean(axis=1)
+        )
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# Model name -> stored forest directory in the models directory
+STORED_FORESTS = {
+    "iso_forest": "iso_forest_model.forest",
+    "supervised": "supervised_model.forest",
+}
+
+
+def export_forests(models, models_dir):
+    """Store every supported model of ``models`` (name -> estimator) as
+    arrays next to its pickle.
+
+    Called on every save: any other store in ``models_dir`` (the store is
+    disabled, the model is missing, or it is unsupported, e.g. after
+    switching to XGBoost) is removed, so a store left over from an older
+    model is never published or served in place of its pickle.
+    """
+    from sklearn.ensemble import IsolationForest, RandomForestClassifier
+
+    for name, dirname in STORED_FORESTS.items():
+        model = models.get(name)
+        path = models_dir / dirname
+        if FOREST_STORE_CONFIG["enabled"] and isinstance(
+            model, (IsolationForest, RandomForestClassifier)
+        ):
+            save_forest(model, path)
+        elif path.exists():
+            shutil.rmtree(path)
+            logger.info(f"Removed stale forest store: {path}")
@@ -14,6 +14,7 @@ def generate_final_report():
     logger.info("="*60)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    PATHS["reports"].mkdir(parents=True, exist_ok=True)
 
     # 1. Model Performance Summary
     logger.info("\n1. MODEL PERFORMANCE SUMMARY")
@@ -1,9 +1,9 @@
 import logging
 import pandas as pd
 import numpy as np
-from imblearn.over_sampling import SMOTE
 from data_pipeline import DataPipeline
-from config import PATHS
+from balancing import MinorityOversampler
+from config import PATHS, MODEL_CONFIG
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,7 +25,13 @@ def generate_synthetic_data():
     logger.info(f"Original distribution: {np.bincount(y)}")
 
     # Apply SMOTE to balance to 40% positives
-    smote = SMOTE(sampling_strategy=0.4, random_state=42, k_neighbors=3)
+    bal_cfg = MODEL_CONFIG.get("balancing", {})
+    smote = MinorityOversampler(
+        sampling_strategy=0.4,
+        k_neighbors=3,
+        neighbors=bal_cfg.get("neighbors", "auto"),
+        random_state=42,
+    )
     X_bal, y_bal = smote.fit_resample(X, y)
 
     logger.info(f"Balanced distribution: {np.bincount(y_bal)}")
@@ -35,9 +41,9 @@ def generate_synthetic_data():
     )
 
     # Create user IDs for synthetic samples
-    synthetic_user_ids = list(user_ids)
-    for i in range(len(X_bal) - len(X)):
-        synthetic_user_ids.append(f"USER_SYN_{i:04d}")
+    synthetic_user_ids = list(user_ids) + [
+        f"USER_SYN_{i:04d}" for i in range(num_synthetic)
+    ]
 
     # Save balanced features
     feature_cols = result['feature_columns']
@@ -0,0 +1,289 @@
+import os
+import joblib
+import numpy as np
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier,
+    IsolationForest,
+    RandomForestClassifier,
+)
+from sklearn.model_selection import train_test_split
+from sklearn.svm import OneClassSVM
+from calibration import (
+    FoldEnsembleClassifier,
+    PrefitCalibratedClassifier,
+    fit_calibrator,
+)
+from config import PATHS, MODEL_CONFIG, RETRAIN_CONFIG, DRIFT_CONFIG
+from drift_monitor import DriftReference
+from forest_store import export_forests
+from logger import setup_logger
+from model_registry import ModelRegistry, atomic_dump
+from scalable_ocsvm import ApproxOneClassSVM
+
+logger = setup_logger(__name__)
+
+MODEL_FILES = {
+    "scaler": "scaler.pkl",
+    "iso_forest": "iso_forest_model.pkl",
+    "oc_svm": "one_class_svm_model.pkl",
+    "supervised": "supervised_model.pkl",
+    "calibrated": "calibrated_supervised.pkl",
+}
+REFERENCE_FILE = "reference_features.npy"
+
+
+class IncrementalRetrainer:
+    """Update saved models in place from a batch of new feature rows.
+
+    Instead of re-running the whole pipeline, each component is continued
+    from its saved state:
+
+    * scaler: kept frozen. Every model was fitted in its feature space,
+      and warm-started trees are mixed with the existing ones, so moving
+      it would silently shift the inputs of everything not refitted; a
+      full retrain refits it
+    * IsolationForest / RandomForest: ``warm_start`` with extra trees
+      fitted on the new rows only
+    * XGBoost: boosting continues from the saved booster
+    * HistGradientBoosting: ``warm_start`` with extra iterations
+    * approximate OC-SVM: ``partial_fit``; exact OC-SVM: refit on the
+      bounded window of recent rows kept as the drift reference
+    * calibrator: refitted on a held-out share of the new labels
+
+    Only drifted components are touched. Unsupervised detectors are
+    updated when any feature's PSI against the training histograms
+    (``DriftReference``) exceeds ``psi_threshold``; the supervised model
+    is updated on drift or once ``min_new_labels`` new labels are
+    available. After a drift update the histograms are rebuilt from the
+    recent window.
+    """
+
+    def __init__(self, models_dir=None, config=None):
+        self.models_dir = models_dir or PATHS["models"]
+        self.config = {**RETRAIN_CONFIG, **(config or {})}
+        self.models = {}
+        self.reference = None
+        self.drift_reference = None
+        self.report = {}
+
+    def load(self):
+        for key, filename in MODEL_FILES.items():
+            path = self.models_dir / filename
+            self.models[key] = joblib.load(path) if path.exists() else None
+        self.feature_columns = joblib.load(
+            self.models_dir / "feature_columns.pkl"
+        )
+        ref_path = self.models_dir / REFERENCE_FILE
+        if ref_path.exists():
+            self.reference = np.load(ref_path)
+        hist_path = self.models_dir / DRIFT_CONFIG["reference_file"]
+        if hist_path.exists():
+            self.drift_reference = DriftReference.load(hist_path)
+        else:
+            logger.warning(
+                "No drift reference found; treating all features as drifted"
+            )
+        return self
+
+    def save(self, publish=True):
+        """Write the updated models and (by default) publish them as a new
+        registry version. Returns the version id, or None."""
+        for key, filename in MODEL_FILES.items():
+            if self.models.get(key) is not None:
+                atomic_dump(self.models[key], self.models_dir / filename)
+            else:
+                # e.g. a dropped calibrator: never publish the stale file
+                (self.models_dir / filename).unlink(missing_ok=True)
+        if self.reference is not None:
+            tmp = self.models_dir / "reference_features.tmp.npy"
+            np.save(tmp, self.reference)
+            os.replace(tmp, self.models_dir / REFERENCE_FILE)
+        if self.drift_reference is not None:
+            self.drift_reference.save(
+                self.models_dir / DRIFT_CONFIG["reference_file"]
+            )
+        export_forests(self.models, self.models_dir)
+        logger.info(f"✅ Updated models saved to {self.models_dir}")
+        if publish:
+            return ModelRegistry().publish(
+                self.models_dir, {"source": "incremental"}
+            )
+        return None
+
+    def detect_drift(self, X_raw):
+        """Return ``(drifted, psi)`` for new raw feature rows."""
+        if self.drift_reference is None:
+            return True, None
+        psi = self.drift_reference.compare(X_raw)["psi"].to_numpy()
+        threshold = float(self.config["psi_threshold"])
+        drifted = np.flatnonzero(psi > threshold)
+        for j in drifted:
+            logger.info(
+                f"Drift: {self.feature_columns[j]} PSI={psi[j]:.3f}"
+            )
+        return len(drifted) > 0, psi
+
+    def update(self, features_df, labels=None, components=None):
+        """Apply one incremental update.
+
+        ``features_df`` holds raw (unscaled) engineered features for new or
+        changed users, with the training ``feature_columns``; ``labels``
+        (optional) are their ``is_threat`` values in the same row order.
+        ``components`` (a subset of ``{"unsupervised", "supervised"}``)
+        overrides the drift/label-volume decision, e.g. when a scheduler
+        has already made it. Returns a dict describing what was updated.
+        """
+        X_raw = features_df[self.feature_columns].to_numpy(dtype=float)
+        scaler = self.models["scaler"]
+        drifted, psi = self.detect_drift(X_raw)
+
+        n_labels = 0 if labels is None else len(labels)
+        has_both_classes = (
+            labels is not None and len(np.unique(labels)) > 1
+        )
+        update_supervised = has_both_classes and (
+            drifted or n_labels >= int(self.config["min_new_labels"])
+        )
+        if components is not None:
+            drifted = "unsupervised" in components
+            update_supervised = has_both_classes and (
+                "supervised" in components
+            )
+
+        self.report = {
+            "rows": len(X_raw),
+            "drifted": bool(drifted),
+            "max_psi": None if psi is None else float(psi.max()),
+            "updated": [],
+        }
+        if not drifted and not update_supervised:
+            logger.info("No drift and too few new labels; nothing to update")
+            return self.report
+
+        X_new = scaler.transform(X_raw)
+        if drifted:
+            if self.reference is not None:
+                window = np.vstack([self.reference, X_new])
+            else:
+                window = X_new
+            self.reference = window[-int(self.config["reference_rows"]):]
+            self.drift_reference = DriftReference.fit(
+                scaler.inverse_transform(self.reference),
+                self.feature_columns
+            )
+            self._update_iso_forest(X_new)
+            self._update_oc_svm(X_new, self.reference)
+        if update_supervised:
+            self._update_supervised(X_new, np.asarray(labels))
+
+        logger.info(f"✅ Incremental update: {self.report}")
+        return self.report
+
+    def _update_iso_forest(self, X):
+        model = self.models["iso_forest"]
+        if model is None:
+            return
+        new_trees = int(self.config["iso_forest_new_trees"])
+        if not isinstance(model, IsolationForest):
+            logger.warning("Unknown anomaly model type; skipping update")
+            return
+        model.set_params(
+            warm_start=True, n_estimators=model.n_estimators + new_trees
+        )
+        model.fit(X)
+        self.report["updated"].append("iso_forest")
+
+    def _update_oc_svm(self, X, window):
+        model = self.models["oc_svm"]
+        if model is None:
+            return
+        if isinstance(model, ApproxOneClassSVM):
+            model.partial_fit(X)
+        elif isinstance(model, OneClassSVM):
+            # No incremental form; refit on the recent reference window,
+            # which is bounded by reference_rows
+            model.fit(window)
+        else:
+            logger.warning("Unknown OC-SVM type; skipping update")
+            return
+        self.report["updated"].append("oc_svm")
+
+    def _continue_supervised(self, model, X, y):
+        """Grow a fitted supervised model on new rows; returns the model."""
+        if isinstance(model, FoldEnsembleClassifier):
+            model.models = [
+                self._continue_supervised(m, X, y) for m in model.models
+            ]
+            return model
+
+        if isinstance(model, RandomForestClassifier):
+            new_trees = int(self.config["random_forest_new_trees"])
+            model.set_params(
+                warm_start=True, n_estimators=model.n_estimators + new_trees
+            )
+            return model.fit(X, y)
+
+        new_rounds = int(self.config["boosting_new_rounds"])
+        if isinstance(model, HistGradientBoostingClassifier):
+            model.set_params(
+                warm_start=True, max_iter=model.n_iter_ + new_rounds
+            )
+            return model.fit(X, y)
+
+        if hasattr(model, "get_booster"):
+            # XGBoost: continue boosting from the saved booster
+            params = {**model.get_params(), "n_estimators": new_rounds}
+            updated = type(model)(**params)
+            return updated.fit(X, y, xgb_model=model.get_booster())
+
+        logger.warning(
+            f"{type(model).__name__} cannot be updated incrementally; "
+            "refitting on new rows"
+        )
+        return model.fit(X, y)
+
+    def _update_supervised(self, X, y):
+        holdout = float(self.config["calibration_holdout"])
+        can_calibrate = (
+            self.models.get("calibrated") is not None
+            and np.bincount(y.astype(int)).min() >= 2
+        )
+        if can_calibrate:
+            X_fit, X_cal, y_fit, y_cal = train_test_split(
+                X, y, test_size=holdout, stratify=y, random_state=42
+            )
+        else:
+            X_fit, y_fit = X, y
+
+        model = self._continue_supervised(
+            self.models["supervised"], X_fit, y_fit
+        )
+        self.models["supervised"] = model
+        self.report["updated"].append("supervised")
+
+        if can_calibrate:
+            method = MODEL_CONFIG.get("random_forest", {}).get(
+                "calibration", "isotonic"
+            )
+            calibrator = fit_calibrator(
+                model.predict_proba(X_cal)[:, 1], y_cal, method
+            )
+            self.models["calibrated"] = PrefitCalibratedClassifier(
+                model, calibrator
+            )
+            self.report["updated"].append("calibrated")
+        elif isinstance(self.models.get("calibrated"),
+                        PrefitCalibratedClassifier):
+            # Too few labels per class to recalibrate: keep the previous
+            # mapping, but on top of the updated model
+            self.models["calibrated"] = PrefitCalibratedClassifier(
+                model, self.models["calibrated"].calibrator
+            )
+            self.report["updated"].append("calibrated")
+        elif self.models.get("calibrated") is not None:
+            # It wraps the old model and scorers prefer it, so keeping it
+            # would hide the update
+            logger.warning(
+                "Too few labels to recalibrate; dropping the calibrator"
+            )
+            self.models["calibrated"] = None
@@ -0,0 +1,48 @@
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Lets entry points name heavy optional dependencies at the top of a
+    file without paying for them at startup. A missing package raises
+    ``ImportError`` at that first use, where callers already handle it.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            # importlib's per-module locks make concurrent first use safe
+            module = importlib.import_module(self._name)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def available(name):
+    """Whether ``name`` can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:  # parent package missing
+        return False
+
+
+plotly_express = lazy_import("plotly.express")
+plotly_graph_objects = lazy_import("plotly.graph_objects")
+shap = lazy_import("shap")
+xgboost = lazy_import("xgboost")
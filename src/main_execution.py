@@ -6,7 +6,11 @@ from data_pipeline import DataPipeline
 from model_trainer import HybridModelTrainer
 from risk_scorer import RiskScorer
 from reporter import ReportGenerator
-from explainability import explain_predictions
+from explainability import ExplanationService, published_version
+from drift_monitor import DriftReference, drift_report, save_drift_report
+from model_registry import ModelRegistry
+from retrain_scheduler import mark_trained
+from config import PATHS, DRIFT_CONFIG, training_model_config
 
 logger = setup_logger(__name__)
 
@@ -31,6 +35,18 @@ def main():
 
     features_raw = pipeline_result["features_raw"]
     X_scaled = pipeline_result["features_scaled"]
+    feature_columns = pipeline_result["feature_columns"]
+
+    # Drift of this population against the previous training snapshot
+    reference_path = PATHS["models"] / DRIFT_CONFIG["reference_file"]
+    if reference_path.exists():
+        drift = drift_report(DriftReference.load(reference_path), features_raw)
+        drift_path = save_drift_report(drift)
+        drifted = drift.loc[drift["drifted"], "feature"].tolist()
+        logger.info(
+            f"Drift report: {drift_path} "
+            f"(max PSI={drift['psi'].max():.3f}, drifted={drifted})"
+        )
 
     # ==================== STEP 2: TRAIN/TEST SPLIT ====================
     logger.info("\n[STEP 2/5] Splitting Data...")
@@ -62,8 +78,12 @@ def main():
 
     # ==================== STEP 3: MODEL TRAINING ====================
     logger.info("\n[STEP 3/5] Training Models...")
-    trainer = HybridModelTrainer()
-    trainer.run(X_train, X_test, y_train, y_test)
+    # Saved first so the published model version includes it
+    DriftReference.fit(features_raw, feature_columns).save(reference_path)
+    trainer = HybridModelTrainer(config=training_model_config())
+    training = trainer.run(X_train, X_test, y_train, y_test)
+    # Real labels, as counted by the retrain scheduler
+    mark_trained(0 if labels_df is None else len(labels_df))
 
     # ==================== STEP 4: RISK SCORING ====================
     logger.info("\n[STEP 4/5] Scoring Risk...")
@@ -82,16 +102,22 @@ def main():
 
     # ==================== STEP 5: EXPLAINABILITY ====================
     logger.info("\n[STEP 5/5] Explainability + Reporting...")
-    explanations = explain_predictions(
-        trainer.random_forest,
-        X_scaled,
-        pipeline_result["feature_columns"],
-        top_k=5
+    # Reports only show critical/high users, so only they are explained
+    explainer = ExplanationService(
+        trainer.supervised, feature_columns, top_k=5,
+        version=published_version(
+            ModelRegistry().manifest(training["version"])
+        )
+    )
+    explanations = explainer.explain_top_risk(
+        X_scaled, risk_df, pipeline_result["user_ids"]
     )
 
     # ==================== STEP 6: REPORTING ====================
-    report = ReportGenerator.generate_report(
-        risk_df, summary, explanations=explanations
+    # Explanations go to their own file to keep the report small
+    report = ReportGenerator.generate_report(risk_df, summary)
+    report["explanations_file"] = str(
+        ReportGenerator.save_explanations_json(explanations)
     )
     ReportGenerator.save_report_json(report)
     ReportGenerator.save_report_csv(risk_df)
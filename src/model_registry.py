@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from datetime import datetime
+import joblib
+import numpy as np
+from config import PATHS, DRIFT_CONFIG, REGISTRY_CONFIG, FOREST_STORE_CONFIG
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Artifact name -> file in the working models directory
+ARTIFACTS = {
+    "scaler": "scaler.pkl",
+    "feature_columns": "feature_columns.pkl",
+    "iso_forest": "iso_forest_model.pkl",
+    "oc_svm": "one_class_svm_model.pkl",
+    "supervised": "supervised_model.pkl",
+    "calibrated": "calibrated_supervised.pkl",
+    "reference_features": "reference_features.npy",
+    "drift_reference": DRIFT_CONFIG["reference_file"],
+    # Memory-mappable copies of the tree models (see forest_store)
+    "iso_forest_arrays": "iso_forest_model.forest",
+    "supervised_arrays": "supervised_model.forest",
+}
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def atomic_dump(obj, path):
+    """``joblib.dump`` to a temporary file, then rename over ``path``, so
+    readers see either the old file or the new one, never a partial one."""
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_text_atomic(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _make_writable(func, path, _):
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def _make_read_only(path):
+    files = path.rglob("*") if path.is_dir() else [path]
+    for file in files:
+        if file.is_file():
+            os.chmod(file, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+
+def _artifact_sha256(path):
+    """Content hash of an artifact; a stored forest directory is hashed
+    through its ``meta.json``, which lists the hashes of its arrays."""
+    if path.is_dir():
+        from forest_store import META_FILE, verify_forest
+        verify_forest(path)
+        return file_sha256(path / META_FILE)
+    return file_sha256(path)
+
+
+def _artifact_bytes(path):
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir())
+    return path.stat().st_size
+
+
+class ModelRegistry:
+    """Immutable, versioned model directories with an atomic pointer.
+
+    ``publish`` copies a consistent set of artifacts into a new directory
+    under ``versions/``, writes a manifest (content hashes, feature
+    columns, threshold) and renames the directory into place; its files
+    are then made read-only. ``promote`` replaces the ``CURRENT`` pointer
+    file in one ``os.replace``, so a reader resolving the current version
+    gets either the old or the new one, and everything it loads from that
+    directory belongs together. Readers either follow ``CURRENT`` or pin
+    a version.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or REGISTRY_CONFIG["root"]
+        self.versions_dir = self.root / "versions"
+
+    def versions(self):
+        if not self.versions_dir.exists():
+            return []
+        return sorted(
+            p.name for p in self.versions_dir.iterdir()
+            if p.name.startswith("v") and (p / MANIFEST_FILE).exists()
+        )
+
+    def current_version(self):
+        pointer = self.root / CURRENT_FILE
+        if not pointer.exists():
+            return None
+        return pointer.read_text().strip() or None
+
+    def resolve(self, version=None):
+        """``version`` if pinned, else the promoted one."""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No promoted model in {self.root}")
+        if not (self.versions_dir / version / MANIFEST_FILE).exists():
+            raise FileNotFoundError(f"Unknown model version: {version}")
+        return version
+
+    def manifest(self, version=None):
+        version = self.resolve(version)
+        with open(self.versions_dir / version / MANIFEST_FILE) as f:
+            return json.load(f)
+
+    def publish(self, models_dir=None, metadata=None):
+        """Snapshot the artifacts in ``models_dir`` as a new version.
+
+        Missing optional artifacts are skipped. ``metadata`` (e.g.
+        ``threshold``) goes into the manifest; a threshold not given is
+        carried over from the current version. Returns the version id.
+        """
+        models_dir = models_dir or PATHS["models"]
+        metadata = dict(metadata or {})
+        current = self.current_version()
+        if "threshold" not in metadata and current is not None:
+            metadata["threshold"] = self.manifest(current).get("threshold")
+
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        tmp_dir = self.versions_dir / f".tmp_{ts}"
+        tmp_dir.mkdir()
+        artifacts = {}
+        for name, filename in ARTIFACTS.items():
+            src = models_dir / filename
+            if not src.exists():
+                continue
+            dest = tmp_dir / filename
+            if src.is_dir():
+                shutil.copytree(src, dest)
+            else:
+                shutil.copyfile(src, dest)
+            artifacts[name] = {
+                "file": filename,
+                "sha256": _artifact_sha256(dest),
+                "bytes": _artifact_bytes(dest),
+            }
+        if "supervised" not in artifacts:
+            shutil.rmtree(tmp_dir)
+            raise FileNotFoundError(f"No trained models in {models_dir}")
+
+        content = hashlib.sha256(json.dumps(
+            {n: a["sha256"] for n, a in sorted(artifacts.items())}
+        ).encode()).hexdigest()
+        # Microseconds keep ids unique and time-ordered within a second
+        version = f"v{ts}_{content[:8]}"
+        feature_columns = None
+        if "feature_columns" in artifacts:
+            feature_columns = list(joblib.load(
+                tmp_dir / ARTIFACTS["feature_columns"]
+            ))
+        manifest = {
+            "version": version,
+            "created_at": datetime.now().isoformat(),
+            "content_sha256": content,
+            "feature_columns": feature_columns,
+            **metadata,
+            "artifacts": artifacts,
+        }
+        with open(tmp_dir / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+        _make_read_only(tmp_dir)
+
+        os.replace(tmp_dir, self.versions_dir / version)
+        logger.info(f"✅ Published model version {version}")
+        return version
+
+    def promote(self, version):
+        """Atomically point ``CURRENT`` at ``version``."""
+        version = self.resolve(version)
+        self.verify(version)
+        previous = self.current_version()
+        _write_text_atomic(self.root / CURRENT_FILE, version + "\n")
+        logger.info(f"✅ Promoted {version} (was {previous})")
+        return previous
+
+    def verify(self, version=None):
+        """Raise if any artifact no longer matches its manifest hash."""
+        version = self.resolve(version)
+        manifest = self.manifest(version)
+        for name, entry in manifest["artifacts"].items():
+            path = self.versions_dir / version / entry["file"]
+            if _artifact_sha256(path) != entry["sha256"]:
+                raise ValueError(
+                    f"{version}/{entry['file']} does not match its manifest"
+                )
+        return manifest
+
+    def load(self, version=None, verify=True):
+        """Load one version's pickled artifacts.
+
+        Returns a dict with ``version``, ``manifest``, ``path`` and
+        ``models`` (artifact name -> object; ``.npy``/``.npz`` artifacts
+        are given as paths). With ``FOREST_STORE_CONFIG["prefer_arrays"]``
+        a model that also has a stored forest is memory-mapped from it
+        instead of unpickled.
+        """
+        version = self.resolve(version)
+        manifest = self.verify(version) if verify else self.manifest(version)
+        path = self.versions_dir / version
+        artifacts = manifest["artifacts"]
+        models = {}
+        if FOREST_STORE_CONFIG["prefer_arrays"]:
+            from forest_store import load_forest
+            for name in ("iso_forest", "supervised"):
+                if f"{name}_arrays" in artifacts:
+                    models[name] = load_forest(
+                        path / artifacts[f"{name}_arrays"]["file"],
+                        verify=False  # covered by the manifest check
+                    )
+        for name, entry in artifacts.items():
+            if name in models or name.endswith("_arrays"):
+                continue
+            file_path = path / entry["file"]
+            models[name] = (
+                joblib.load(file_path) if file_path.suffix == ".pkl"
+                else file_path
+            )
+        return {
+            "version": version,
+            "manifest": manifest,
+            "path": path,
+            "models": models,
+        }
+
+    def prune(self, keep=None):
+        """Delete all but the newest ``keep`` versions (never CURRENT)."""
+        keep = int(keep or REGISTRY_CONFIG["keep_versions"])
+        current = self.current_version()
+        versions = self.versions()
+        removed = []
+        for version in versions[:max(0, len(versions) - keep)]:
+            if version == current:
+                continue
+            shutil.rmtree(self.versions_dir / version, onerror=_make_writable)
+            removed.append(version)
+        return removed
+
+
+def load_deployed(version=None, models_dir=None):
+    """Models for scoring: the pinned version (``version`` or
+    ``REGISTRY_CONFIG["pinned_version"]``), else the promoted one.
+
+    Before anything has been deployed, falls back to the pickles in the
+    working models directory (``version`` is then None).
+    """
+    registry = ModelRegistry()
+    version = version or REGISTRY_CONFIG["pinned_version"]
+    if version or registry.current_version():
+        return registry.load(version)
+    models_dir = models_dir or PATHS["models"]
+    logger.warning(f"No deployed model version; loading from {models_dir}")
+    return {
+        "version": None,
+        "manifest": None,
+        "path": models_dir,
+        "models": {
+            name: joblib.load(models_dir / filename)
+            for name, filename in ARTIFACTS.items()
+            if filename.endswith(".pkl") and (models_dir / filename).exists()
+        },
+    }
+
+
+def load_pickled(deployed, name):
+    """The pickled estimator ``name`` of a loaded version, for consumers
+    that need the real object (e.g. SHAP) where ``load`` mapped a stored
+    forest instead. Loaded on demand, so cold start stays cheap."""
+    model = deployed["models"].get(name)
+    if not hasattr(model, "arrays"):
+        return model
+    return joblib.load(deployed["path"] / ARTIFACTS[name])
+
+
+def warm_up(models, n_rows=None):
+    """Score a dummy batch with every loaded estimator.
+
+    Triggers lazy initialization (thread pools, caches, first-call
+    allocations) before real traffic reaches a freshly loaded version.
+    """
+    n_rows = int(n_rows or REGISTRY_CONFIG["warmup_rows"])
+    feature_columns = models.get("feature_columns")
+    n_features = len(feature_columns) if feature_columns else next(
+        (est.n_features_in_ for est in models.values()
+         if hasattr(est, "n_features_in_")),
+        None
+    )
+    if n_features is None:
+        return
+    X = np.zeros((n_rows, n_features))
+    for est in models.values():
+        for method in ("score_samples", "predict_proba"):
+            if hasattr(est, method):
+                getattr(est, method)(X)
+                break
+
+
+class HotSwapModels:
+    """Follow the registry's CURRENT pointer and swap versions live.
+
+    A background thread polls the pointer every ``poll_seconds``. A new
+    version is loaded, hash-checked and passed through ``prepare`` (e.g.
+    ``warm_up``) off the request path; only then is ``current`` rebound,
+    a single reference assignment. Callers read ``current`` once per
+    request and use that snapshot throughout, so in-flight requests
+    finish on the version they started with. A version that fails to
+    load is logged and skipped; the previous one keeps serving.
+    ``retire(old)`` is called after a swap, e.g. to stop helper threads.
+
+    With a pinned version (argument or ``MODEL_VERSION``) nothing is
+    watched.
+    """
+
+    def __init__(self, prepare=None, retire=None, version=None,
+                 poll_seconds=None, registry=None):
+        self.prepare = prepare or (lambda deployed: deployed)
+        self.retire = retire
+        self.registry = registry or ModelRegistry()
+        self.poll_seconds = float(
+            poll_seconds or REGISTRY_CONFIG["poll_seconds"]
+        )
+        pinned = version or REGISTRY_CONFIG["pinned_version"]
+        deployed = load_deployed(pinned)
+        self.version = deployed["version"]
+        self.current = self.prepare(deployed)
+        self._failed = None
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if pinned is None:
+            self._thread = threading.Thread(
+                target=self._watch, name="model-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                version = self.registry.current_version()
+            except OSError as exc:
+                logger.warning(f"Cannot read model pointer: {exc}")
+                continue
+            if version and version not in (self.version, self._failed):
+                self.swap(version)
+
+    def swap(self, version):
+        """Load, prepare and switch to ``version``; returns success."""
+        with self._swap_lock:
+            start = time.perf_counter()
+            try:
+                ready = self.prepare(self.registry.load(version))
+            except Exception as exc:
+                logger.error(f"Failed to load model version {version}: {exc}")
+                self._failed = version
+                return False
+            old, self.current = self.current, ready
+            previous, self.version = self.version, version
+        logger.info(
+            f"✅ Swapped model {previous} -> {version} "
+            f"({time.perf_counter() - start:.2f}s load + warm-up)"
+        )
+        if self.retire is not None:
+            self.retire(old)
+        return True
+
+    def stop(self):
+        self._stop.set()
@@ -1,39 +1,69 @@
-import joblib
+import os
 import numpy as np
-import pandas as pd
 from sklearn.ensemble import IsolationForest, RandomForestClassifier
-from sklearn.metrics import (
-    classification_report,
-    confusion_matrix,
-    precision_recall_curve,
-    precision_score,
-    recall_score,
-    f1_score,
-)
+from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.svm import OneClassSVM
+from scalable_ocsvm import ApproxOneClassSVM
+from balancing import MinorityOversampler
 from sklearn.calibration import CalibratedClassifierCV
+from calibration import calibrate_holdout, calibrate_out_of_fold
 from sklearn.ensemble import HistGradientBoostingClassifier
-from config import PATHS, MODEL_CONFIG
+from config import PATHS, MODEL_CONFIG, RETRAIN_CONFIG
+from forest_store import export_forests
+from lazy_imports import xgboost
 from logger import setup_logger
+from model_registry import ModelRegistry, atomic_dump
+from threshold_sweep import threshold_sweep, precision_at_k, best_f1_threshold
+from training_scheduler import (
+    TrainingScheduler,
+    resolve_cores,
+    split_core_budget,
+)
 from datetime import datetime
 
 logger = setup_logger(__name__)
 
-try:
-    from imblearn.over_sampling import SMOTE
-except Exception:
-    SMOTE = None
+# Independent components trained by train_components, weighted by their
+# share of the core budget (0 = single-threaded, e.g. libsvm)
+COMPONENTS = {
+    "isolation_forest": 1,
+    "one_class_svm": 0,
+    "supervised": 2,
+}
+
+
+def _fit_component(name, X_train, y_train, n_jobs, config=None):
+    """Fit one component on a fresh trainer and return the estimator.
+
+    Module-level so the process backend can pickle it.
+    """
+    trainer = HybridModelTrainer(n_jobs=n_jobs, config=config)
+    if name == "isolation_forest":
+        return trainer.train_isolation_forest(X_train)
+    if name == "one_class_svm":
+        return trainer.train_one_class_svm(X_train)
+    if name == "supervised":
+        return trainer.train_supervised_calibrated(X_train, y_train)
+    raise ValueError(f"Unknown component: {name}")
 
 
 class HybridModelTrainer:
     """Train hybrid anomaly detection model"""
 
-    def __init__(self):
+    def __init__(self, reports_dir=None, n_jobs=-1, config=None):
+        # reports_dir isolates per-run outputs (e.g. one dir per CV fold);
+        # n_jobs caps the cores each estimator may use; config overrides
+        # MODEL_CONFIG (e.g. one hyperparameter trial).
+        self.reports_dir = reports_dir or PATHS["reports"]
+        self.n_jobs = n_jobs
+        self.config = config or MODEL_CONFIG
         self.iso_forest = None
         self.oc_svm = None
         self.random_forest = None
         self.supervised = None
         self.calibrated_rf = None
+        self.reference_sample = None
+        self.timings = {}
 
     def _log_class_balance(self, y, label="labels"):
         values, counts = np.unique(y, return_counts=True)
@@ -42,8 +72,8 @@ class HybridModelTrainer:
         logger.info(f"{label} distribution: {dist} (total={total})")
 
     def _balance_data(self, X, y):
-        cfg = MODEL_CONFIG.get("random_forest", {})
-        use_smote = bool(cfg.get("use_smote", True)) and SMOTE is not None
+        cfg = self.config.get("random_forest", {})
+        use_smote = bool(cfg.get("use_smote", True))
 
         values, counts = np.unique(y, return_counts=True)
         if len(values) < 2:
@@ -55,97 +85,222 @@ class HybridModelTrainer:
         if ratio >= 0.2:
             return X, y
 
+        bal_cfg = self.config.get("balancing", {})
         if use_smote:
             k = int(cfg.get("smote_k_neighbors", 3))
-            logger.info(f"Applying SMOTE (k={k}) for class imbalance...")
-            sm = SMOTE(k_neighbors=k, random_state=42)
-            return sm.fit_resample(X, y)
-
-        logger.info("Applying random oversampling for class imbalance...")
-        min_class = values[np.argmin(counts)]
-        min_idx = np.where(y == min_class)[0]
-        add_count = max_count - min_count
-        add_idx = np.random.choice(min_idx, size=add_count, replace=True)
-        X_new = np.vstack([X, X[add_idx]])
-        y_new = np.concatenate([y, y[add_idx]])
-        return X_new, y_new
+            neighbors = bal_cfg.get("neighbors", "auto")
+            logger.info(
+                f"Applying SMOTE (k={k}, neighbors={neighbors}) "
+                "for class imbalance..."
+            )
+        else:
+            k, neighbors = 0, None
+            logger.info("Applying random oversampling for class imbalance...")
+        sampler = MinorityOversampler(
+            k_neighbors=k,
+            neighbors=neighbors,
+            n_trees=bal_cfg.get("n_trees", 4),
+            leaf_size=bal_cfg.get("leaf_size", 64),
+            ann_min_rows=bal_cfg.get("ann_min_rows", 50000),
+            chunk_rows=bal_cfg.get("chunk_rows", 100000),
+            random_state=bal_cfg.get("random_state", 42),
+        )
+        return sampler.fit_resample(X, y)
 
     def train_isolation_forest(self, X_train):
         logger.info("Training IsolationForest...")
-        config = MODEL_CONFIG["isolation_forest"]
+        config = self.config["isolation_forest"]
         self.iso_forest = IsolationForest(
             contamination=config["contamination"],
             n_estimators=config["n_estimators"],
             random_state=config["random_state"],
-            n_jobs=-1
+            n_jobs=self.n_jobs
         )
         self.iso_forest.fit(X_train)
         logger.info("✅ IsolationForest trained")
         return self.iso_forest
 
     def train_one_class_svm(self, X_train):
-        logger.info("Training One-Class SVM...")
         default_config = {"nu": 0.1, "kernel": "rbf", "gamma": "scale"}
-        config = MODEL_CONFIG.get("one_class_svm", default_config)
-        self.oc_svm = OneClassSVM(
-            nu=config.get("nu", 0.1),
-            kernel=config.get("kernel", "rbf"),
-            gamma=config.get("gamma", "scale"),
-        )
+        config = self.config.get("one_class_svm", default_config)
+        backend = config.get("backend", "exact")
+        if backend == "auto":
+            exact_max = int(config.get("exact_max_rows", 50000))
+            backend = "exact" if len(X_train) <= exact_max else "nystroem"
+
+        if backend == "exact":
+            logger.info("Training One-Class SVM...")
+            self.oc_svm = OneClassSVM(
+                nu=config.get("nu", 0.1),
+                kernel=config.get("kernel", "rbf"),
+                gamma=config.get("gamma", "scale"),
+            )
+        else:
+            logger.info(f"Training approximate One-Class SVM ({backend})...")
+            self.oc_svm = ApproxOneClassSVM(
+                nu=config.get("nu", 0.1),
+                gamma=config.get("gamma", "scale"),
+                feature_map=backend,
+                n_components=config.get("n_components", 300),
+                random_state=config.get("random_state", 42),
+            )
         self.oc_svm.fit(X_train)
         logger.info("✅ One-Class SVM trained")
         return self.oc_svm
 
-    def train_random_forest(self, X_train, y_train):
-        logger.info("Training RandomForest...")
-        config = MODEL_CONFIG.get("random_forest", {})
-        self.random_forest = RandomForestClassifier(
+    def _build_random_forest(self):
+        config = self.config.get("random_forest", {})
+        return RandomForestClassifier(
             n_estimators=config.get("n_estimators", 300),
+            max_depth=config.get("max_depth"),
+            min_samples_leaf=config.get("min_samples_leaf", 1),
             random_state=config.get("random_state", 42),
             class_weight=config.get("class_weight", "balanced"),
-            n_jobs=-1
+            n_jobs=self.n_jobs
         )
+
+    def train_random_forest(self, X_train, y_train):
+        logger.info("Training RandomForest...")
+        self.random_forest = self._build_random_forest()
         self.random_forest.fit(X_train, y_train)
         logger.info("✅ RandomForest trained")
         return self.random_forest
 
-    def train_supervised(self, X_train, y_train):
-        cfg = MODEL_CONFIG.get("random_forest", {})
+    def _build_supervised(self):
+        """Return an unfitted supervised estimator and its display name."""
+        cfg = self.config.get("random_forest", {})
         model_type = cfg.get("model", "random_forest")
 
         if model_type == "xgboost":
             try:
-                from xgboost import XGBClassifier
-                logger.info("Training XGBoost...")
-                self.supervised = XGBClassifier(
-                    n_estimators=300,
-                    learning_rate=0.05,
-                    max_depth=6,
-                    subsample=0.9,
-                    colsample_bytree=0.9,
+                xgb_cfg = self.config.get("xgboost", {})
+                return xgboost.XGBClassifier(
+                    n_estimators=xgb_cfg.get("n_estimators", 300),
+                    learning_rate=xgb_cfg.get("learning_rate", 0.05),
+                    max_depth=xgb_cfg.get("max_depth", 6),
+                    subsample=xgb_cfg.get("subsample", 0.9),
+                    colsample_bytree=xgb_cfg.get("colsample_bytree", 0.9),
                     random_state=42,
-                    eval_metric="logloss"
-                )
-                self.supervised.fit(X_train, y_train)
-                logger.info("✅ XGBoost trained")
-                return self.supervised
+                    eval_metric="logloss",
+                    n_jobs=self.n_jobs
+                ), "XGBoost"
             except Exception:
                 logger.warning(
                     "XGBoost not available; falling back to RandomForest."
                 )
 
         if model_type == "hist_gb":
-            logger.info("Training HistGradientBoosting...")
-            self.supervised = HistGradientBoostingClassifier(random_state=42)
-            self.supervised.fit(X_train, y_train)
-            logger.info("✅ HistGradientBoosting trained")
-            return self.supervised
+            return (
+                HistGradientBoostingClassifier(random_state=42),
+                "HistGradientBoosting",
+            )
+
+        return self._build_random_forest(), "RandomForest"
 
-        self.supervised = self.train_random_forest(X_train, y_train)
+    def train_supervised(self, X_train, y_train):
+        model, name = self._build_supervised()
+        logger.info(f"Training {name}...")
+        self.supervised = model.fit(X_train, y_train)
+        if isinstance(model, RandomForestClassifier):
+            self.random_forest = model
+        logger.info(f"✅ {name} trained")
         return self.supervised
 
+    def train_supervised_calibrated(self, X_train, y_train):
+        """Fit the supervised model together with its calibrator.
+
+        ``calibration_mode`` in ``config["random_forest"]``:
+
+        * ``"refit"``: plain fit here; ``calibrate`` later refits
+          ``calibration_cv`` copies via ``CalibratedClassifierCV``.
+        * ``"holdout"``: one fit on ``1 - calibration_holdout`` of the
+          rows, calibrator fitted on the held-out rows.
+        * ``"oof"``: ``calibration_cv`` fold fits, calibrated on their
+          out-of-fold predictions; with ``calibration_ensemble`` the fold
+          models themselves are served as the supervised model.
+
+        Returns ``(supervised, calibrated)``; ``calibrated`` is None in
+        ``"refit"`` mode.
+        """
+        cfg = self.config.get("random_forest", {})
+        mode = cfg.get("calibration_mode", "refit")
+        if mode == "refit":
+            return self.train_supervised(X_train, y_train), None
+
+        method = cfg.get("calibration", "isotonic")
+        estimator, name = self._build_supervised()
+        logger.info(f"Training {name} with {mode} {method} calibration...")
+        if mode == "holdout":
+            model, calibrated = calibrate_holdout(
+                estimator, X_train, y_train, method=method,
+                holdout=float(cfg.get("calibration_holdout", 0.2))
+            )
+        elif mode == "oof":
+            model, calibrated = calibrate_out_of_fold(
+                estimator, X_train, y_train, method=method,
+                cv=int(cfg.get("calibration_cv", 3)),
+                ensemble=bool(cfg.get("calibration_ensemble", True))
+            )
+        else:
+            raise ValueError(f"Unknown calibration_mode: {mode}")
+
+        self.supervised = model
+        self.calibrated_rf = calibrated
+        if isinstance(model, RandomForestClassifier):
+            self.random_forest = model
+        logger.info(f"✅ {name} trained and calibrated")
+        return model, calibrated
+
+    def fit_supervised(self, X_train, y_train):
+        """Balance, then train and calibrate only the supervised model.
+
+        For refits that keep the saved scaler and anomaly detectors.
+        """
+        self._log_class_balance(y_train, "train labels")
+        X_train, y_train = self._balance_data(X_train, y_train)
+        self.train_supervised_calibrated(X_train, y_train)
+        if self.calibrated_rf is None:
+            self.calibrate(X_train, y_train)
+        return self.supervised, self.calibrated_rf
+
+    def train_components(self, X_train, y_train):
+        """Fit IsolationForest, OC-SVM and the supervised model.
+
+        They only depend on the balanced training data, so with
+        ``config["training"]["parallel_components"]`` (and at least one
+        core each) they are fitted concurrently and this trainer's core
+        budget (``n_jobs``) is split between them. Per-component wall
+        times are kept in ``self.timings``.
+        """
+        cfg = self.config.get("training", {})
+        total_cores = resolve_cores(self.n_jobs)
+
+        if cfg.get("parallel_components", True) and \
+                total_cores >= len(COMPONENTS):
+            budget = split_core_budget(COMPONENTS, total_cores)
+            scheduler = TrainingScheduler(backend=cfg.get("backend", "thread"))
+        else:
+            budget = dict.fromkeys(COMPONENTS, self.n_jobs)
+            scheduler = TrainingScheduler(backend="thread", max_workers=1)
+
+        logger.info(f"Training components with core budget {budget}")
+        fitted = scheduler.run({
+            name: (
+                _fit_component,
+                (name, X_train, y_train, budget[name], self.config)
+            )
+            for name in COMPONENTS
+        })
+        self.timings.update(scheduler.timings)
+
+        self.iso_forest = fitted["isolation_forest"]
+        self.oc_svm = fitted["one_class_svm"]
+        self.supervised, self.calibrated_rf = fitted["supervised"]
+        if isinstance(self.supervised, RandomForestClassifier):
+            self.random_forest = self.supervised
+
     def calibrate(self, X_train, y_train):
-        cfg = MODEL_CONFIG.get("random_forest", {})
+        cfg = self.config.get("random_forest", {})
         method = cfg.get("calibration", "isotonic")
         cv = int(cfg.get("calibration_cv", 3))
         logger.info(f"Calibrating probabilities: method={method}, cv={cv}")
@@ -160,58 +315,71 @@ class HybridModelTrainer:
             return self.calibrated_rf.predict_proba(X)[:, 1]
         return self.supervised.predict_proba(X)[:, 1]
 
-    def save_models(self):
+    def save_models(self, threshold=None):
+        """Write the models to the working directory, then publish them
+        (with the scaler and feature columns already there) as a new
+        immutable registry version. Promotion is left to deploy_model.
+
+        Each file is replaced atomically, so nothing reading the working
+        directory sees a half-written pickle. Returns the version id.
+        """
         logger.info("Saving models...")
-        joblib.dump(self.iso_forest, PATHS["models"] / "iso_forest_model.pkl")
-        joblib.dump(self.oc_svm, PATHS["models"] / "one_class_svm_model.pkl")
-        joblib.dump(self.supervised, PATHS["models"] / "supervised_model.pkl")
+        models_dir = PATHS["models"]
+        models_dir.mkdir(parents=True, exist_ok=True)
+        atomic_dump(self.iso_forest, models_dir / "iso_forest_model.pkl")
+        atomic_dump(self.oc_svm, models_dir / "one_class_svm_model.pkl")
+        atomic_dump(self.supervised, models_dir / "supervised_model.pkl")
         if self.calibrated_rf is not None:
-            model_path = PATHS["models"] / "calibrated_supervised.pkl"
-            joblib.dump(self.calibrated_rf, model_path)
-        logger.info(f"✅ Models saved to {PATHS['models']}")
+            atomic_dump(
+                self.calibrated_rf, models_dir / "calibrated_supervised.pkl"
+            )
+        if self.reference_sample is not None:
+            tmp = models_dir / "reference_features.tmp.npy"
+            np.save(tmp, self.reference_sample)
+            os.replace(tmp, models_dir / "reference_features.npy")
+        export_forests(
+            {"iso_forest": self.iso_forest, "supervised": self.supervised},
+            models_dir
+        )
+        logger.info(f"✅ Models saved to {models_dir}")
+
+        metadata = {} if threshold is None else {"threshold": threshold}
+        return ModelRegistry().publish(models_dir, metadata)
+
+    @staticmethod
+    def _reference_sample(X, max_rows=None):
+        max_rows = max_rows or int(
+            RETRAIN_CONFIG.get("reference_rows", 5000)
+        )
+        # Index before casting so a memory-mapped X is never copied whole
+        if len(X) <= max_rows:
+            return np.array(X, dtype=float)
+        rng = np.random.default_rng(42)
+        idx = np.sort(rng.choice(len(X), max_rows, replace=False))
+        return np.asarray(X[idx], dtype=float)
 
     def _save_threshold_report(self, y_true, y_prob):
         if y_true is None or y_prob is None:
             return
 
-        thresholds = np.linspace(0, 1, 101)
-        rows = []
-
-        top_k = int(MODEL_CONFIG.get("random_forest", {}).get("top_k", 10))
-        order = np.argsort(-y_prob)
+        y_true = np.asarray(y_true)
+        top_k = int(self.config.get("random_forest", {}).get("top_k", 10))
         if len(y_true) >= top_k:
-            p_at_k = float(np.mean(y_true[order[:top_k]]))
+            p_at_k = precision_at_k(y_true, y_prob, [top_k])[top_k]
         else:
             p_at_k = 0.0
 
-        for t in thresholds:
-            y_pred = (y_prob >= t).astype(int)
-            precision = precision_score(y_true, y_pred, zero_division=0)
-            recall = recall_score(y_true, y_pred, zero_division=0)
-            f1 = f1_score(y_true, y_pred, zero_division=0)
-            alerts = int(y_pred.sum())
-            avg_score_alerts = (
-                float(y_prob[y_pred == 1].mean())
-                if alerts > 0
-                else 0.0
-            )
+        df = threshold_sweep(
+            y_true, y_prob, thresholds=np.linspace(0, 1, 101)
+        ).drop(columns=["tp", "fp"])
+        df[f"precision_at_{top_k}"] = p_at_k
 
-            rows.append({
-                "threshold": float(t),
-                "precision": float(precision),
-                "recall": float(recall),
-                "f1": float(f1),
-                "alerts": alerts,
-                "avg_score_alerts": avg_score_alerts,
-                f"precision_at_{top_k}": p_at_k
-            })
-
-        df = pd.DataFrame(rows)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_path = PATHS["reports"] / f"threshold_report_{ts}.csv"
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        out_path = self.reports_dir / f"threshold_report_{ts}.csv"
         df.to_csv(out_path, index=False)
 
-        best_f1 = df.loc[df["f1"].idxmax()]
+        best_f1 = best_f1_threshold(df)
         logger.info(f"Threshold report saved: {out_path}")
         threshold_val = best_f1['threshold']
         f1_val = best_f1['f1']
@@ -225,26 +393,24 @@ class HybridModelTrainer:
         y_prob = self.get_supervised_probs(X_test)
         self._save_threshold_report(y_test, y_prob)
 
-        precision, recall, thresholds = precision_recall_curve(y_test, y_prob)
-        f1 = (2 * precision * recall) / (precision + recall + 1e-9)
-        best_idx = int(np.nanargmax(f1))
+        # Every unique score is a candidate threshold
+        sweep = threshold_sweep(y_test, y_prob)
         auto_threshold = (
-            thresholds[best_idx]
-            if best_idx < len(thresholds)
+            float(best_f1_threshold(sweep)["threshold"])
+            if len(sweep) > 0
             else 0.5
         )
 
-        min_threshold = MODEL_CONFIG.get("random_forest", {}).get(
+        min_threshold = self.config.get("random_forest", {}).get(
             "min_threshold", 0.15
         )
         threshold = max(float(auto_threshold), float(min_threshold))
 
         y_pred = (y_prob >= threshold).astype(int)
 
-        k = int(MODEL_CONFIG.get("random_forest", {}).get("top_k", 10))
+        k = int(self.config.get("random_forest", {}).get("top_k", 10))
         k = max(1, min(k, len(y_prob)))
-        topk_idx = np.argsort(y_prob)[::-1][:k]
-        precision_at_k = float(np.mean(y_test[topk_idx]))
+        p_at_k = precision_at_k(y_test, y_prob, [k])[k]
 
         logger.info("\n" + "=" * 60)
         logger.info(
@@ -254,7 +420,7 @@ class HybridModelTrainer:
         logger.info("=" * 60)
         report = classification_report(y_test, y_pred, zero_division=0)
         logger.info("\n" + report)
-        logger.info(f"Precision@K (K={k}): {precision_at_k:.3f}")
+        logger.info(f"Precision@K (K={k}): {p_at_k:.3f}")
 
         logger.info("\n" + "=" * 60)
         logger.info("CONFUSION MATRIX")
@@ -268,7 +434,7 @@ class HybridModelTrainer:
             "threshold": float(threshold)
         }
 
-    def run(self, X_train, X_test, y_train, y_test):
+    def run(self, X_train, X_test, y_train, y_test, save=True):
         logger.info("=" * 70)
         logger.info("STARTING MODEL TRAINING")
         logger.info("=" * 70)
@@ -276,15 +442,17 @@ class HybridModelTrainer:
         self._log_class_balance(y_train, "train labels")
         self._log_class_balance(y_test, "test labels")
 
+        # Unbalanced training rows are the drift reference for retraining
+        self.reference_sample = self._reference_sample(X_train)
         X_train, y_train = self._balance_data(X_train, y_train)
 
-        self.train_isolation_forest(X_train)
-        self.train_one_class_svm(X_train)
-        self.train_supervised(X_train, y_train)
-        self.calibrate(X_train, y_train)
+        self.train_components(X_train, y_train)
+        if self.calibrated_rf is None:
+            self.calibrate(X_train, y_train)
 
         results = self.evaluate(X_test, y_test)
-        self.save_models()
+        if save:
+            results["version"] = self.save_models(results["threshold"])
 
         logger.info("=" * 70)
         logger.info("✅ MODEL TRAINING COMPLETE")
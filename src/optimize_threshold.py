@@ -1,9 +1,10 @@
 import logging
 import pandas as pd
-import numpy as np
-from sklearn.metrics import precision_recall_curve, roc_auc_score
+from sklearn.metrics import roc_auc_score
 from model_trainer import HybridModelTrainer
-from config import PATHS
+from feature_store import load_feature_store
+from threshold_sweep import threshold_sweep, best_f1_threshold
+from config import PATHS, training_model_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,48 +16,40 @@ def optimize_threshold():
     logger.info("OPTIMIZING DECISION THRESHOLD")
     logger.info("="*60)
 
-    # Load balanced data
-    X_df = pd.read_csv(PATHS["data"] / "features_balanced.csv")
-    user_ids = X_df['user_id'].values
-    X = X_df.drop('user_id', axis=1).values
-
-    threat_labels = pd.read_csv(PATHS["data"] / "threat_labels_balanced.csv")
-    y = threat_labels.set_index('user_id').loc[user_ids, 'is_threat'].values
+    # Load balanced data (read-only memory map, shared with workers)
+    store = load_feature_store()
+    X, y = store["X"], store["y"]
 
     # Train on full dataset
-    trainer = HybridModelTrainer()
-    trainer.run(pd.DataFrame(X), pd.DataFrame(X[:len(X)//5]),
-                pd.Series(y), pd.Series(y[:len(y)//5]))
+    trainer = HybridModelTrainer(config=training_model_config())
+    trainer.run(X, X[:len(X)//5], y, y[:len(y)//5])
 
-    y_prob = trainer.get_supervised_probs(pd.DataFrame(X))
-    
-    # Calculate PR curve
-    precision, recall, thresholds = precision_recall_curve(y, y_prob)
+    y_prob = trainer.get_supervised_probs(X)
     
-    # Find optimal threshold
-    f1_scores = 2 * (precision * recall) / (precision + recall + 1e-10)
-    optimal_idx = np.argmax(f1_scores)
-    optimal_threshold = (thresholds[optimal_idx]
-                         if optimal_idx < len(thresholds) else 0.5)
+    # Sweep every unique score as a threshold in one sorted pass
+    sweep = threshold_sweep(y, y_prob)
+    best = best_f1_threshold(sweep)
+    optimal_threshold = float(best["threshold"])
     
     # Calculate AUC
     auc = roc_auc_score(y, y_prob)
     
     logger.info("\nOptimal Threshold Analysis:")
     logger.info(f"  Optimal Threshold: {optimal_threshold:.4f}")
-    logger.info(f"  Max F1 Score: {f1_scores[optimal_idx]:.4f}")
-    logger.info(f"  Precision @ optimal: {precision[optimal_idx]:.4f}")
-    logger.info(f"  Recall @ optimal: {recall[optimal_idx]:.4f}")
+    logger.info(f"  Max F1 Score: {best['f1']:.4f}")
+    logger.info(f"  Precision @ optimal: {best['precision']:.4f}")
+    logger.info(f"  Recall @ optimal: {best['recall']:.4f}")
     logger.info(f"  ROC-AUC: {auc:.4f}")
     
     # Save threshold
     threshold_config = pd.DataFrame({
         'metric': ['optimal_threshold', 'f1_score', 'auc',
                    'precision', 'recall'],
-        'value': [optimal_threshold, f1_scores[optimal_idx], auc,
-                  precision[optimal_idx], recall[optimal_idx]]
+        'value': [optimal_threshold, best['f1'], auc,
+                  best['precision'], best['recall']]
     })
     
+    PATHS["reports"].mkdir(parents=True, exist_ok=True)
     threshold_config.to_csv(PATHS["reports"] / "optimal_threshold.csv",
                             index=False)
     logger.info("\n✅ Threshold config saved")
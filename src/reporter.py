@@ -38,10 +38,28 @@ class ReportGenerator:
         }
 
         if explanations is not None:
+            # Compact index/value arrays get feature names only here
+            if hasattr(explanations, "to_records"):
+                explanations = explanations.to_records()
             report["explanations"] = explanations
 
         return report
 
+    @staticmethod
+    def save_explanations_json(explanations):
+        """Write explanations next to the report instead of inside it;
+        per-user explanations are also served by
+        ``/api/v1/user/<id>/explain``."""
+        PATHS["reports"].mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = PATHS["reports"] / f"explanations_{timestamp}.json"
+        if hasattr(explanations, "to_records"):
+            explanations = explanations.to_records()
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(explanations, f, indent=2)
+        logger.info(f"✅ Explanations saved: {filename}")
+        return filename
+
     @staticmethod
     def save_report_json(report):
         PATHS["reports"].mkdir(exist_ok=True)
@@ -1,14 +1,123 @@
+import argparse
+import sys
+import pandas as pd
+from config import PATHS
 from logger import setup_logger
-from main_execution import main
 
 logger = setup_logger(__name__)
 
+LABELS_FILE = "threat_labels.csv"
+
 
 def retrain():
-    logger.info("Scheduled retrain started")
+    from main_execution import main
+
+    logger.info("Full retrain started")
     main()
-    logger.info("Scheduled retrain complete")
+    logger.info("Full retrain complete")
+
+
+def retrain_scheduled(features_path, labels_path=None, dry_run=False):
+    """Skip, warm-update or fully retrain each component depending on
+    drift and new labels. See ``RetrainScheduler``.
+
+    ``features_path`` is a CSV of the current population's raw features,
+    as the pipeline engineers them before scaling. It has to be given:
+    the balanced CSVs are scaled and SMOTE-augmented, so they can't be
+    compared with the raw drift reference.
+    """
+    from main_execution import main
+    from retrain_scheduler import RetrainScheduler
+
+    logger.info("Scheduled retrain started")
+    features_df = pd.read_csv(features_path)
+    # Real labels only: the balanced file adds synthetic SMOTE users
+    labels_df = pd.read_csv(labels_path or PATHS["data"] / LABELS_FILE)
+    record = RetrainScheduler(full_retrain=main).run(
+        features_df, labels_df, dry_run=dry_run
+    )
+    logger.info(f"Scheduled retrain complete: {record['plan']}")
+    return record
+
+
+def check_unchanged(features_path):
+    """Self-check of the scheduler: the current population, measured
+    against a reference fitted on itself with freshly trained models and
+    no new labels, must be skipped. Returns whether it was."""
+    from retrain_scheduler import SKIP, unchanged_plan
+
+    max_psi, plan = unchanged_plan(pd.read_csv(features_path))
+    passed = all(action == SKIP for action in plan.values())
+    logger.info(
+        f"Unchanged population: plan {plan} (max PSI={max_psi:.3f}) "
+        f"{'✅' if passed else '❌ expected skip'}"
+    )
+    return passed
+
+
+def retrain_incremental(features_path, labels_path=None):
+    """Update the saved models from new feature rows instead of rerunning
+    the full pipeline. See ``IncrementalRetrainer``."""
+    from incremental_retrain import IncrementalRetrainer
+
+    logger.info("Incremental retrain started")
+    features_df = pd.read_csv(features_path)
+    labels = None
+    if labels_path:
+        labels_df = pd.read_csv(labels_path)
+        labels = (
+            labels_df.set_index("user_id")
+            .loc[features_df["user_id"], "is_threat"]
+            .values
+        )
+
+    retrainer = IncrementalRetrainer().load()
+    report = retrainer.update(features_df, labels)
+    if report["updated"]:
+        retrainer.save()
+    logger.info("Incremental retrain complete")
+    return report
 
 
 if __name__ == "__main__":
-    retrain()
+    parser = argparse.ArgumentParser(description="Retrain the models.")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Retrain everything, without consulting the scheduler"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Log the scheduler's decisions without retraining"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Verify that an unchanged population is skipped; exits "
+             "non-zero otherwise"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Warm-start the saved models on new rows only"
+    )
+    parser.add_argument(
+        "--features",
+        help="CSV of raw features (user_id + feature columns): the new "
+             "rows with --incremental, else the current population "
+             "(required unless --full)"
+    )
+    parser.add_argument(
+        "--labels",
+        help="CSV of user_id,is_threat: for the new rows with "
+             "--incremental, else all labels so far"
+    )
+    args = parser.parse_args()
+
+    if not args.full and not args.features:
+        parser.error("--features is required unless --full")
+    if args.check:
+        sys.exit(0 if check_unchanged(args.features) else 1)
+    elif args.incremental:
+        retrain_incremental(args.features, args.labels)
+    elif args.full:
+        retrain()
+    else:
+        retrain_scheduled(args.features, args.labels, dry_run=args.dry_run)
@@ -0,0 +1,242 @@
+import json
+import time
+from datetime import datetime
+import pandas as pd
+from config import (
+    PATHS, DRIFT_CONFIG, SCHEDULER_CONFIG, training_model_config
+)
+from drift_monitor import DriftReference, drift_report
+from incremental_retrain import IncrementalRetrainer
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SKIP, WARM, FULL = "skip", "warm", "full"
+
+
+def load_state(path=None):
+    """What the models were last trained on, or None if unknown."""
+    path = path or SCHEDULER_CONFIG["state_file"]
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def mark_trained(n_labels, components=("unsupervised", "supervised"),
+                 path=None):
+    """Record that ``components`` were (re)trained.
+
+    Called after every full pipeline run and every scheduled action.
+    ``n_labels`` (the label count the supervised model has seen) is only
+    stored when the supervised model was among them, so new labels are
+    counted from its latest training.
+    """
+    path = path or SCHEDULER_CONFIG["state_file"]
+    state = load_state(path) or {}
+    now = datetime.now().isoformat()
+    for component in components:
+        state[component] = {"trained_at": now}
+    if "supervised" in components:
+        state["labels"] = int(n_labels)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def decide(max_psi, new_labels, state, config=None):
+    """Per-component skip / warm / full decision.
+
+    ``unsupervised`` covers the scaler and both anomaly detectors, which
+    are driven by drift only. The supervised model reacts to label
+    volume. A full unsupervised retrain refits the shared scaler, so it
+    forces a full supervised retrain too; warm updates keep the scaler
+    frozen, so they leave the supervised model alone. Models older than
+    ``max_age_days`` (or with no recorded training) are fully retrained.
+    """
+    cfg = {**SCHEDULER_CONFIG, **(config or {})}
+    now = datetime.now()
+
+    def stale(component):
+        trained = (state or {}).get(component)
+        if not trained:
+            return True
+        age = now - datetime.fromisoformat(trained["trained_at"])
+        return age.days >= cfg["max_age_days"]
+
+    if max_psi is None or max_psi >= cfg["full_psi"] or \
+            stale("unsupervised"):
+        unsupervised = FULL
+    elif max_psi >= cfg["warm_psi"]:
+        unsupervised = WARM
+    else:
+        unsupervised = SKIP
+
+    if unsupervised == FULL or new_labels >= cfg["full_new_labels"] or \
+            stale("supervised"):
+        supervised = FULL
+    elif new_labels >= cfg["min_new_labels"]:
+        supervised = WARM
+    else:
+        supervised = SKIP
+    return {"unsupervised": unsupervised, "supervised": supervised}
+
+
+class RetrainScheduler:
+    """Retrain only the components whose inputs actually changed.
+
+    Each run measures feature drift of the current population against the
+    saved ``DriftReference`` and counts labels added since the last
+    training, then applies ``decide``: skipped components are left alone,
+    warm ones are continued by ``IncrementalRetrainer`` and full ones are
+    refitted (the whole pipeline when the unsupervised side is full, the
+    supervised model alone on the saved scaler otherwise). Every run
+    appends its inputs, decisions and per-action timings to
+    ``decisions_file``.
+    """
+
+    def __init__(self, full_retrain, config=None):
+        # full_retrain: callable running the whole training pipeline
+        self.full_retrain = full_retrain
+        self.config = {**SCHEDULER_CONFIG, **(config or {})}
+        self.timings = {}
+
+    def _measure_drift(self, features_df):
+        path = PATHS["models"] / DRIFT_CONFIG["reference_file"]
+        if not path.exists():
+            logger.warning("No drift reference; assuming full drift")
+            return None
+        report = drift_report(DriftReference.load(path), features_df)
+        return float(report["psi"].max())
+
+    def _timed(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        logger.info(f"{name} took {self.timings[name]:.1f}s")
+        return result
+
+    def run(self, features_df, labels_df=None, dry_run=False):
+        """Decide and apply one round of retraining.
+
+        ``features_df`` is the current population's raw (unscaled)
+        features (``user_id`` + feature columns); ``labels_df`` the
+        cumulative real ``user_id,is_threat`` labels, newest last.
+        """
+        self.timings = {}
+        state = load_state(self.config["state_file"])
+        n_labels = 0 if labels_df is None else len(labels_df)
+        seen_labels = (state or {}).get("labels", 0)
+        new_labels = max(0, n_labels - seen_labels)
+
+        max_psi = self._timed("drift", self._measure_drift, features_df)
+        plan = decide(max_psi, new_labels, state, self.config)
+        logger.info(
+            f"Retrain plan {plan} (max PSI="
+            f"{'n/a' if max_psi is None else f'{max_psi:.3f}'}, "
+            f"new labels={new_labels})"
+        )
+
+        if not dry_run:
+            if plan["unsupervised"] == FULL:
+                # The pipeline records its own training state
+                self._timed("full_pipeline", self.full_retrain)
+            else:
+                self._apply(plan, features_df, labels_df, seen_labels)
+                retrained = [c for c, a in plan.items() if a != SKIP]
+                if retrained:
+                    mark_trained(
+                        n_labels, retrained, self.config["state_file"]
+                    )
+
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "max_psi": max_psi,
+            "labels": n_labels,
+            "new_labels": new_labels,
+            "plan": plan,
+            "dry_run": dry_run,
+            "timings": self.timings,
+        }
+        self._log_decision(record)
+        return record
+
+    def _apply(self, plan, features_df, labels_df, seen_labels):
+        if plan["unsupervised"] == SKIP and plan["supervised"] == SKIP:
+            return
+        retrainer = IncrementalRetrainer().load()
+
+        if plan["unsupervised"] == WARM:
+            self._timed(
+                "warm_unsupervised", retrainer.update,
+                features_df, components={"unsupervised"}
+            )
+
+        if plan["supervised"] == WARM:
+            # Continue on the users labelled since the last training that
+            # are still in the population
+            new = labels_df.iloc[seen_labels:]
+            present = new["user_id"].isin(features_df["user_id"])
+            if not present.all():
+                logger.warning(
+                    f"{int((~present).sum())} newly labelled users are not "
+                    "in the current population; their labels are skipped"
+                )
+                new = new[present]
+            if len(new):
+                rows = features_df.set_index("user_id").loc[new["user_id"]]
+                self._timed(
+                    "warm_supervised", retrainer.update,
+                    rows.reset_index(), new["is_threat"].to_numpy(),
+                    components={"supervised"}
+                )
+        elif plan["supervised"] == FULL:
+            self._timed(
+                "full_supervised", self._refit_supervised,
+                retrainer, features_df, labels_df
+            )
+        retrainer.save()
+
+    def _refit_supervised(self, retrainer, features_df, labels_df):
+        from model_trainer import HybridModelTrainer
+
+        # A relabelled user keeps its latest label
+        labels = labels_df.drop_duplicates("user_id", keep="last")
+        labels = labels.set_index("user_id")["is_threat"]
+        labelled = features_df[features_df["user_id"].isin(labels.index)]
+        X = retrainer.models["scaler"].transform(
+            labelled[retrainer.feature_columns].to_numpy(dtype=float)
+        )
+        y = labels.loc[labelled["user_id"]].to_numpy()
+        trainer = HybridModelTrainer(config=training_model_config())
+        supervised, calibrated = trainer.fit_supervised(X, y)
+        retrainer.models["supervised"] = supervised
+        retrainer.models["calibrated"] = calibrated
+
+    def _log_decision(self, record):
+        path = self.config["decisions_file"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def unchanged_plan(features_df):
+    """``decide`` for ``features_df`` against a reference fitted on
+    itself, with both components just trained and no new labels;
+    returns ``(max_psi, plan)``. Anything but skip means the drift
+    measurement itself is off."""
+    columns = [c for c in features_df.columns if c != "user_id"]
+    reference = DriftReference.fit(features_df, columns)
+    max_psi = float(drift_report(reference, features_df)["psi"].max())
+    trained = {"trained_at": datetime.now().isoformat()}
+    state = {"unsupervised": trained, "supervised": trained}
+    return max_psi, decide(max_psi, 0, state)
+
+
+def decision_history(path=None):
+    """All logged scheduler runs as a DataFrame."""
+    path = path or SCHEDULER_CONFIG["decisions_file"]
+    if not path.exists():
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.json_normalize([json.loads(line) for line in f if line])
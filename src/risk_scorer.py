@@ -1,6 +1,6 @@
 import numpy as np
 import pandas as pd
-from config import RISK_WEIGHTS, RISK_THRESHOLDS
+from config import RISK_WEIGHTS, RISK_THRESHOLDS, NUMERIC_CONFIG
 from logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -9,70 +9,68 @@ logger = setup_logger(__name__)
 class RiskScorer:
     """Advanced risk scoring system"""
 
-    def __init__(self):
+    def __init__(self, dtype=None):
         self.weights = RISK_WEIGHTS
         self.thresholds = RISK_THRESHOLDS
+        # Model outputs arrive as float64; cast once and stay in this dtype
+        self.dtype = np.dtype(dtype or NUMERIC_CONFIG["dtype"])
 
     def compute_hybrid_anomaly_score(self, iso_scores, svm_scores):
         iso_weight = 0.6
         svm_weight = 0.4
 
         def norm(a):
-            mn, mx = float(a.min()), float(a.max())
-            return (a - mn) / (mx - mn) if mx > mn else a * 0.0
+            a = np.asarray(a, dtype=self.dtype)
+            mn, mx = a.min(), a.max()
+            return (a - mn) / (mx - mn) if mx > mn else a * 0
 
         iso_n = norm(iso_scores)
         svm_n = norm(svm_scores)
         return (iso_weight * iso_n) + (svm_weight * svm_n)
 
+    def _ratio_component(self, risk_df, column, weight_key, default_weight):
+        """``column / column.max() * weight * 10``, or zeros if missing.
+
+        Like pandas' ``max``, NaN values are skipped when taking the
+        maximum; only the rows that are NaN themselves score NaN.
+        """
+        if column not in risk_df.columns:
+            return np.zeros(len(risk_df), dtype=self.dtype)
+        values = risk_df[column].to_numpy(dtype=self.dtype)
+        present = values[~np.isnan(values)]
+        max_value = present.max() if len(present) else 0
+        max_value = max_value or self.dtype.type(1.0)
+        weight = self.dtype.type(self.weights.get(weight_key, default_weight))
+        return values / max_value * weight * 10
+
     def compute_risk_scores(
         self, features_df, anomaly_scores, supervised_probs=None
     ):
         logger.info("Computing risk scores...")
 
         risk_df = features_df.copy()
-        anomaly_scores = np.asarray(anomaly_scores, dtype=float)
+        anomaly_scores = np.asarray(anomaly_scores, dtype=self.dtype)
 
-        anom_weight = self.weights.get("anomaly", 0.4)
-        sup_weight = self.weights.get("supervised", 0.3)
+        anom_weight = self.dtype.type(self.weights.get("anomaly", 0.4))
+        sup_weight = self.dtype.type(self.weights.get("supervised", 0.3))
 
         anomaly_component = anomaly_scores * anom_weight * 10
 
         if supervised_probs is not None:
-            supervised_probs = np.asarray(supervised_probs, dtype=float)
+            supervised_probs = np.asarray(supervised_probs, dtype=self.dtype)
             supervised_component = supervised_probs * sup_weight * 10
         else:
-            supervised_component = np.zeros(len(risk_df))
-
-        if "sensitive_files_accessed" in risk_df.columns:
-            max_sens = float(risk_df["sensitive_files_accessed"].max() or 1.0)
-            sensitive_component = (
-                (risk_df["sensitive_files_accessed"] / max_sens)
-                * self.weights.get("sensitive_access", 0.2)
-                * 10
-            )
-        else:
-            sensitive_component = np.zeros(len(risk_df))
-
-        if "failed_logins" in risk_df.columns:
-            max_fails = float(risk_df["failed_logins"].max() or 1.0)
-            login_component = (
-                (risk_df["failed_logins"] / max_fails)
-                * self.weights.get("login_anomalies", 0.1)
-                * 10
-            )
-        else:
-            login_component = np.zeros(len(risk_df))
-
-        if "unique_locations" in risk_df.columns:
-            max_locs = float(risk_df["unique_locations"].max() or 1.0)
-            behavioral_component = (
-                (risk_df["unique_locations"] / max_locs)
-                * self.weights.get("behavioral", 0.1)
-                * 10
-            )
-        else:
-            behavioral_component = np.zeros(len(risk_df))
+            supervised_component = np.zeros(len(risk_df), dtype=self.dtype)
+
+        sensitive_component = self._ratio_component(
+            risk_df, "sensitive_files_accessed", "sensitive_access", 0.2
+        )
+        login_component = self._ratio_component(
+            risk_df, "failed_logins", "login_anomalies", 0.1
+        )
+        behavioral_component = self._ratio_component(
+            risk_df, "unique_locations", "behavioral", 0.1
+        )
 
         risk_df["risk_score"] = (
             anomaly_component
@@ -99,7 +97,7 @@ class RiskScorer:
             include_lowest=True,
         )
 
-        confidence_values = (np.abs(anomaly_scores - 0.5) * 2 * 100)
+        confidence_values = np.abs(anomaly_scores - 0.5) * 2 * 100
         risk_df["confidence"] = confidence_values.clip(0, 100)
 
         logger.info(f"✅ Computed risk scores for {len(risk_df)} users")
@@ -0,0 +1,145 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from config import PROJECT_ROOT, STARTUP_CONFIG
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SRC_DIR = PROJECT_ROOT / "src"
+
+
+def parse_importtime(stderr):
+    """Rows of ``python -X importtime`` output as dicts with ``module``,
+    ``depth`` (1 = imported by the entry point itself), ``self_us`` and
+    ``cumulative_us``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        stripped = name.lstrip(" ")
+        rows.append({
+            "module": stripped.strip(),
+            "depth": (len(name) - len(stripped)) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return rows
+
+
+def profile_import(module, repeat=None):
+    """Import ``module`` in fresh interpreters under ``-X importtime``.
+
+    Wall time is measured around the whole process (interpreter start
+    included), best of ``repeat`` runs; the import rows come from that
+    run. Modules resolve from ``src/`` and from the project root, so both
+    ``api`` and ``src.app`` work. Returns a dict, with ``error`` set when
+    the import failed.
+    """
+    repeat = int(repeat or STARTUP_CONFIG["repeat"])
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [str(SRC_DIR), str(PROJECT_ROOT), os.environ.get("PYTHONPATH", "")]
+    ))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+        )
+        seconds = time.perf_counter() - start
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return {
+                "module": module, "seconds": seconds, "imports": [],
+                "error": lines[-1] if lines else f"exit {proc.returncode}",
+            }
+        if best is None or seconds < best["seconds"]:
+            best = {
+                "module": module, "seconds": seconds,
+                "imports": parse_importtime(proc.stderr), "error": None,
+            }
+    return best
+
+
+def direct_imports(rows, module):
+    """The depth-1 rows imported by ``module`` itself; importtime prints
+    children before their parent, so they are the depth-1 rows since the
+    previous top-level row (not the interpreter's own ``site`` imports)."""
+    pending = []
+    for row in rows:
+        if row["depth"] == 1:
+            pending.append(row)
+        elif row["depth"] == 0:
+            if row["module"] == module:
+                return pending
+            pending = []
+    return []
+
+
+def summarize(profile, top=None):
+    """Log the slowest direct imports of an entry point and any deferred
+    (optional heavy) package it pulled in; returns those packages."""
+    top = int(top or STARTUP_CONFIG["top_imports"])
+    module = profile["module"]
+    if profile["error"]:
+        logger.error(f"{module}: import failed ({profile['error']})")
+        return []
+    direct = sorted(
+        direct_imports(profile["imports"], module),
+        key=lambda row: -row["cumulative_us"]
+    )
+    logger.info(f"{module}: {profile['seconds']:.2f}s cold start")
+    for row in direct[:top]:
+        logger.info(
+            f"   {row['cumulative_us'] / 1e6:7.3f}s  {row['module']}"
+        )
+    loaded = {row["module"].split(".")[0] for row in profile["imports"]}
+    eager = [m for m in STARTUP_CONFIG["deferred_modules"] if m in loaded]
+    if eager:
+        logger.warning(f"{module}: imports {', '.join(eager)} at startup")
+    return eager
+
+
+def check_budgets(modules=None, repeat=None):
+    """Profile each entry point against ``STARTUP_CONFIG['budgets']``.
+
+    Returns ``{module: seconds}`` and whether every entry point imported,
+    stayed within its budget and deferred its optional heavy packages.
+    """
+    budgets = STARTUP_CONFIG["budgets"]
+    modules = modules or list(budgets)
+    timings, ok = {}, True
+    for module in modules:
+        profile = profile_import(module, repeat)
+        eager = summarize(profile)
+        timings[module] = round(profile["seconds"], 3)
+        budget = budgets.get(module)
+        if profile["error"] or eager:
+            ok = False
+        elif budget is not None and profile["seconds"] > budget:
+            logger.warning(
+                f"{module}: {profile['seconds']:.2f}s exceeds the "
+                f"{budget:.2f}s startup budget"
+            )
+            ok = False
+    return timings, ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profile entry point cold starts with -X importtime."
+    )
+    parser.add_argument(
+        "modules", nargs="*",
+        help="Modules to import (default: all in STARTUP_CONFIG['budgets'])"
+    )
+    parser.add_argument("--repeat", type=int, default=None)
+    args = parser.parse_args()
+
+    timings, ok = check_budgets(args.modules, args.repeat)
+    logger.info(f"Startup times: {timings}")
+    sys.exit(0 if ok else 1)
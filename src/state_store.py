@@ -0,0 +1,229 @@
+"""
+Pluggable state backends for the dashboard app.
+
+The in-memory backend mirrors the original single-process behaviour. The
+SQLite backend keeps user records and flags in one WAL-mode database so
+several worker processes on the same host share a consistent view and admin
+actions survive restarts. Every write bumps a global version counter; workers
+poll ``changes()`` to pull only the rows that changed since their last sync.
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+# Parameterised statements: sqlite3 caches the compiled form per connection,
+# so every call after the first skips SQL parsing.
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS users ("
+    " id INTEGER PRIMARY KEY,"
+    " data TEXT NOT NULL,"
+    " version INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_users_version ON users(version)",
+    "CREATE TABLE IF NOT EXISTS meta ("
+    " key TEXT PRIMARY KEY,"
+    " value TEXT NOT NULL)",
+)
+_SQL_GET_META = "SELECT value FROM meta WHERE key = ?"
+_SQL_SET_META = (
+    "INSERT INTO meta(key, value) VALUES (?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+)
+_SQL_BUMP_VERSION = (
+    "INSERT INTO meta(key, value) VALUES ('version', '1') "
+    "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+)
+_SQL_ALL_USERS = "SELECT data FROM users ORDER BY id"
+_SQL_GET_USER = "SELECT data FROM users WHERE id = ?"
+_SQL_UPSERT_USER = (
+    "INSERT INTO users(id, data, version) VALUES (?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    "data = excluded.data, version = excluded.version"
+)
+_SQL_CHANGED_USERS = (
+    "SELECT data, version FROM users WHERE version > ? ORDER BY version"
+)
+
+# Derived fields are recomputed by the app and never persisted.
+_DERIVED_PREFIX = "risk_"
+
+
+def _persistable(user):
+    return {
+        k: v for k, v in user.items() if not k.startswith(_DERIVED_PREFIX)
+    }
+
+
+class MemoryStateStore:
+    """Process-local state; the original behaviour of ``src/app.py``."""
+
+    def __init__(self):
+        self._users = {}
+        self._meta = {}
+        self._lock = threading.Lock()
+
+    def seed_users(self, users):
+        """Store ``users`` unless already seeded; return the stored list."""
+        with self._lock:
+            if self._meta.get("seeded") != "1":
+                for u in users:
+                    self._users[u["id"]] = _persistable(u)
+                self._meta["seeded"] = "1"
+            return [dict(u) for u in self._users.values()]
+
+    def get_flag(self, key, default=None):
+        return self._meta.get(key, default)
+
+    def set_flag(self, key, value):
+        with self._lock:
+            self._meta[key] = str(value)
+
+    def update_user(self, user_id, **fields):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            user.update(fields)
+            return dict(user)
+
+    def changes(self):
+        """Rows changed by other processes since the last call."""
+        return []
+
+    def close(self):
+        pass
+
+
+class SQLiteStateStore:
+    """Shared, durable state in a WAL-mode SQLite database.
+
+    Each process holds one connection guarded by a lock (Flask's dev server
+    spawns a thread per request, so per-thread connections would churn).
+    ``PRAGMA data_version`` changes only when *another* connection commits,
+    so ``changes()`` is a single pragma read when nothing happened.
+    """
+
+    def __init__(self, db_path, busy_timeout_ms=5000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=busy_timeout_ms / 1000.0,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=64,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._data_version = self._conn.execute(
+            "PRAGMA data_version"
+        ).fetchone()[0]
+        self._seen_version = self._current_version()
+
+    def _current_version(self):
+        row = self._conn.execute(_SQL_GET_META, ("version",)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _transaction(self, fn):
+        """Run ``fn()`` inside one immediate (write-locked) transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def _next_version(self):
+        self._conn.execute(_SQL_BUMP_VERSION)
+        return self._current_version()
+
+    def seed_users(self, users):
+        def _seed():
+            row = self._conn.execute(_SQL_GET_META, ("seeded",)).fetchone()
+            if row is None or row[0] != "1":
+                version = self._next_version()
+                self._conn.executemany(
+                    _SQL_UPSERT_USER,
+                    [
+                        (u["id"], json.dumps(_persistable(u)), version)
+                        for u in users
+                    ],
+                )
+                self._conn.execute(_SQL_SET_META, ("seeded", "1"))
+            # Everything up to here is reflected in the returned snapshot.
+            self._seen_version = self._current_version()
+            return [
+                json.loads(r[0])
+                for r in self._conn.execute(_SQL_ALL_USERS)
+            ]
+        return self._transaction(_seed)
+
+    def get_flag(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(_SQL_GET_META, (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_flag(self, key, value):
+        def _set():
+            self._next_version()
+            self._conn.execute(_SQL_SET_META, (key, str(value)))
+        self._transaction(_set)
+
+    def update_user(self, user_id, **fields):
+        def _update():
+            row = self._conn.execute(_SQL_GET_USER, (user_id,)).fetchone()
+            if row is None:
+                return None
+            user = json.loads(row[0])
+            user.update(fields)
+            self._conn.execute(
+                _SQL_UPSERT_USER,
+                (user_id, json.dumps(user), self._next_version()),
+            )
+            return user
+        return self._transaction(_update)
+
+    def changes(self):
+        with self._lock:
+            data_version = self._conn.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+            if data_version == self._data_version:
+                return []
+            self._data_version = data_version
+            rows = self._conn.execute(
+                _SQL_CHANGED_USERS, (self._seen_version,)
+            ).fetchall()
+            if rows:
+                self._seen_version = max(self._seen_version, rows[-1][1])
+        return [json.loads(r[0]) for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_state_store(backend=None, db_path=None):
+    """Build the backend selected by ``INSIDER_STATE_BACKEND``.
+
+    ``memory`` (default) keeps the single-process behaviour; ``sqlite``
+    stores state in ``INSIDER_STATE_DB`` (default ``Data/app_state.db``).
+    """
+    backend = (
+        backend or os.environ.get("INSIDER_STATE_BACKEND", "memory")
+    ).lower()
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        default_db = Path(__file__).parent.parent / "Data" / "app_state.db"
+        return SQLiteStateStore(
+            db_path or os.environ.get("INSIDER_STATE_DB", default_db)
+        )
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -0,0 +1,324 @@
+import random
+import threading
+import time
+import numpy as np
+from config import DRIFT_CONFIG, STREAM_DRIFT_CONFIG
+from drift_monitor import DriftReference
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (KLL).
+
+    Items live in levels of compactors; an item at level ``h`` stands for
+    ``2**h`` inputs. When the sketch is full, the lowest full level is
+    sorted and every other item is promoted to the next level. Memory is
+    O(k) and the rank error is about ``1/k`` regardless of stream length.
+    Updates are amortized O(1).
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = int(k)
+        self.c = c
+        self.n = 0
+        self._rng = random.Random(seed)
+        self._buffer = []  # level 0, appended to item by item
+        self.levels = [np.empty(0)]
+        self._size = 0
+        self._max_size = self._total_capacity()
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return int(np.ceil(self.k * self.c ** depth)) + 1
+
+    def _total_capacity(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, x):
+        if np.isfinite(x):
+            self._buffer.append(float(x))
+            self.n += 1
+            self._size += 1
+            if self._size >= self._max_size:
+                self._compress()
+
+    def update_batch(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if len(values):
+            self._flush()
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._size += len(values)
+            self._compress()
+
+    def _flush(self):
+        if self._buffer:
+            self.levels[0] = np.concatenate([self.levels[0], self._buffer])
+            self._buffer = []
+
+    def _compress(self):
+        self._flush()
+        while self._size >= self._max_size:
+            for h in range(len(self.levels)):
+                if len(self.levels[h]) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self._max_size = self._total_capacity()
+                items = np.sort(self.levels[h])
+                # An odd item out stays behind at this level
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.randint(0, 1)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate(
+                    [self.levels[h + 1], promoted]
+                )
+                self._size -= len(items) - len(promoted)
+                break
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch (both keep the same ``k``)."""
+        self._flush()
+        other._flush()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._size += other._size
+        self._max_size = self._total_capacity()
+        self._compress()
+        return self
+
+    def _weighted(self):
+        self._flush()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(lv), 2 ** h, dtype=np.int64)
+            for h, lv in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate value(s) at quantile(s) ``q`` in [0, 1]."""
+        items, cum = self._weighted()
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan)
+        ranks = np.asarray(q, dtype=float) * cum[-1]
+        pos = np.searchsorted(cum, ranks, side="left")
+        return items[np.minimum(pos, len(items) - 1)]
+
+    def cdf(self, x):
+        """Approximate share of inputs ``<= x``."""
+        items, cum = self._weighted()
+        if len(items) == 0:
+            return np.zeros(np.shape(x))
+        pos = np.searchsorted(items, x, side="right")
+        return np.where(pos > 0, cum[np.maximum(pos - 1, 0)], 0) / cum[-1]
+
+
+def retrain_hook(features_path, labels_path=None, dry_run=False):
+    """Drift hook running the retrain scheduler (``retrain_scheduled``)
+    on the current population's raw features in ``features_path``.
+
+    The scheduler re-measures drift on the whole current population and
+    decides per component whether to skip, warm-update or retrain. It
+    runs in a background thread so the stream isn't blocked; an alarm
+    while a run is still going is ignored.
+    """
+    running = threading.Lock()
+
+    def run():
+        try:
+            from retrain import retrain_scheduled
+            retrain_scheduled(features_path, labels_path, dry_run=dry_run)
+        except Exception as exc:
+            logger.error(f"Scheduled retrain after drift failed: {exc}")
+        finally:
+            running.release()
+
+    def hook(report):
+        if not running.acquire(blocking=False):
+            logger.info("Scheduled retrain still running; alarm ignored")
+            return
+        threading.Thread(target=run, name="drift-retrain").start()
+
+    return hook
+
+
+class StreamingDriftMonitor:
+    """Per-feature drift over a sliding window, without keeping raw rows.
+
+    Each record is binned against the fixed edges of a ``DriftReference``
+    and counted in the time bucket it falls in (``bucket_seconds`` wide);
+    the window is the last ``window_seconds`` of buckets, kept as a
+    running total so adding a record and expiring a bucket are both O(1)
+    in the number of records. A KLL sketch per feature tracks the
+    long-run distribution so a fresh reference can be cut without the
+    raw data (``to_reference``).
+
+    Monitors on different shards or workers combine with ``merge``:
+    buckets are keyed by absolute time, so equal keys simply add up.
+    Every ``check_every`` records the window is compared with the
+    reference; when any feature's PSI exceeds ``psi_threshold`` the
+    registered hooks are called with the drift table (at most once per
+    ``cooldown_seconds``). With ``retrain_on_drift`` a ``retrain_hook``
+    over ``retrain_features`` is registered first, so alarms reach the
+    retrain scheduler.
+    """
+
+    def __init__(self, reference, config=None, hooks=None):
+        self.reference = reference
+        self.config = {**STREAM_DRIFT_CONFIG, **(config or {})}
+        self.hooks = list(hooks or [])
+        if self.config["retrain_on_drift"]:
+            if not self.config["retrain_features"]:
+                raise ValueError(
+                    "retrain_on_drift needs retrain_features, the CSV of "
+                    "the current population's raw features"
+                )
+            self.hooks.insert(
+                0, retrain_hook(self.config["retrain_features"])
+            )
+        n_features = len(reference.feature_columns)
+        self._edges = reference.inner_edges
+        self._offsets = np.arange(n_features) * reference.n_bins
+        self.buckets = {}  # bucket key -> (n_features, n_bins) counts
+        self.window_counts = np.zeros_like(reference.counts)
+        self.sketches = [
+            KLLSketch(self.config["sketch_k"], seed=j)
+            for j in range(n_features)
+        ]
+        self._since_check = 0
+        self._last_trigger = None
+        self._newest = None
+
+    def add_hook(self, hook):
+        """Register ``hook(report)``, called when drift is detected."""
+        self.hooks.append(hook)
+
+    def _bucket_key(self, timestamp):
+        return int(timestamp // self.config["bucket_seconds"])
+
+    def _bucket(self, key):
+        """Counts of bucket ``key``, or None when it is already outside
+        the window (late records are dropped)."""
+        span = int(np.ceil(
+            self.config["window_seconds"] / self.config["bucket_seconds"]
+        ))
+        if self._newest is None or key > self._newest:
+            self._newest = key
+            for old in [k for k in self.buckets if k <= key - span]:
+                self.window_counts -= self.buckets.pop(old)
+        elif key <= self._newest - span:
+            return None
+        if key not in self.buckets:
+            self.buckets[key] = np.zeros_like(self.reference.counts)
+        return self.buckets[key]
+
+    def update(self, record, timestamp=None):
+        """Add one raw feature vector (ordered as the reference columns)."""
+        record = np.asarray(record, dtype=float)
+        finite = np.isfinite(record)
+        bins = (record[:, None] >= self._edges).sum(axis=1)
+        key = self._bucket_key(time.time() if timestamp is None
+                               else timestamp)
+        bucket = self._bucket(key)
+        if bucket is not None:
+            flat = (self._offsets + bins)[finite]
+            bucket.ravel()[flat] += 1
+            self.window_counts.ravel()[flat] += 1
+        for j in np.flatnonzero(finite):
+            self.sketches[j].update(record[j])
+        self._count(1)
+
+    def update_batch(self, X, timestamp=None):
+        """Add many records sharing one timestamp (e.g. a micro-batch)."""
+        X = np.asarray(X, dtype=float)
+        counts = self.reference.histogram(X)
+        key = self._bucket_key(time.time() if timestamp is None
+                               else timestamp)
+        bucket = self._bucket(key)
+        if bucket is not None:
+            bucket += counts
+            self.window_counts += counts
+        for j, sketch in enumerate(self.sketches):
+            sketch.update_batch(X[:, j])
+        self._count(len(X))
+
+    def _count(self, n_rows):
+        self._since_check += n_rows
+        if self._since_check >= self.config["check_every"]:
+            self._since_check = 0
+            self.check()
+
+    def merge(self, other):
+        """Fold another monitor over the same reference into this one."""
+        for key in sorted(other.buckets):
+            bucket = self._bucket(key)
+            if bucket is not None:
+                bucket += other.buckets[key]
+                self.window_counts += other.buckets[key]
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        return self
+
+    def window_report(self):
+        """PSI, KS and JS of the current window against the reference."""
+        return self.reference.compare(counts=self.window_counts)
+
+    def check(self, now=None):
+        """Compare the window with the reference and fire hooks on drift.
+
+        Returns the drift table, or None while the window holds fewer
+        than ``min_window_rows`` records.
+        """
+        if self.window_counts.sum(axis=1).max() < \
+                self.config["min_window_rows"]:
+            return None
+        threshold = self.config.get("psi_threshold") or \
+            DRIFT_CONFIG["psi_threshold"]
+        report = self.window_report()
+        report["drifted"] = report["psi"] > threshold
+        if not report["drifted"].any():
+            return report
+
+        now = time.time() if now is None else now
+        if self._last_trigger is not None and \
+                now - self._last_trigger < self.config["cooldown_seconds"]:
+            return report
+        self._last_trigger = now
+        drifted = report.loc[report["drifted"], "feature"].tolist()
+        logger.warning(f"Streaming drift detected in {drifted}")
+        for hook in self.hooks:
+            try:
+                hook(report)
+            except Exception as exc:
+                logger.error(f"Drift hook {hook!r} failed: {exc}")
+        return report
+
+    def to_reference(self, bins=None):
+        """A new ``DriftReference`` cut from the long-run sketches."""
+        bins = int(bins or self.reference.n_bins)
+        levels = np.linspace(0, 1, bins + 1)[1:-1]
+        inner_edges = np.vstack([s.quantile(levels) for s in self.sketches])
+        cdf = np.vstack([
+            s.cdf(np.nextafter(edges, -np.inf))
+            for s, edges in zip(self.sketches, inner_edges)
+        ])
+        shares = np.diff(np.hstack([
+            np.zeros((len(cdf), 1)), cdf, np.ones((len(cdf), 1))
+        ]), axis=1)
+        n = np.array([[s.n] for s in self.sketches])
+        return DriftReference(
+            self.reference.feature_columns, inner_edges,
+            np.rint(shares * n).astype(np.int64)
+        )
+
+    @classmethod
+    def from_saved_reference(cls, path=None, config=None, hooks=None):
+        return cls(DriftReference.load(path), config=config, hooks=hooks)
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import retrain_scheduler
+from retrain_scheduler import (
+    FULL, SKIP, WARM, RetrainScheduler, decide, unchanged_plan
+)
+
+CONFIG = {
+    "warm_psi": 0.1,
+    "full_psi": 0.25,
+    "min_new_labels": 50,
+    "full_new_labels": 1000,
+    "max_age_days": 30,
+}
+
+
+def trained(days_ago=0):
+    at = {"trained_at": (datetime.now() - timedelta(days=days_ago))
+          .isoformat()}
+    return {"unsupervised": at, "supervised": at}
+
+
+def population(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        rng.gamma(2.0, 3.0, (n, 6)), columns=[f"f{i}" for i in range(6)]
+    )
+    df.insert(0, "user_id", [f"U{i}" for i in range(n)])
+    return df
+
+
+def test_unchanged_population_is_skipped():
+    max_psi, plan = unchanged_plan(population())
+    assert max_psi < CONFIG["warm_psi"]
+    assert plan == {"unsupervised": SKIP, "supervised": SKIP}
+
+
+def test_decide_without_drift_or_labels_skips():
+    plan = decide(0.01, 0, trained(), CONFIG)
+    assert plan == {"unsupervised": SKIP, "supervised": SKIP}
+
+
+def test_decide_warm_drift_leaves_supervised_alone():
+    # Warm updates keep the scaler frozen, so the supervised inputs hold
+    plan = decide(0.15, 0, trained(), CONFIG)
+    assert plan == {"unsupervised": WARM, "supervised": SKIP}
+
+
+def test_decide_full_drift_retrains_everything():
+    plan = decide(0.4, 0, trained(), CONFIG)
+    assert plan == {"unsupervised": FULL, "supervised": FULL}
+
+
+def test_decide_reacts_to_label_volume():
+    assert decide(0.01, 60, trained(), CONFIG)["supervised"] == WARM
+    assert decide(0.01, 2000, trained(), CONFIG)["supervised"] == FULL
+
+
+def test_decide_unknown_or_stale_state_is_full():
+    for max_psi, state in ((0.01, None), (None, trained()),
+                           (0.01, trained(days_ago=40))):
+        plan = decide(max_psi, 0, state, CONFIG)
+        assert plan == {"unsupervised": FULL, "supervised": FULL}
+
+
+def test_warm_supervised_skips_users_missing_from_population(monkeypatch):
+    updates = []
+
+    class Retrainer:
+        def load(self):
+            return self
+
+        def update(self, rows, labels, components):
+            updates.append((rows["user_id"].tolist(), labels.tolist()))
+
+        def save(self):
+            pass
+
+    monkeypatch.setattr(retrain_scheduler, "IncrementalRetrainer", Retrainer)
+    features = population(n=3)
+    labels = pd.DataFrame({
+        "user_id": ["U0", "GONE", "U2"], "is_threat": [1, 0, 0]
+    })
+    plan = {"unsupervised": SKIP, "supervised": WARM}
+    RetrainScheduler(full_retrain=None, config=CONFIG)._apply(
+        plan, features, labels, seen_labels=0
+    )
+    assert updates == [(["U0", "U2"], [1, 0])]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from benchmark_dtype import RATIO_COLUMNS, make_features
+from data_pipeline import DataPipeline
+from risk_scorer import RiskScorer
+
+
+def score(dtype, features_df, iso, svm, probs):
+    """Risk table for the same raw input under one dtype policy."""
+    features = DataPipeline(dtype=dtype).apply_dtype(features_df)
+    scorer = RiskScorer(dtype=dtype)
+    anomaly = scorer.compute_hybrid_anomaly_score(iso, svm)
+    return scorer.compute_risk_scores(
+        features, anomaly, supervised_probs=probs
+    ).sort_index()
+
+
+@pytest.mark.parametrize("nan_rate", [0.0, 0.01])
+def test_float32_keeps_risk_levels(nan_rate):
+    inputs = make_features(20000, nan_rate=nan_rate)
+    ref = score("float64", *inputs)
+    f32 = score("float32", *inputs)
+
+    ref_levels = ref["risk_level"].astype(object)
+    f32_levels = f32["risk_level"].astype(object)
+    same = (ref_levels == f32_levels) | (
+        ref_levels.isna() & f32_levels.isna()
+    )
+    assert same.all()
+    np.testing.assert_allclose(
+        f32["risk_score"], ref["risk_score"], atol=1e-3
+    )
+
+
+def test_missing_ratio_input_stays_in_its_row():
+    features_df, iso, svm, probs = make_features(5000, nan_rate=0.01)
+    risk_df = score("float32", features_df, iso, svm, probs)
+
+    missing = features_df[RATIO_COLUMNS].isna().any(axis=1).to_numpy()
+    assert missing.any()
+    assert np.isfinite(risk_df["risk_score"].to_numpy()[~missing]).all()
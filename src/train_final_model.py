@@ -1,7 +1,7 @@
 import logging
-import pandas as pd
 from model_trainer import HybridModelTrainer
-from config import PATHS
+from feature_store import load_feature_store
+from config import training_model_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,13 +13,9 @@ def train_and_deploy():
     logger.info("TRAINING PRODUCTION MODEL")
     logger.info("="*60)
     
-    # Load balanced data
-    X_df = pd.read_csv(PATHS["data"] / "features_balanced.csv")
-    user_ids = X_df['user_id'].values
-    X = X_df.drop('user_id', axis=1).values
-    
-    threat_labels = pd.read_csv(PATHS["data"] / "threat_labels_balanced.csv")
-    y = threat_labels.set_index('user_id').loc[user_ids, 'is_threat'].values
+    # Load balanced data (read-only memory map; the splits below are views)
+    store = load_feature_store()
+    X, y = store["X"], store["y"]
     
     # Split data
     train_size = int(0.8 * len(X))
@@ -30,13 +26,8 @@ def train_and_deploy():
     logger.info(f"Testing samples: {len(X_test)}")
     
     # Train model
-    trainer = HybridModelTrainer()
-    trainer.run(
-        pd.DataFrame(X_train),
-        pd.DataFrame(X_test),
-        pd.Series(y_train),
-        pd.Series(y_test)
-    )
+    trainer = HybridModelTrainer(config=training_model_config())
+    trainer.run(X_train, X_test, y_train, y_test)
     
     logger.info("✅ Model training complete")
     logger.info("="*60)
@@ -0,0 +1,101 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def resolve_cores(n_jobs):
+    """Translate an sklearn-style ``n_jobs`` into a concrete core count."""
+    cores = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, cores + 1 + n_jobs)
+    return min(int(n_jobs), cores)
+
+
+def split_core_budget(components, total_cores):
+    """Share ``total_cores`` between concurrently trained components.
+
+    ``components`` maps name -> relative weight. Weight 0 marks a
+    single-threaded component, which gets one core; the remaining cores
+    are split between the others in proportion to their weights, at
+    least one each, with leftovers going to the heaviest components.
+    The shares never add up to more than ``total_cores``; with fewer
+    cores than components there is no such split and ``ValueError`` is
+    raised (train them one after another instead).
+    """
+    if total_cores < len(components):
+        raise ValueError(
+            f"Cannot split {total_cores} cores between "
+            f"{len(components)} concurrent components"
+        )
+    budget = {name: 1 for name, w in components.items() if not w}
+    multi = {name: w for name, w in components.items() if w}
+    if not multi:
+        return budget
+
+    # One core each first, then the rest by weight (rounded down)
+    spare = total_cores - len(budget) - len(multi)
+    total_weight = float(sum(multi.values()))
+    for name, w in multi.items():
+        budget[name] = 1 + int(spare * w / total_weight)
+    leftover = total_cores - sum(budget.values())
+    for name in sorted(multi, key=multi.get, reverse=True):
+        if leftover <= 0:
+            break
+        budget[name] += 1
+        leftover -= 1
+    return budget
+
+
+class TrainingScheduler:
+    """Run independent training tasks concurrently and time each one.
+
+    ``backend="thread"`` suits estimators whose fit releases the GIL
+    (sklearn trees, libsvm, XGBoost). ``backend="process"`` isolates each
+    task in its own process; task callables and results must be picklable.
+    """
+
+    def __init__(self, backend="thread", max_workers=None):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown scheduler backend: {backend}")
+        self.backend = backend
+        self.max_workers = max_workers
+        self.timings = {}
+
+    def run(self, tasks):
+        """Execute ``tasks`` (name -> (fn, args)) and return name -> result.
+
+        Per-task wall times land in ``self.timings``, along with the total
+        under ``"total"``.
+        """
+        executor_cls = (
+            ThreadPoolExecutor if self.backend == "thread"
+            else ProcessPoolExecutor
+        )
+        workers = self.max_workers or len(tasks)
+        start = time.perf_counter()
+        with executor_cls(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_timed, fn, *args)
+                for name, (fn, args) in tasks.items()
+            }
+            results = {}
+            for name, future in futures.items():
+                results[name], self.timings[name] = future.result()
+        self.timings["total"] = time.perf_counter() - start
+
+        summary = ", ".join(
+            f"{name}={secs:.2f}s" for name, secs in self.timings.items()
+        )
+        logger.info(f"Component timings ({self.backend}): {summary}")
+        return results
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
@@ -0,0 +1,317 @@
+import argparse
+import copy
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+from model_trainer import HybridModelTrainer
+from feature_store import (
+    source_files, load_feature_store, load_fold_block, write_fold_blocks
+)
+from risk_scorer import RiskScorer
+from config import PATHS, MODEL_CONFIG, TUNING_CONFIG, FEATURE_STORE_CONFIG
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "section.param" -> candidate values
+SEARCH_SPACE = {
+    "isolation_forest.n_estimators": [100, 200, 300],
+    "isolation_forest.contamination": [0.05, 0.1, 0.15],
+    "one_class_svm.nu": [0.05, 0.1, 0.2],
+    "one_class_svm.gamma": ["scale", 0.01, 0.1],
+    "random_forest.n_estimators": [100, 200, 300, 500],
+    "random_forest.max_depth": [None, 8, 16],
+    "random_forest.min_samples_leaf": [1, 2, 5],
+    "xgboost.n_estimators": [100, 300, 500],
+    "xgboost.learning_rate": [0.03, 0.05, 0.1],
+    "xgboost.max_depth": [3, 4, 6, 8],
+    "xgboost.subsample": [0.7, 0.9, 1.0],
+}
+# random_forest.* tree params only matter when the RandomForest is used
+TREE_PARAMS = ("n_estimators", "max_depth", "min_samples_leaf")
+
+
+def active_search_space(config=None):
+    """Drop the parameters of the supervised model that is not in use."""
+    config = config or MODEL_CONFIG
+    model = config.get("random_forest", {}).get("model", "random_forest")
+    if model == "xgboost" and importlib.util.find_spec("xgboost") is None:
+        # HybridModelTrainer falls back to RandomForest
+        model = "random_forest"
+    space = {}
+    for key, values in SEARCH_SPACE.items():
+        section, param = key.split(".")
+        if section == "xgboost" and model != "xgboost":
+            continue
+        if (section == "random_forest" and param in TREE_PARAMS
+                and model != "random_forest"):
+            continue
+        space[key] = values
+    return space
+
+
+def sample_candidates(space, n_candidates, random_state=42):
+    """Draw distinct random configurations from ``space``."""
+    rng = np.random.default_rng(random_state)
+    keys = sorted(space)
+    n_total = int(np.prod([len(space[k]) for k in keys]))
+    seen = set()
+    candidates = []
+    while len(candidates) < min(n_candidates, n_total):
+        choice = tuple(int(rng.integers(len(space[k]))) for k in keys)
+        if choice in seen:
+            continue
+        seen.add(choice)
+        candidates.append({k: space[k][i] for k, i in zip(keys, choice)})
+    return candidates
+
+
+def apply_params(base_config, params):
+    """Return a copy of ``base_config`` with dotted ``params`` applied."""
+    config = copy.deepcopy(base_config)
+    for key, value in params.items():
+        section, param = key.split(".")
+        config.setdefault(section, {})[param] = value
+    return config
+
+
+def build_cache(n_splits, random_state=42, cache_root=None):
+    """Draw CV splits once and write every fold as scaled, contiguous
+    blocks (``write_fold_blocks``), memoized on disk.
+
+    Each fold is scaled with a StandardScaler fitted on its training rows
+    only, so the test fold never leaks into the scaling. Training rows are
+    shuffled once, so every rung's row budget is a prefix of the block -
+    a view of the file in each worker. The cache key covers the source
+    files' size/mtime and the split settings, so trials and later runs
+    reuse it until the data changes. Returns the cache directory.
+    """
+    cache_root = cache_root or TUNING_CONFIG["cache_dir"]
+    key = hashlib.sha256()
+    for path in source_files():
+        stat = path.stat()
+        key.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    key.update(f"splits={n_splits}:seed={random_state}:blocks".encode())
+    cache_dir = cache_root / key.hexdigest()[:16]
+    if cache_dir.exists():
+        logger.info(f"Using cached fold blocks: {cache_dir}")
+        return cache_dir
+
+    logger.info("Building fold block cache...")
+    store = load_feature_store()
+    X, y = store["X"], store["y"]
+    chunk_rows = FEATURE_STORE_CONFIG["chunk_rows"]
+    skf = StratifiedKFold(
+        n_splits=n_splits, shuffle=True, random_state=random_state
+    )
+    rng = np.random.default_rng(random_state)
+    folds, transforms = {}, {}
+    for fold, (train_idx, test_idx) in enumerate(skf.split(X, y)):
+        folds[f"train_{fold}"] = rng.permutation(train_idx)
+        folds[f"test_{fold}"] = test_idx
+        scaler = StandardScaler()
+        for start in range(0, len(train_idx), chunk_rows):
+            scaler.partial_fit(X[train_idx[start:start + chunk_rows]])
+        transforms[f"train_{fold}"] = scaler.transform
+        transforms[f"test_{fold}"] = scaler.transform
+    write_fold_blocks(X, y, folds, cache_dir, transforms, chunk_rows)
+    logger.info(f"Cache written: {cache_dir} (X={X.shape})")
+    return cache_dir
+
+
+def _evaluate_trial(trial_id, params, base_config, cache_dir, n_rows,
+                    n_jobs, anomaly_weight):
+    """Cross-validate one configuration on ``n_rows`` training rows per
+    fold (runs in a worker process)."""
+    n_splits = len(list(cache_dir.glob("test_*_y.npy")))
+
+    config = apply_params(base_config, params)
+    # Trials already run in parallel; ranking metrics need no calibration
+    config["training"] = {"parallel_components": False}
+    config["random_forest"]["calibration_mode"] = "refit"
+
+    scorer = RiskScorer()
+    sup_scores, anom_scores = [], []
+    with threadpool_limits(limits=n_jobs):
+        for fold in range(n_splits):
+            X_train, y_train = load_fold_block(cache_dir, f"train_{fold}")
+            X_test, y_test = load_fold_block(cache_dir, f"test_{fold}")
+
+            trainer = HybridModelTrainer(n_jobs=n_jobs, config=config)
+            X_fit, y_fit = trainer._balance_data(
+                X_train[:n_rows], y_train[:n_rows]
+            )
+            trainer.train_components(X_fit, y_fit)
+
+            sup_scores.append(average_precision_score(
+                y_test, trainer.get_supervised_probs(X_test)
+            ))
+            normality = scorer.compute_hybrid_anomaly_score(
+                trainer.iso_forest.score_samples(X_test),
+                trainer.oc_svm.score_samples(X_test),
+            )
+            anom_scores.append(
+                average_precision_score(y_test, 1.0 - normality)
+            )
+
+    supervised_pr_auc = float(np.mean(sup_scores))
+    anomaly_pr_auc = float(np.mean(anom_scores))
+    return {
+        "trial": trial_id,
+        "rows": int(n_rows),
+        "supervised_pr_auc": supervised_pr_auc,
+        "anomaly_pr_auc": anomaly_pr_auc,
+        "score": (
+            (1 - anomaly_weight) * supervised_pr_auc
+            + anomaly_weight * anomaly_pr_auc
+        ),
+    }
+
+
+def successive_halving(candidates, cache_dir, base_config=None, eta=3,
+                       min_rows=1000, max_workers=None, anomaly_weight=0.3):
+    """Evaluate all candidates on a small row budget, keep the best
+    ``1/eta``, multiply the budget by ``eta`` and repeat until one
+    candidate is left or the full training folds are used.
+
+    Returns ``(best_trial_id, history)``; ``history`` has one row per
+    trial evaluation.
+    """
+    base_config = base_config or MODEL_CONFIG
+    full_rows = min(
+        len(np.load(path, mmap_mode="r"))
+        for path in cache_dir.glob("train_*_y.npy")
+    )
+    cores = os.cpu_count() or 1
+    workers = max(1, min(len(candidates), max_workers or cores))
+    n_jobs = max(1, cores // workers)
+
+    alive = list(range(len(candidates)))
+    n_rows = min(int(min_rows), full_rows)
+    history = []
+    rung = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            logger.info(
+                f"Rung {rung}: {len(alive)} trials x {n_rows} rows/fold "
+                f"on {workers} workers"
+            )
+            futures = [
+                pool.submit(
+                    _evaluate_trial, trial, candidates[trial], base_config,
+                    cache_dir, n_rows, n_jobs, anomaly_weight
+                )
+                for trial in alive
+            ]
+            results = [f.result() for f in futures]
+            for r in results:
+                r["rung"] = rung
+            history.extend(results)
+
+            ranked = sorted(results, key=lambda r: r["score"], reverse=True)
+            logger.info(
+                f"Rung {rung} best: trial {ranked[0]['trial']} "
+                f"score={ranked[0]['score']:.4f}"
+            )
+            if len(alive) <= 1 or n_rows >= full_rows:
+                break
+            alive = [r["trial"] for r in ranked[:max(1, len(alive) // eta)]]
+            n_rows = min(n_rows * eta, full_rows)
+            rung += 1
+
+    return ranked[0]["trial"], pd.DataFrame(history)
+
+
+def write_tuned_config(params, score, tuned_dir=None, extra=None):
+    """Write the winning parameters as the next model_config_vNNNN.json."""
+    tuned_dir = tuned_dir or TUNING_CONFIG["tuned_dir"]
+    tuned_dir.mkdir(parents=True, exist_ok=True)
+    existing = sorted(tuned_dir.glob("model_config_v*.json"))
+    version = int(existing[-1].stem.rsplit("_v", 1)[1]) + 1 if existing else 1
+
+    nested = {}
+    for key, value in params.items():
+        section, param = key.split(".")
+        nested.setdefault(section, {})[param] = value
+    payload = {
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "score": float(score),
+        "params": nested,
+        **(extra or {}),
+    }
+    out_path = tuned_dir / f"model_config_v{version:04d}.json"
+    tmp_path = out_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def tune(n_candidates=None, eta=None, min_rows=None, n_splits=None,
+         max_workers=None):
+    cfg = TUNING_CONFIG
+    n_candidates = n_candidates or cfg["n_candidates"]
+    eta = eta or cfg["eta"]
+    min_rows = min_rows or cfg["min_rows"]
+    n_splits = n_splits or cfg["cv_splits"]
+    seed = cfg["random_state"]
+
+    cache_dir = build_cache(n_splits, random_state=seed)
+    space = active_search_space()
+    candidates = sample_candidates(space, n_candidates, random_state=seed)
+    logger.info(
+        f"Tuning {len(candidates)} candidates over {len(space)} parameters "
+        f"(eta={eta}, min_rows={min_rows}, splits={n_splits})"
+    )
+
+    best, history = successive_halving(
+        candidates, cache_dir, eta=eta, min_rows=min_rows,
+        max_workers=max_workers, anomaly_weight=cfg["anomaly_weight"]
+    )
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_dir = PATHS["reports"] / "tuning" / ts
+    run_dir.mkdir(parents=True, exist_ok=True)
+    history["params"] = history["trial"].map(
+        lambda t: json.dumps(candidates[t])
+    )
+    history.to_csv(run_dir / "trials.csv", index=False)
+
+    final = history[history["trial"] == best].iloc[-1]
+    out_path = write_tuned_config(
+        candidates[best], final["score"],
+        extra={"trials_report": str(run_dir / "trials.csv")}
+    )
+    logger.info(
+        f"✅ Best trial {best}: score={final['score']:.4f} "
+        f"(supervised PR-AUC={final['supervised_pr_auc']:.3f}, "
+        f"anomaly PR-AUC={final['anomaly_pr_auc']:.3f}) -> {out_path}"
+    )
+    return out_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Successive-halving search over MODEL_CONFIG."
+    )
+    parser.add_argument("--candidates", type=int, default=None)
+    parser.add_argument("--eta", type=int, default=None)
+    parser.add_argument(
+        "--min-rows", type=int, default=None,
+        help="Training rows per fold on the first rung"
+    )
+    parser.add_argument("--splits", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    tune(args.candidates, args.eta, args.min_rows, args.splits, args.workers)